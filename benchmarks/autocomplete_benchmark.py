@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the POS autocomplete index (hardware_backend/autocomplete.py).
+
+Builds a PrefixIndex over synthetic pharmacy product names and brands, then
+times lookups for the 1-4 letter prefixes a cashier types, picked from the
+names in the index (so most return a full page of suggestions) plus some
+that match nothing. Reports build time, memory and lookup latency
+percentiles.
+
+No database is needed; the rows are built in memory.
+
+Usage:
+    python benchmarks/autocomplete_benchmark.py
+    python benchmarks/autocomplete_benchmark.py --products 200000 --queries 50000 --json
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUBSTANCES = [
+    'Amoxicillin', 'Paracetamol', 'Ibuprofen', 'Metformin', 'Amlodipine', 'Ciprofloxacin', 'Azithromycin',
+    'Omeprazole', 'Cetirizine', 'Loratadine', 'Diclofenac', 'Artemether Lumefantrine', 'Doxycycline',
+    'Metronidazole', 'Salbutamol', 'Prednisolone', 'Losartan', 'Atorvastatin', 'Folic Acid', 'Ferrous Sulphate',
+    'Zinc', 'Vitamin C', 'Oral Rehydration Salts', 'Hydrocortisone', 'Clotrimazole', 'Fluconazole', 'Albendazole',
+]
+FORMS = ['Tablets', 'Capsules', 'Syrup', 'Suspension', 'Cream', 'Injection', 'Drops', 'Sachets']
+STRENGTHS = ['5mg', '10mg', '20mg', '100mg', '250mg', '500mg', '1g', '125mg/5ml', '1%', '2%']
+PACKS = ['x10', 'x14', 'x20', 'x28', 'x30', 'x100', '100ml', '60ml', '15g', '30g']
+BRANDS = [
+    'Shelys', 'Pfizer', 'GSK', 'Cipla', 'Sanofi', 'Novartis', 'Bayer', 'Zenufa', 'Kairuki', 'Dawa Ltd',
+    'Mission Pharma', 'Emcure', 'Ajanta', 'Macleods', 'Crème Pharma', 'Abacus', 'Regal', 'Elys',
+]
+
+
+def build_rows(products, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(products):
+        name = f'{rng.choice(SUBSTANCES)} {rng.choice(STRENGTHS)} {rng.choice(FORMS)} {rng.choice(PACKS)}'
+        rows.append((str(uuid.UUID(int=rng.getrandbits(128), version=4)), name, rng.choice(BRANDS)))
+    return rows
+
+
+def build_queries(rows, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            queries.append(rng.choice(['zz', 'qx', 'xyz', '9q']))  # no match: the whole index is walked once
+            continue
+        _, name, brand = rng.choice(rows)
+        words = (name if rng.random() < 0.8 else brand).split()
+        queries.append(rng.choice(words)[:rng.randint(1, 4)])
+    return queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run(args):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kipenzi.settings')
+    django.setup()
+
+    from hardware_backend.autocomplete import PrefixIndex
+
+    rows = build_rows(args.products)
+    queries = build_queries(rows, args.queries)
+
+    # Memory is measured on a second build: tracemalloc slows the first one down several times
+    started = time.perf_counter()
+    index = PrefixIndex(rows)
+    build_ms = (time.perf_counter() - started) * 1000
+    tracemalloc.start()
+    measured = PrefixIndex(rows)
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    del measured
+    gc.collect()  # so the build's garbage is not collected in the middle of the timed lookups
+
+    timings = []
+    returned = 0
+    for query in queries:
+        started = time.perf_counter()
+        returned += len(index.search(query, args.limit))
+        timings.append((time.perf_counter() - started) * 1e6)
+
+    return {
+        'products': args.products,
+        'keys': len(index.name_keys) + len(index.word_keys) + len(index.brand_keys),
+        'build_ms': round(build_ms, 1),
+        'memory_mb': round(memory_mb, 1),
+        'queries': len(queries),
+        'limit': args.limit,
+        'avg_results': round(returned / len(queries), 2),
+        'lookup_us': {
+            'p50': round(percentile(timings, 50), 1),
+            'p95': round(percentile(timings, 95), 1),
+            'p99': round(percentile(timings, 99), 1),
+            'max': round(max(timings), 1),
+        },
+    }
+
+
+def print_results(results):
+    lookup = results['lookup_us']
+    print(f"\n{'=' * 72}")
+    print(f"Autocomplete index, {results['products']:,} products ({results['keys']:,} keys)")
+    print(f"{'=' * 72}")
+    print(f"build {results['build_ms']:.0f} ms | {results['memory_mb']:.1f} MB")
+    print(f"{results['queries']:,} lookups (limit {results['limit']}, {results['avg_results']} results on average)")
+    print(f"p50 {lookup['p50']:.1f} us | p95 {lookup['p95']:.1f} us | p99 {lookup['p99']:.1f} us | max {lookup['max']:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the in-memory autocomplete index')
+    parser.add_argument('--products', type=int, default=100000, help='Products in the index')
+    parser.add_argument('--queries', type=int, default=20000, help='Lookups to time')
+    parser.add_argument('--limit', type=int, default=10, help='Suggestions per lookup')
+    parser.add_argument('--json', action='store_true', help='Print a single JSON result line')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print_results(results)
+
+
+if __name__ == '__main__':
+    main()
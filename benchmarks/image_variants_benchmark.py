@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the image variant pipeline (hardware_backend/image_variants.py).
+
+Generates synthetic phone photos (4032x3024 JPEGs with sensor-like noise and
+an EXIF orientation, 2-4 MB each), renders their variants and reports:
+
+- bytes a catalog page of product tiles downloads: the originals against the
+  thumb / medium variants in WebP and JPEG, and what image_variants adds to
+  the JSON;
+- encode time per image, sequentially and in a thread pool;
+- JPEG decode time with and without draft mode.
+
+No database is needed; the files go to a temporary directory.
+
+Usage:
+    python benchmarks/image_variants_benchmark.py
+    python benchmarks/image_variants_benchmark.py --images 24 --workers 4 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PHOTO_SIZE = (4032, 3024)  # a 12 MP phone camera
+
+
+def make_photo(path, seed):
+    """A noisy colour photo, so JPEG sizes are close to a real one"""
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(seed)
+    small = Image.new('RGB', (16, 12))
+    small.putdata([tuple(rng.randrange(40, 230) for _ in range(3)) for _ in range(16 * 12)])
+    image = small.resize(PHOTO_SIZE, Image.Resampling.BICUBIC)
+    noise = Image.effect_noise(PHOTO_SIZE, 28).filter(ImageFilter.GaussianBlur(0.6))
+    image = Image.merge('RGB', [Image.blend(channel, noise, 0.35) for channel in image.split()])
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees, as phones store portrait shots
+    exif[0x010F] = 'Benchmark Phone'
+    image.save(path, 'JPEG', quality=92, exif=exif)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def time_decode(paths, draft):
+    from PIL import Image
+
+    timings = []
+    for path in paths:
+        started = time.perf_counter()
+        with Image.open(path) as image:
+            if draft:
+                image.draft('RGB', (1280, 1280))
+            image.load()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(sum(timings) / len(timings), 1)
+
+
+def run(args):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kipenzi.settings')
+    django.setup()
+
+    from hardware_backend.image_variants import render_variants
+    from kipenzi.media_storage import LocalStorage
+
+    root = tempfile.mkdtemp(prefix='image-variants-benchmark-')
+    storage = LocalStorage(root, '/media/')
+    try:
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(root, 'products', f'photo-{i}.jpg')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            make_photo(path, seed=i)
+            paths.append(path)
+        names = [f"products/{os.path.basename(path)}" for path in paths]
+        urls = [storage.url(name) for name in names]
+
+        timings = []
+        variants = []
+        for name in names:
+            started = time.perf_counter()
+            variants.append(render_variants(name, storage))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Existing variants are reused (uploads are content-addressed): remove them to time a real render
+        shutil.rmtree(os.path.join(root, 'products', 'variants'))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(render_variants, names, [storage] * len(names)))
+        pool_ms = (time.perf_counter() - started) * 1000
+
+        def size(url):
+            return os.path.getsize(storage.path(storage.name(url)))
+
+        page = list(zip(paths, variants))[:args.page_size]
+        page_bytes = {'original': sum(os.path.getsize(path) for path, _ in page)}
+        for name in ('thumb', 'medium'):
+            for key in ('webp', 'jpeg'):
+                page_bytes[f'{name}_{key}'] = sum(size(entry[name][key]) for _, entry in page)
+        json_bytes = sum(len(json.dumps({url: entry})) for url, (_, entry) in zip(urls, page))
+
+        return {
+            'images': args.images,
+            'photo': f'{PHOTO_SIZE[0]}x{PHOTO_SIZE[1]}',
+            'page_size': len(page),
+            'page_bytes': page_bytes,
+            'variants_json_bytes': json_bytes,
+            'encode_ms': {'p50': round(percentile(timings, 50), 1), 'max': round(max(timings), 1)},
+            'pool': {'workers': args.workers, 'ms_per_image': round(pool_ms / args.images, 1)},
+            'decode_ms': {'full': time_decode(paths, draft=False), 'draft': time_decode(paths, draft=True)},
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def print_results(results):
+    page = results['page_bytes']
+    print(f"\n{'=' * 72}")
+    print(f"Image variants, {results['images']} photos of {results['photo']}")
+    print(f"{'=' * 72}")
+    print(f"Catalog page of {results['page_size']} tiles:")
+    for key, value in page.items():
+        print(f"  {key:<12} {value / 1e3:>10,.1f} KB  ({page['original'] / max(value, 1):,.0f}x smaller)")
+    print(f"  image_variants adds {results['variants_json_bytes'] / 1e3:.1f} KB of JSON (before gzip)")
+    print(f"encode p50 {results['encode_ms']['p50']:.0f} ms | max {results['encode_ms']['max']:.0f} ms per image")
+    print(f"thread pool ({results['pool']['workers']} workers): {results['pool']['ms_per_image']:.0f} ms per image")
+    print(f"JPEG decode {results['decode_ms']['full']:.0f} ms full size | {results['decode_ms']['draft']:.0f} ms in draft mode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the image variant pipeline')
+    parser.add_argument('--images', type=int, default=12, help='Synthetic photos to process')
+    parser.add_argument('--workers', type=int, default=4, help='Threads for the pool run')
+    parser.add_argument('--page-size', type=int, default=24, help='Tiles on a catalog page')
+    parser.add_argument('--json', action='store_true', help='Print a single JSON result line')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print_results(results)
+
+
+if __name__ == '__main__':
+    main()
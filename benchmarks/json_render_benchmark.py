@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the JSON renderers and parsers (kipenzi/json_renderers.py).
+
+Renders two 10k-product payloads with DRF's JSONRenderer and with
+FastJSONRenderer, then parses the result back with both parsers:
+- "serialized" is shaped like admin_get_all_products output: ProductSerializer
+  with nested batches, so Decimals and dates are already strings;
+- "raw" is shaped like the hand-built dicts in the reporting views, with
+  Decimal, UUID, date and aware datetime values left for the renderer.
+
+No database is needed; the payloads are built in memory.
+
+Usage:
+    python benchmarks/json_render_benchmark.py
+    python benchmarks/json_render_benchmark.py --products 50000 --repeat 10 --json
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_payloads(products, batches_per_product, seed=0):
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 15, 9, 30, 12, 123456, tzinfo=timezone.utc)
+    serialized = []
+    raw = []
+    for i in range(products):
+        product_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        price = Decimal(rng.randint(500, 500000)) / 100
+        created_at = now - timedelta(seconds=rng.randint(0, 10 ** 7))
+        expiry_date = date(2026, 1, 1) + timedelta(days=rng.randint(0, 700))
+        batches = []
+        for j in range(batches_per_product):
+            batches.append({
+                'batch_id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                'product': str(product_id),
+                'product_name': f'Product {i}',
+                'batch_number': f'B-{i}-{j}',
+                'supplier': 'Supplier Ltd',
+                'cost_price': str(price * Decimal('0.70')),
+                'selling_price': str(price),
+                'quantity_received': 100,
+                'quantity_remaining': rng.randint(0, 100),
+                'expiry_date': expiry_date.isoformat(),
+                'received_date': created_at.isoformat().replace('+00:00', 'Z'),
+                'is_active': True,
+                'created_at': created_at.isoformat().replace('+00:00', 'Z'),
+                'updated_at': created_at.isoformat().replace('+00:00', 'Z'),
+            })
+        serialized.append({
+            'product_id': str(product_id),
+            'name': f'Product {i}',
+            'description': f'Tablets, 500 mg – pack of {rng.randint(10, 100)}',
+            'price': str(price),
+            'image': f'https://cdn.example.com/products/{product_id}.jpg',
+            'images': [f'https://cdn.example.com/products/{product_id}-{k}.jpg' for k in range(3)],
+            'category': str(uuid.UUID(int=i % 50)),
+            'category_name': f'Category {i % 50}',
+            'brand': str(uuid.UUID(int=i % 200)),
+            'brand_name': f'Brand {i % 200}',
+            'product_type': str(uuid.UUID(int=i % 300)),
+            'product_type_name': f'Type {i % 300}',
+            'subtype': None,
+            'size': '500mg',
+            'color': None,
+            'material': None,
+            'weight': None,
+            'dimensions': None,
+            'is_active': True,
+            'is_featured': i % 5 == 0,
+            'stock_quantity': rng.randint(0, 500),
+            'minimum_stock': 10,
+            'expiry_date': expiry_date.isoformat(),
+            'batches': batches,
+            'created_at': created_at.isoformat().replace('+00:00', 'Z'),
+        })
+        raw.append({
+            'product_id': product_id,
+            'name': f'Product {i}',
+            'price': price,
+            'stock_quantity': rng.randint(0, 500),
+            'stock_value': price * rng.randint(0, 500),
+            'expiry_date': expiry_date,
+            'created_at': created_at,
+            'category__name': f'Category {i % 50}',
+        })
+    return {
+        'serialized': {'success': True, 'data': serialized},
+        'raw': {'success': True, 'data': raw},
+    }
+
+
+def best_of(repeat, func):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def run(args):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kipenzi.settings')
+    django.setup()
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from kipenzi import json_renderers
+    from kipenzi.json_renderers import FastJSONParser, FastJSONRenderer
+
+    payloads = build_payloads(args.products, args.batches)
+    results = {'orjson': json_renderers.orjson is not None, 'products': args.products, 'payloads': {}}
+    for name, payload in payloads.items():
+        stock_ms, stock_bytes = best_of(args.repeat, lambda: JSONRenderer().render(payload))
+        fast_ms, fast_bytes = best_of(args.repeat, lambda: FastJSONRenderer().render(payload))
+        stock_parse_ms, stock_data = best_of(args.repeat, lambda: JSONParser().parse(io.BytesIO(stock_bytes)))
+        fast_parse_ms, fast_data = best_of(args.repeat, lambda: FastJSONParser().parse(io.BytesIO(stock_bytes)))
+        results['payloads'][name] = {
+            'bytes': len(stock_bytes),
+            'render_ms': {'stock': round(stock_ms, 2), 'fast': round(fast_ms, 2)},
+            'render_speedup': round(stock_ms / fast_ms, 2) if fast_ms else None,
+            'parse_ms': {'stock': round(stock_parse_ms, 2), 'fast': round(fast_parse_ms, 2)},
+            'parse_speedup': round(stock_parse_ms / fast_parse_ms, 2) if fast_parse_ms else None,
+            'identical_output': stock_bytes == fast_bytes,
+            'equivalent_output': json.loads(stock_bytes) == json.loads(fast_bytes) and stock_data == fast_data,
+        }
+    return results
+
+
+def print_results(results):
+    print(f"\n{'=' * 72}")
+    print(f"JSON render/parse, {results['products']:,} products (orjson installed: {results['orjson']})")
+    print(f"{'=' * 72}")
+    for name, stats in results['payloads'].items():
+        render, parse = stats['render_ms'], stats['parse_ms']
+        print(f"{name:<11} {stats['bytes'] / 1e6:.1f} MB | render {render['stock']:.1f} -> {render['fast']:.1f} ms "
+              f"({stats['render_speedup']}x) | parse {parse['stock']:.1f} -> {parse['fast']:.1f} ms "
+              f"({stats['parse_speedup']}x)")
+        print(f"{'':<11} identical bytes: {stats['identical_output']} | same data: {stats['equivalent_output']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DRF JSON rendering/parsing against the orjson versions')
+    parser.add_argument('--products', type=int, default=10000, help='Products in each payload')
+    parser.add_argument('--batches', type=int, default=2, help='Nested batches per product')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    parser.add_argument('--json', action='store_true', help='Print a single JSON result line')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print_results(results)
+
+
+if __name__ == '__main__':
+    main()
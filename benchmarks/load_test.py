@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Load-test harness that replays recorded API traffic.
+
+Reads a JSONL traffic file (one request per line) and replays it with N
+concurrent clients (threads), either over HTTP against a running server or
+in-process through the project's WSGI application. Latencies are grouped by
+the URL pattern each path resolves to in hardware_backend/urls.py, so
+/products/<id>/ calls for different ids land in one bucket, and the result is
+written as JSON so two runs can be compared with --diff.
+
+Traffic line format (only "path" is required):
+    {"method": "GET", "path": "/v1/hardware/products/", "query": {"q": "paracetamol"},
+     "body": {...}, "headers": {"Authorization": "..."}, "think_ms": 200}
+
+Usage:
+    python benchmarks/load_test.py benchmarks/traffic/catalog_browse.jsonl --wsgi
+    python benchmarks/load_test.py traffic.jsonl --url http://localhost:8000 \\
+        --concurrency 50 --duration 60 --ramp-up 10 --think-time 100 --output run.json
+    python benchmarks/load_test.py --diff before.json after.json
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+# Add the project directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kipenzi.settings')
+    django.setup()
+
+
+def load_traffic(path):
+    """Parse the traffic file into request dicts with the body already encoded"""
+    traffic = []
+    with open(path) as handle:
+        for line_number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            record = json.loads(line)
+            if 'path' not in record:
+                raise ValueError(f'{path}:{line_number}: traffic entry has no "path"')
+            body = record.get('body')
+            if body is not None and not isinstance(body, str):
+                body = json.dumps(body)
+            query = record.get('query')
+            traffic.append({
+                'method': record.get('method', 'GET').upper(),
+                'path': record['path'],
+                'query_string': urlencode(query, doseq=True) if query else '',
+                'body': body.encode() if body is not None else b'',
+                'headers': record.get('headers', {}),
+                'think_ms': record.get('think_ms'),
+            })
+    if not traffic:
+        raise ValueError(f'{path}: no traffic entries')
+    return traffic
+
+
+class RouteResolver:
+    """Map request paths to their URL pattern, cached per distinct path"""
+
+    def __init__(self):
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, path):
+        route = self.cache.get(path)
+        if route is None:
+            from django.urls import Resolver404, resolve
+            try:
+                route = resolve(path).route
+            except Resolver404:
+                route = 'unresolved'
+            with self.lock:
+                self.cache[path] = route
+        return route
+
+
+class HTTPTarget:
+    """Send requests to a running server, one keep-alive connection per client"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        return connection
+
+    def send(self, request):
+        url = self.prefix + request['path']
+        if request['query_string']:
+            url += '?' + request['query_string']
+        headers = {'Content-Type': 'application/json', **request['headers']}
+        connection = self._connection()
+        try:
+            connection.request(request['method'], url, body=request['body'] or None, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except Exception:
+            # Drop the broken connection so the next request reconnects
+            connection.close()
+            self.local.connection = None
+            raise
+
+
+class WSGITarget:
+    """Call the Django WSGI application in this process, without a socket"""
+
+    def __init__(self):
+        from django.core.wsgi import get_wsgi_application
+        self.application = get_wsgi_application()
+
+    def send(self, request):
+        environ = {
+            'REQUEST_METHOD': request['method'],
+            'PATH_INFO': request['path'],
+            'QUERY_STRING': request['query_string'],
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(request['body'])),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(request['body']),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in request['headers'].items():
+            key = name.upper().replace('-', '_')
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = 'HTTP_' + key
+            environ[key] = value
+
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split(' ', 1)[0]))
+
+        body = self.application(environ, start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return status[0]
+
+
+def run_load(target, traffic, args):
+    """Replay the traffic with args.concurrency clients and return raw samples"""
+    resolver = RouteResolver()
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    errors = Counter()
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.ramp_up + args.duration if args.duration else None
+
+    def client(index):
+        rng = random.Random(args.seed + index)
+        time.sleep(args.ramp_up * index / args.concurrency)
+        local_samples = defaultdict(list)
+        local_statuses = defaultdict(Counter)
+        local_errors = Counter()
+        position = index % len(traffic)
+        sent = 0
+        while True:
+            if stop_at is not None:
+                if time.perf_counter() >= stop_at:
+                    break
+            elif sent >= args.iterations * len(traffic):
+                break
+            request = traffic[position]
+            position = (position + 1) % len(traffic)
+            sent += 1
+
+            route = resolver(request['path'])
+            started = time.perf_counter()
+            try:
+                status = target.send(request)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            local_samples[route].append(elapsed_ms)
+            local_statuses[route][str(status)] += 1
+            if not isinstance(status, int) or status >= args.error_status:
+                local_errors[route] += 1
+
+            think_ms = request['think_ms'] if request['think_ms'] is not None else args.think_time
+            if think_ms:
+                # Jitter by +/-50% so clients do not fire in lockstep
+                time.sleep(think_ms * rng.uniform(0.5, 1.5) / 1000)
+
+        with lock:
+            for route, values in local_samples.items():
+                samples[route].extend(values)
+                statuses[route].update(local_statuses[route])
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return samples, statuses, errors, elapsed
+
+
+def summarize(latencies, status_counts, error_count, elapsed=None):
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'errors': error_count,
+        'error_rate': round(error_count / count, 4) if count else 0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 3) if latencies else 0,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3) if latencies else 0,
+        },
+        'status_codes': dict(sorted(status_counts.items())),
+    }
+    if elapsed:
+        summary['throughput_rps'] = round(count / elapsed, 1)
+    return summary
+
+
+def build_result(args, samples, statuses, errors, elapsed):
+    all_latencies = [value for values in samples.values() for value in values]
+    all_statuses = Counter()
+    for counts in statuses.values():
+        all_statuses.update(counts)
+    return {
+        'target': args.url or 'wsgi',
+        'traffic_file': args.traffic,
+        'concurrency': args.concurrency,
+        'ramp_up_s': args.ramp_up,
+        'think_time_ms': args.think_time,
+        'duration_s': args.duration,
+        'iterations': None if args.duration else args.iterations,
+        'elapsed_s': round(elapsed, 3),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'total': summarize(all_latencies, all_statuses, sum(errors.values()), elapsed),
+        'routes': {
+            route: summarize(samples[route], statuses[route], errors[route], elapsed)
+            for route in sorted(samples)
+        },
+    }
+
+
+def print_result(result):
+    total = result['total']
+    print(f"\n{'=' * 100}")
+    print(f"{result['target']} | concurrency {result['concurrency']} | {result['elapsed_s']}s | "
+          f"{total['requests']} requests | {total['throughput_rps']} req/s | "
+          f"error rate {total['error_rate']:.2%}")
+    print(f"{'=' * 100}")
+    print(f"{'route':<52} {'reqs':>7} {'err%':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, stats in result['routes'].items():
+        latency = stats['latency_ms']
+        print(f"{route[:52]:<52} {stats['requests']:>7} {stats['error_rate']:>7.2%} "
+              f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}")
+
+
+def print_diff(before_path, after_path):
+    """Compare two result files route by route (negative deltas are faster)"""
+    with open(before_path) as handle:
+        before = json.load(handle)
+    with open(after_path) as handle:
+        after = json.load(handle)
+
+    def delta(old, new):
+        if not old:
+            return '     n/a'
+        return f'{(new - old) / old:>+8.1%}'
+
+    print(f"{'route':<44} {'p50 before':>10} {'p50 after':>10} {'Δp50':>8} "
+          f"{'p95 before':>10} {'p95 after':>10} {'Δp95':>8} {'err% after':>10}")
+    routes = sorted(set(before['routes']) | set(after['routes']))
+    for route in ['(total)'] + routes:
+        old = before['total'] if route == '(total)' else before['routes'].get(route)
+        new = after['total'] if route == '(total)' else after['routes'].get(route)
+        if old is None or new is None:
+            print(f"{route[:44]:<44} only in {'after' if old is None else 'before'}")
+            continue
+        old_latency, new_latency = old['latency_ms'], new['latency_ms']
+        print(f"{route[:44]:<44} {old_latency['p50']:>10.1f} {new_latency['p50']:>10.1f} "
+              f"{delta(old_latency['p50'], new_latency['p50'])} {old_latency['p95']:>10.1f} "
+              f"{new_latency['p95']:>10.1f} {delta(old_latency['p95'], new_latency['p95'])} "
+              f"{new['error_rate']:>10.2%}")
+    old_rps, new_rps = before['total'].get('throughput_rps'), after['total'].get('throughput_rps')
+    if old_rps and new_rps:
+        print(f"\nThroughput: {old_rps} -> {new_rps} req/s ({(new_rps - old_rps) / old_rps:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded API traffic and report latency per route')
+    parser.add_argument('traffic', nargs='?', help='JSONL traffic file')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='Base URL of a running server, e.g. http://localhost:8000')
+    target.add_argument('--wsgi', action='store_true', help='Call the WSGI application in-process (default)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Number of concurrent clients (threads)')
+    parser.add_argument('--duration', type=float, default=0, help='Seconds to run after ramp-up (overrides --iterations)')
+    parser.add_argument('--iterations', type=int, default=1, help='Times each client replays the traffic file')
+    parser.add_argument('--ramp-up', type=float, default=0, help='Seconds over which clients are started')
+    parser.add_argument('--think-time', type=float, default=0, help='Mean pause between requests in ms')
+    parser.add_argument('--timeout', type=float, default=30, help='HTTP timeout in seconds')
+    parser.add_argument('--error-status', type=int, default=500, help='Lowest HTTP status counted as an error')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for think-time jitter')
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    parser.add_argument('--json', action='store_true', help='Print the JSON result instead of a table')
+    parser.add_argument('--diff', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.diff:
+        print_diff(*args.diff)
+        return
+    if not args.traffic:
+        parser.error('a traffic file is required unless --diff is given')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+
+    # Needed in both modes: routes are resolved against the project's URLconf
+    setup_django()
+    traffic = load_traffic(args.traffic)
+    runner = HTTPTarget(args.url, args.timeout) if args.url else WSGITarget()
+
+    samples, statuses, errors, elapsed = run_load(runner, traffic, args)
+    result = build_result(args, samples, statuses, errors, elapsed)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(result, handle, indent=2)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_result(result)
+        if args.output:
+            print(f'\nResult written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     BusinessUser, ProductCategory, Brand, ProductType, 
-    Product, ProductBatch, Banner, HardwareOTP, Order, OrderItem,
+    Product, ProductBatch, ProductCode, Banner, HardwareOTP, Order, OrderItem,
     Invoice, InvoiceItem
 )
 
@@ -45,6 +45,15 @@ class ProductBatchAdmin(admin.ModelAdmin):
     readonly_fields = ['batch_id', 'received_date', 'created_at', 'updated_at']
     ordering = ['-received_date']
 
+@admin.register(ProductCode)
+class ProductCodeAdmin(admin.ModelAdmin):
+    list_display = ['code', 'product', 'pack_type', 'created_at']
+    list_filter = ['pack_type']
+    search_fields = ['code', 'product__name']
+    readonly_fields = ['code_id', 'created_at', 'updated_at']
+    raw_id_fields = ['product']
+    ordering = ['code']
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['product_id', 'name', 'category', 'brand', 'price', 'is_active', 'is_featured', 'stock_quantity']
@@ -133,6 +142,21 @@ class InvoiceItemAdmin(admin.ModelAdmin):
     search_fields = ['product_name', 'invoice__invoice_number', 'invoice__invoice_id']
     readonly_fields = ['invoice_item_id', 'total_price', 'created_at', 'updated_at']
     ordering = ['-created_at']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.invoice.calculate_totals()
+    
+    def delete_model(self, request, obj):
+        invoice = obj.invoice
+        super().delete_model(request, obj)
+        invoice.calculate_totals()
+    
+    def delete_queryset(self, request, queryset):
+        invoices = list(Invoice.objects.filter(invoice_items__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for invoice in invoices:
+            invoice.calculate_totals()
 
 
 @admin.register(Invoice)
@@ -0,0 +1,204 @@
+"""
+In-memory prefix index for POS product lookup: products/autocomplete/?q=.
+
+Cashiers type two or three letters and expect suggestions while typing, so
+the lookup never touches the database. Active product names and brand names
+are normalized (case and accents folded, punctuation collapsed to spaces)
+and kept as sorted arrays; a query is a bisect to the first key starting with
+it and a walk forward until `limit` products are found. Suggestions come in
+three tiers, each in alphabetical order:
+
+    1. product names starting with the query        "amox" -> "Amoxicillin 500mg"
+    2. product names with a word starting with it   "500"  -> "Amoxicillin 500mg"
+    3. products of a brand whose name matches       "pfiz" -> Pfizer's products
+
+Keys are cut to MAX_KEY_LENGTH characters, which bounds memory (about one key
+per word of every product name) and is longer than anything typed at a till.
+
+The index is built on the first lookup in each process, not at import:
+under gunicorn --preload a build started in the master would hold
+_build_lock across the fork and deadlock the workers (a forked child gets a
+fresh lock for the same reason). It is rebuilt when the catalog version
+(conditional_get's stamp of the product and brand tables) changes. The version is checked at most every
+AUTOCOMPLETE_REFRESH_SECONDS; a rebuild runs in a background thread while
+the previous index keeps answering, unless AUTOCOMPLETE_BACKGROUND is off.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+
+from kipenzi.conditional import version_stamp
+
+from .models import Brand, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_KEY_LENGTH = 40
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+_index = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def normalize(text):
+    """'Crème  Brûlée-500ml' -> 'creme brulee 500ml'"""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return NON_WORD_RE.sub(' ', text.casefold()).strip()
+
+
+def word_starts(text):
+    """Offsets of the words after the first one in a normalized string"""
+    return [offset + 1 for offset, char in enumerate(text) if char == ' ']
+
+
+class PrefixIndex:
+    """Immutable sorted-array prefix index over (product_id, name, brand_name) rows"""
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        rows = sorted((normalize(name), product_id, name, brand_name) for product_id, name, brand_name in rows)
+        self.ids = [row[1] for row in rows]
+        self.names = [row[2] for row in rows]
+        self.brand_names = [row[3] for row in rows]
+
+        # Tier 1 keeps the products' name order, so no sort is needed
+        self.name_keys = [row[0][:MAX_KEY_LENGTH] for row in rows]
+
+        words = []
+        brands = {}
+        for position, (text, _, _, brand_name) in enumerate(rows):
+            words.extend((text[start:start + MAX_KEY_LENGTH], position) for start in word_starts(text))
+            brands.setdefault(brand_name, []).append(position)
+        words.sort()
+        self.word_keys = [key for key, _ in words]
+        self.word_targets = array('i', (position for _, position in words))
+
+        brand_entries = []
+        for brand_name, positions in brands.items():
+            text = normalize(brand_name)[:MAX_KEY_LENGTH]
+            brand_entries.extend((text[start:], positions) for start in [0] + word_starts(text))
+        brand_entries.sort(key=lambda entry: entry[0])
+        self.brand_keys = [key for key, _ in brand_entries]
+        self.brand_targets = [positions for _, positions in brand_entries]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Up to `limit` products matching `query`, as [{'product_id', 'name', 'brand_name'}]"""
+        prefix = normalize(query)[:MAX_KEY_LENGTH]
+        if not prefix or limit < 1:
+            return []
+
+        found = []
+        seen = set()
+
+        def add(position):
+            if position not in seen:
+                seen.add(position)
+                found.append(position)
+            return len(found) >= limit
+
+        for keys, targets in ((self.name_keys, None), (self.word_keys, self.word_targets)):
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                if add(i if targets is None else targets[i]):
+                    return self.rows(found)
+                i += 1
+
+        i = bisect_left(self.brand_keys, prefix)
+        while i < len(self.brand_keys) and self.brand_keys[i].startswith(prefix):
+            for position in self.brand_targets[i]:
+                if add(position):
+                    return self.rows(found)
+            i += 1
+        return self.rows(found)
+
+    def rows(self, positions):
+        return [
+            {'product_id': self.ids[i], 'name': self.names[i], 'brand_name': self.brand_names[i]}
+            for i in positions
+        ]
+
+
+def catalog_version():
+    return tuple(version_stamp([Product, Brand]))
+
+
+def build_index(version=None):
+    """Read the active products and build a new index (two queries, one if `version` is known)"""
+    if version is None:
+        version = catalog_version()
+    rows = Product.objects.filter(is_active=True).values_list('product_id', 'name', 'brand__name')
+    return PrefixIndex(rows.iterator(chunk_size=5000), version=version)
+
+
+def rebuild(version=None):
+    global _index, _checked_at
+    started = time.perf_counter()
+    index = build_index(version)
+    _index, _checked_at = index, time.monotonic()
+    logger.info('Autocomplete index built: %s products in %.0f ms', len(index), (time.perf_counter() - started) * 1000)
+    return index
+
+
+def refresh_in_background():
+    """Rebuild the index in a daemon thread unless a build is already running"""
+    if not _build_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            rebuild()
+        except Exception:
+            logger.exception('Autocomplete index build failed')
+        finally:
+            _build_lock.release()
+            connections.close_all()
+
+    threading.Thread(target=run, name='autocomplete-index', daemon=True).start()
+    return True
+
+
+def reset_after_fork():
+    """In a forked child: the parent's build thread is gone, and a lock it held would never be released"""
+    global _build_lock
+    _build_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def get_index():
+    """The current index, rebuilt if the catalog changed since it was built"""
+    global _checked_at
+    index = _index
+    if index is None:
+        with _build_lock:
+            return _index if _index is not None else rebuild()
+
+    if time.monotonic() - _checked_at < getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 30):
+        return index
+    _checked_at = time.monotonic()
+    version = catalog_version()
+    if index.version == version:
+        return index
+    if getattr(settings, 'AUTOCOMPLETE_BACKGROUND', True):
+        refresh_in_background()
+        return index
+    with _build_lock:
+        return rebuild(version)
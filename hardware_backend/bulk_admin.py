@@ -0,0 +1,134 @@
+"""
+Bulk admin changes: one action applied to a list of ids with a single
+set-based UPDATE or DELETE.
+
+    POST admin/products/bulk/     {"ids": [...], "action": "set_price", "value": "1500.00"}
+    POST admin/categories/bulk/   {"ids": [...], "action": "deactivate"}
+    POST admin/brands/bulk/       {"ids": [...], "action": "delete"}
+    POST admin/users/bulk/        {"ids": [...], "action": "verify"}
+
+The actions of each target are listed in BULK_ACTIONS. An UPDATE skips the
+rows that already have the new value and sets updated_at on the rest
+(QuerySet.update() skips auto_now), so the catalog version stamps behind
+ETags, delta sync, the autocomplete index and the snapshot move once for the
+whole batch. A delete goes through delete_with_tombstones(), which records
+the deleted and cascaded catalog rows for delta sync. move_category also
+moves each product to a product type of the new category (move_category()).
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog_sync import delete_with_tombstones
+from .models import Brand, BusinessUser, Product, ProductCategory, ProductType
+
+MAX_BULK_IDS = 1000
+
+DELETE = 'delete'
+VALUE = object()  # the action's value comes from the request
+ACTIVATE = {'activate': ('is_active', True), 'deactivate': ('is_active', False), 'delete': DELETE}
+
+
+def move_category(queryset, value):
+    """
+    Move products to another category, with a product type of that category:
+    value is a category id, or {"category", "product_type"}. Given only a
+    category, each product takes the type of the same name in it; if one has
+    no such type, nothing is moved. One UPDATE per product type moved.
+    """
+    category, product_type = (value.get('category'), value.get('product_type')) if isinstance(value, dict) else (value, None)
+    category = clean_value(Product._meta.get_field('category'), category)
+    now = timezone.now()
+
+    if product_type is not None:
+        if not ProductType.objects.filter(pk=product_type, category_id=category).exists():
+            raise ValueError('value: product_type must be a product type of the category')
+        return queryset.exclude(category_id=category, product_type_id=product_type).update(
+            category_id=category, product_type_id=product_type, updated_at=now
+        )
+
+    moving = queryset.exclude(category_id=category)
+    old_types = dict(ProductType.objects.filter(pk__in=moving.values('product_type')).values_list('pk', 'name'))
+    new_types = {name.casefold(): pk for pk, name in ProductType.objects.filter(category_id=category).values_list('pk', 'name')}
+    missing = sorted({name for name in old_types.values() if name.casefold() not in new_types})
+    if missing:
+        raise ValueError(
+            f'value: the category has no product type called {", ".join(missing)}; '
+            f'give {{"category": ..., "product_type": ...}} to choose one'
+        )
+    return sum(
+        moving.filter(product_type_id=old_type).update(
+            category_id=category, product_type_id=new_types[name.casefold()], updated_at=now
+        )
+        for old_type, name in old_types.items()
+    )
+
+
+# target -> (model, {action: (field, new value), DELETE, or a function(queryset, value) -> affected})
+BULK_ACTIONS = {
+    'products': (Product, {
+        **ACTIVATE,
+        'set_price': ('price', VALUE),
+        'set_minimum_stock': ('minimum_stock', VALUE),
+        'move_category': move_category,
+    }),
+    'categories': (ProductCategory, ACTIVATE),
+    'brands': (Brand, ACTIVATE),
+    'users': (BusinessUser, {'verify': ('is_verified', True), 'unverify': ('is_verified', False), 'delete': DELETE}),
+}
+
+
+def clean_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('ids must be a non-empty list')
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'At most {MAX_BULK_IDS} ids per request')
+    if not all(isinstance(pk, str) and pk for pk in ids):
+        raise ValueError('ids must be strings')
+    return list(dict.fromkeys(ids))
+
+
+def clean_value(field, value):
+    """The request's value checked against the model field (a foreign key must exist)"""
+    try:
+        value = field.clean(value, None)
+    except ValidationError as e:
+        raise ValueError(f'value: {" ".join(e.messages)}')
+    if isinstance(value, (int, Decimal)) and value < 0:
+        raise ValueError('value: must not be negative')
+    return value
+
+
+def run(target, ids, action, value=None):
+    """Apply `action` to the `target` rows with the given ids; ValueError for a bad request"""
+    model, actions = BULK_ACTIONS[target]
+    if action not in actions:
+        raise ValueError(f'action must be one of: {", ".join(actions)}')
+    ids = clean_ids(ids)
+    queryset = model.objects.filter(pk__in=ids)
+
+    with transaction.atomic():
+        if actions[action] == DELETE:
+            _, deleted = delete_with_tombstones(queryset)
+            deleted = {apps.get_model(label)._meta.db_table: count for label, count in deleted.items() if count}
+            return {
+                'action': action,
+                'requested': len(ids),
+                'affected': deleted.get(model._meta.db_table, 0),
+                'deleted': deleted,
+            }
+
+        if callable(actions[action]):
+            return {'action': action, 'requested': len(ids), 'affected': actions[action](queryset, value)}
+
+        name, new_value = actions[action]
+        field = model._meta.get_field(name)
+        if new_value is VALUE:
+            new_value = clean_value(field, value)
+        affected = queryset.exclude(**{field.attname: new_value}).update(
+            **{field.attname: new_value, 'updated_at': timezone.now()}
+        )
+    return {'action': action, 'requested': len(ids), 'affected': affected}
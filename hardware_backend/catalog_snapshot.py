@@ -0,0 +1,213 @@
+"""
+Compressed catalog snapshot for offline POS boot.
+
+A new till downloads one file instead of paging through the product
+endpoints. catalog/snapshot/ returns a small manifest (name, url, size,
+sha256, token); the file itself is served from catalog/snapshot/<name> with
+range support, so an interrupted download resumes, and is cached forever
+because its name is the SHA-256 of its content.
+
+The file is gzip NDJSON. The first line is a header,
+
+    {"type": "meta", "version": ..., "token": ..., "generated_at": ..., "entities": [...]}
+
+and every other line is one row, {"type": "<entity>", "data": {...}}, with
+the entities and row shapes of the delta-sync endpoint (catalog_sync.py):
+products, prices, barcodes, batches and shelf locations plus the categories,
+brands, product types, banners and shelves they reference. After loading it
+the till calls catalog/changes/?since=<token> to catch up with anything newer.
+
+build_snapshot() only writes a new file when the catalog version (the
+conditional_get stamp of the catalog tables) differs from the current
+snapshot's. It runs from the build_catalog_snapshot command (cron, deploys)
+and, with CATALOG_SNAPSHOT_BACKGROUND on, in a background thread started by
+a manifest request that finds the snapshot out of date; that request is
+answered with the previous snapshot, which the delta endpoint brings current.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from kipenzi.conditional import version_stamp
+from kipenzi.json_renderers import FastJSONRenderer
+
+from .catalog_sync import SYNC_ENTITIES, active, make_token
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'catalog-latest.json'
+SNAPSHOT_NAME_RE = re.compile(r'^catalog-([0-9a-f]{64})\.ndjson\.gz$')
+CHUNK_SIZE = 2000  # rows rendered per query
+KEEP_SNAPSHOTS = 2  # the current file and the previous one, for downloads in flight
+
+_build_lock = threading.Lock()
+_renderer = FastJSONRenderer()
+
+
+def snapshot_dir():
+    return getattr(settings, 'CATALOG_SNAPSHOT_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'catalog')
+
+
+def find_snapshot(name):
+    """(path, sha256) of a snapshot file by name, or None if there is no such snapshot"""
+    match = SNAPSHOT_NAME_RE.match(name)
+    if not match:
+        return None
+    path = os.path.join(snapshot_dir(), name)
+    return (path, match.group(1)) if os.path.isfile(path) else None
+
+
+def catalog_version():
+    stamp = version_stamp([model for _, model, _ in SYNC_ENTITIES])
+    return hashlib.sha256('\n'.join(str(value) for value in stamp).encode()).hexdigest()[:32]
+
+
+def read_manifest():
+    """The manifest of the current snapshot, or None if there is none yet"""
+    try:
+        with open(os.path.join(snapshot_dir(), MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if find_snapshot(manifest.get('name', '')) else None
+
+
+def iter_rows(model, fieldset):
+    """Active rows of one entity in primary key order, CHUNK_SIZE per query"""
+    queryset = active(model.objects.order_by('pk'))
+    pk_name = model._meta.pk.name
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = fieldset.data(page[:CHUNK_SIZE], many=True)
+        yield from rows
+        if len(rows) < CHUNK_SIZE:
+            return
+        last = rows[-1][pk_name]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def remove_old_snapshots(directory):
+    snapshots = sorted(
+        (entry for entry in os.scandir(directory) if SNAPSHOT_NAME_RE.match(entry.name)),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in snapshots[KEEP_SNAPSHOTS:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def build_snapshot(force=False):
+    """Write a new snapshot if the catalog changed since the current one; returns the manifest"""
+    version = catalog_version()
+    manifest = read_manifest()
+    if manifest is not None and manifest['version'] == version and not force:
+        return manifest
+
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    # Taken before the first row is read: whatever changes during the build
+    # is picked up by catalog/changes/?since=<token>
+    now = timezone.now()
+    header = {
+        'type': 'meta',
+        'version': version,
+        'token': make_token(now),
+        'generated_at': now,
+        'entities': [entity for entity, _, _ in SYNC_ENTITIES],
+    }
+
+    counts = {}
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as out:
+            out.write(_renderer.render(header) + b'\n')
+            for entity, model, fieldset in SYNC_ENTITIES:
+                counts[entity] = 0
+                for row in iter_rows(model, fieldset):
+                    out.write(_renderer.render({'type': entity, 'data': row}) + b'\n')
+                    counts[entity] += 1
+        digest = file_sha256(tmp_path)
+        name = f'catalog-{digest}.ndjson.gz'
+        path = os.path.join(directory, name)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    manifest = {
+        'name': name,
+        'sha256': digest,
+        'size': os.path.getsize(path),
+        'version': version,
+        'token': header['token'],
+        'generated_at': now.isoformat(),
+        'counts': counts,
+    }
+    write_json_atomic(os.path.join(directory, MANIFEST_NAME), manifest)
+    remove_old_snapshots(directory)
+    logger.info('Catalog snapshot %s written (%s bytes, %s)', name, manifest['size'], counts)
+    return manifest
+
+
+def refresh_in_background():
+    """Rebuild the snapshot in a daemon thread unless a build is already running"""
+    if not _build_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            build_snapshot()
+        except Exception:
+            logger.exception('Catalog snapshot build failed')
+        finally:
+            _build_lock.release()
+            connections.close_all()
+
+    threading.Thread(target=run, name='catalog-snapshot', daemon=True).start()
+    return True
+
+
+def current_snapshot():
+    """The manifest to hand out, with "stale" set while a newer snapshot is being built"""
+    manifest = read_manifest()
+    if manifest is None:
+        # Nothing to serve yet: build it now (or wait for the build in progress)
+        with _build_lock:
+            return dict(build_snapshot(), stale=False)
+
+    stale = manifest['version'] != catalog_version()
+    if stale and getattr(settings, 'CATALOG_SNAPSHOT_BACKGROUND', True):
+        refresh_in_background()
+    elif stale:
+        with _build_lock:
+            manifest = build_snapshot()
+        stale = False
+    return dict(manifest, stale=stale)
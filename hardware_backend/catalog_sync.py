@@ -0,0 +1,152 @@
+"""
+Catalog delta sync for mobile and POS clients: catalog/changes/?since=<token>.
+
+A client keeps the token from its last sync and asks only for what changed
+since then. Each entity (categories, brands, product_types, products,
+barcodes, batches, banners, shelves, and shelf locations) comes back as
+
+    changed       active rows created or updated since the token
+    deactivated   ids of rows switched to is_active=False since the token
+                  (always empty for codes and locations, which have no
+                  is_active)
+    deleted       ids of deleted rows, from the CatalogTombstone rows that
+                  delete_with_tombstones() writes in the admin delete and
+                  bulk views
+
+Without a token, or with one older than CATALOG_TOMBSTONE_RETENTION_DAYS
+(tombstones are pruned after that), the response is a full snapshot of the
+active catalog with "full": true and the client replaces its copy.
+
+Rows carry foreign keys as ids and leave out denormalized names
+(category_name, ...) and nested batches: those change without the row's own
+updated_at moving, so a delta could not keep them current. The client joins
+on the ids instead.
+
+A token is a server timestamp. Rows are matched from
+CATALOG_SYNC_OVERLAP_SECONDS before it, so a save that commits just after a
+sync started is not missed; such a row may arrive twice, which an upsert on
+the client absorbs.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from .fieldsets import Fieldset
+from .models import (
+    Banner, Brand, CatalogTombstone, Product, ProductBatch, ProductCategory, ProductCode, ProductLocation,
+    ProductType, Shelf
+)
+from .serializers import (
+    BannerSerializer, BrandSerializer, ProductBatchSerializer, ProductCategorySerializer, ProductCodeSerializer,
+    ProductLocationSerializer, ProductSerializer, ProductTypeSyncSerializer, ShelfSerializer
+)
+
+# (entity, model, fieldset) in the order clients should apply them
+SYNC_ENTITIES = [
+    ('categories', ProductCategory, Fieldset(ProductCategorySerializer)),
+    ('brands', Brand, Fieldset(BrandSerializer)),
+    ('product_types', ProductType, Fieldset(ProductTypeSyncSerializer)),
+    ('products', Product, Fieldset(ProductSerializer, fields=(
+        'product_id,name,description,price,image,images,image_variants,category,brand,product_type,subtype,size,'
+        'color,material,weight,dimensions,is_active,is_featured,stock_quantity,minimum_stock,'
+        'expiry_date,created_at'
+    ))),
+    ('codes', ProductCode, Fieldset(ProductCodeSerializer)),
+    ('batches', ProductBatch, Fieldset(ProductBatchSerializer, fields=(
+        'batch_id,product,batch_number,supplier,cost_price,selling_price,quantity_received,'
+        'quantity_remaining,expiry_date,received_date,is_active,created_at,updated_at'
+    ))),
+    ('banners', Banner, Fieldset(BannerSerializer)),
+    ('shelves', Shelf, Fieldset(ShelfSerializer)),
+    ('locations', ProductLocation, Fieldset(ProductLocationSerializer, fields=(
+        'location_id,product,shelf,quantity,created_at,updated_at'
+    ))),
+]
+ENTITY_BY_MODEL = {model: entity for entity, model, _ in SYNC_ENTITIES}
+
+
+def has_is_active(model):
+    return any(field.name == 'is_active' for field in model._meta.concrete_fields)
+
+
+def active(queryset):
+    """Only the active rows, for models that can be deactivated"""
+    return queryset.filter(is_active=True) if has_is_active(queryset.model) else queryset
+
+
+def make_token(moment):
+    """Opaque sync token for a point in time (microseconds since the epoch)"""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_token(token):
+    """The point in time a token stands for; ValueError if it is not a token"""
+    if not token.isdigit():
+        raise ValueError(f'Invalid sync token: {token}')
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+
+def changes_since(token=None):
+    """Catalog changes since `token` (None for a full snapshot) and the next token"""
+    now = timezone.now()
+    since = parse_token(token) if token else None
+    retention = timedelta(days=getattr(settings, 'CATALOG_TOMBSTONE_RETENTION_DAYS', 90))
+    full = since is None or since < now - retention
+
+    changes = {}
+    if full:
+        for entity, model, fieldset in SYNC_ENTITIES:
+            rows = active(model.objects.order_by('pk'))
+            changes[entity] = {'changed': fieldset.data(rows, many=True), 'deactivated': [], 'deleted': []}
+    else:
+        since -= timedelta(seconds=getattr(settings, 'CATALOG_SYNC_OVERLAP_SECONDS', 5))
+        for entity, model, fieldset in SYNC_ENTITIES:
+            updated = model.objects.filter(updated_at__gte=since).order_by('pk')
+            deactivated = []
+            if has_is_active(model):
+                deactivated = list(updated.filter(is_active=False).values_list('pk', flat=True))
+            changes[entity] = {
+                'changed': fieldset.data(active(updated), many=True),
+                'deactivated': deactivated,
+                'deleted': [],
+            }
+        tombstones = CatalogTombstone.objects.filter(deleted_at__gte=since).order_by('deleted_at')
+        for entity, object_id in tombstones.values_list('entity', 'object_id'):
+            if entity in changes:
+                changes[entity]['deleted'].append(object_id)
+
+    return {'token': make_token(now), 'full': full, 'changes': changes}
+
+
+def delete_with_tombstones(objs):
+    """
+    Delete a model instance or a queryset, writing a tombstone for each synced
+    row deleted, including the rows the delete cascades to (deleting a
+    category also deletes its product types and products), in the same
+    transaction. Returns delete()'s (total, {model label: count}).
+    """
+    if isinstance(objs, models.Model):
+        using = router.db_for_write(type(objs), instance=objs)
+        targets = [objs]
+    else:
+        using = router.db_for_write(objs.model)
+        targets = objs
+    with transaction.atomic(using=using):
+        collector = Collector(using=using, origin=objs)
+        collector.collect(targets)
+
+        tombstones = []
+        for model, instances in collector.data.items():
+            if model in ENTITY_BY_MODEL:
+                tombstones += [CatalogTombstone(entity=ENTITY_BY_MODEL[model], object_id=obj.pk) for obj in instances]
+        for queryset in collector.fast_deletes:
+            if queryset.model in ENTITY_BY_MODEL:
+                entity = ENTITY_BY_MODEL[queryset.model]
+                tombstones += [
+                    CatalogTombstone(entity=entity, object_id=pk) for pk in queryset.values_list('pk', flat=True)
+                ]
+        CatalogTombstone.objects.using(using).bulk_create(tombstones)
+        return collector.delete()
@@ -0,0 +1,210 @@
+"""
+Compiled read-only serialization for hot list endpoints.
+
+compile_serializer() walks a serializer instance once (after any ?fields=
+pruning, see fieldsets.py) and turns each readable field into a
+(key, getter, converter) entry. Rendering a row is then one loop over that
+list instead of DRF's per-field get_attribute / to_representation dispatch.
+The converters reproduce DRF's to_representation for the field types the
+models use (char, integer, boolean, decimal, date, datetime, choice, JSON,
+primary-key relations, nested and method fields); anything else, and any
+value of an unexpected type, is handed to the DRF field itself, so the output
+is identical to serializer.data. When no field needs a model instance the
+plan can also render straight from .values() rows.
+"""
+import datetime
+import decimal
+from operator import attrgetter
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import SkipField, get_attribute
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import ISO_8601, api_settings
+
+_UTC = datetime.timezone.utc
+
+
+class FastSerializer:
+    """A compiled serializer: render(instance), render_many(iterable), render_rows(values rows)"""
+
+    def __init__(self, entries, lookups):
+        self.entries = entries
+        # .values() lookups per key, or None when a field needs the model instance
+        self.lookups = lookups
+
+    def render(self, instance):
+        ret = {}
+        for key, getter, convert, field in self.entries:
+            try:
+                value = getter(instance)
+            except (AttributeError, KeyError, ObjectDoesNotExist):
+                try:
+                    value = field.get_attribute(instance)
+                except SkipField:
+                    continue
+            ret[key] = None if value is None else convert(value)
+        return ret
+
+    def render_many(self, instances):
+        if isinstance(instances, models.Manager):
+            instances = instances.all()
+        render = self.render
+        return [render(instance) for instance in instances]
+
+    def render_rows(self, rows):
+        entries = [(key, lookup, convert) for (key, _, convert, _), lookup in zip(self.entries, self.lookups)]
+        ret = []
+        for row in rows:
+            item = {}
+            for key, lookup, convert in entries:
+                value = row[lookup]
+                item[key] = None if value is None else convert(value)
+            ret.append(item)
+        return ret
+
+
+def compile_serializer(serializer):
+    """Compile a (possibly pruned) serializer instance into a FastSerializer"""
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    entries = []
+    lookups = []
+    for field in serializer._readable_fields:
+        getter, lookup = _getter(field, model)
+        convert = _converter(field)
+        if convert is None:
+            lookup = None
+            convert = field.to_representation
+        entries.append((field.field_name, getter, convert, field))
+        lookups.append(lookup)
+    return FastSerializer(entries, lookups if None not in lookups else None)
+
+
+def _getter(field, model):
+    """Attribute getter for the field's source and its .values() lookup (None if there is none)"""
+    if field.source == '*':
+        return (lambda instance: instance), None
+
+    attrs = field.source_attrs
+    if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None and model is not None:
+        # DRF reads the local foreign key column instead of loading the related row
+        *path, name = attrs
+        try:
+            attname = _model_field(model, path, name).attname
+        except LookupError:
+            pass
+        else:
+            return attrgetter('.'.join([*path, attname])), (name if not path else None)
+
+    if model is not None and _is_column_path(model, attrs):
+        return attrgetter('.'.join(attrs)), '__'.join(attrs)
+    # Properties, methods (get_status_display) and reverse relations: DRF's own lookup
+    return (lambda instance: get_attribute(instance, attrs)), None
+
+
+def _model_field(model, path, name):
+    for attr in path:
+        try:
+            relation = model._meta.get_field(attr)
+        except Exception:
+            raise LookupError(attr)
+        if not relation.is_relation or relation.many_to_many or relation.one_to_many:
+            raise LookupError(attr)
+        model = relation.related_model
+    try:
+        return model._meta.get_field(name)
+    except Exception:
+        raise LookupError(name)
+
+
+def _is_column_path(model, attrs):
+    """True when attrs walk forward relations to a concrete non-relation column"""
+    try:
+        field = _model_field(model, attrs[:-1], attrs[-1])
+    except LookupError:
+        return False
+    return field.concrete and not field.is_relation
+
+
+def _converter(field):
+    """Fast to_representation for the field, or None to use the field's own"""
+    if isinstance(field, serializers.ListSerializer):
+        child = compile_serializer(field.child)
+        return child.render_many
+    if isinstance(field, serializers.BaseSerializer):
+        return compile_serializer(field).render
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    kind = type(field)
+    if kind in (serializers.CharField, serializers.EmailField, serializers.URLField, serializers.SlugField):
+        return lambda value: value if value.__class__ is str else str(value)
+    if kind is serializers.IntegerField:
+        return lambda value: value if value.__class__ is int else int(value)
+    if kind is serializers.BooleanField:
+        fallback = field.to_representation
+        return lambda value: value if value.__class__ is bool else fallback(value)
+    if kind is serializers.ReadOnlyField:
+        return lambda value: value
+    if kind is serializers.JSONField and not field.binary:
+        return lambda value: value
+    if kind is serializers.ChoiceField:
+        choices = field.choice_strings_to_values
+        return lambda value: value if value == '' else choices.get(str(value), value)
+    if kind is PrimaryKeyRelatedField and field.pk_field is None:
+        return lambda value: value
+    if kind is serializers.DecimalField:
+        return _decimal_converter(field)
+    if kind is serializers.DateTimeField:
+        return _datetime_converter(field)
+    if kind is serializers.DateField:
+        return _date_converter(field)
+    return None
+
+
+def _decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return None
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    fallback = field.to_representation
+
+    def convert(value):
+        if value.__class__ is not decimal.Decimal:
+            return fallback(value)
+        return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return None
+    fallback = field.to_representation
+
+    def convert(value):
+        # Aware UTC values rendered while UTC is active need no conversion
+        if value.__class__ is datetime.datetime and value.tzinfo is _UTC and _utc_active():
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return fallback(value)
+    return convert
+
+
+def _date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return None
+    fallback = field.to_representation
+    return lambda value: value.isoformat() if value.__class__ is datetime.date else fallback(value)
+
+
+def _utc_active():
+    current = timezone.get_current_timezone()
+    return current is _UTC or getattr(current, 'key', None) == 'UTC'
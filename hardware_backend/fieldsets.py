@@ -0,0 +1,245 @@
+"""
+Sparse fieldsets for serializers: ?fields= and ?expand=.
+
+    ?fields=product_id,name,price          only these fields
+    ?expand=batches                        the lean default plus batches
+    ?expand=order_items.product.batches    dotted paths reach nested serializers
+
+List endpoints render each serializer's Meta.lean_fields unless the client
+asks for more; detail endpoints render every field. The queryset is then
+rebuilt from the fields that are left: only() for the columns they read,
+select_related for forward relations, Prefetch for reverse ones, so a lean
+product grid neither joins brands nor fetches batches.
+
+    fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+    products_serializer = fieldset.serialize(products, many=True)
+
+Read-only list endpoints use fieldset.data(products, many=True) instead,
+which renders through the compiled serializers in fast_serializers.py and
+returns the same output as products_serializer.data.
+"""
+import json
+import threading
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+
+from .fast_serializers import compile_serializer
+
+# Compiled (FastSerializer, QueryPlan) per serializer class and field selection
+MAX_COMPILED_FIELDSETS = 256
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def parse_paths(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def nested_serializer(field):
+    """The serializer behind a nested field (many=True or not), else None"""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, serializers.BaseSerializer) else None
+
+
+def prune(serializer, fields, expand, lean):
+    """Drop the fields that were not selected, recursing into nested serializers"""
+    if fields:
+        keep = set(fields)
+    elif lean and hasattr(getattr(serializer, 'Meta', None), 'lean_fields'):
+        keep = set(serializer.Meta.lean_fields) | set(expand)
+    else:
+        keep = set(serializer.fields)
+
+    for name in list(serializer.fields):
+        if name not in keep:
+            serializer.fields.pop(name)
+            continue
+        nested = nested_serializer(serializer.fields[name])
+        if nested is not None:
+            prune(nested, fields.get(name, {}), expand.get(name, {}), lean)
+
+
+class QueryPlan:
+    """Columns, joins and prefetches needed to render a serializer"""
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        self.complete = True  # False when a field reads something we cannot map to columns
+        self.select = []
+        self.prefetch = []
+
+    def only(self):
+        return sorted(self.columns) if self.complete else None
+
+
+def plan_for(serializer, model, back_reference=None):
+    """
+    Work out what `serializer` reads from `model` instances.
+
+    back_reference names the foreign key to the parent of a prefetch; the
+    prefetch already caches that object, so it is never joined.
+    """
+    plan = QueryPlan(model)
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            plan.complete = False
+            continue
+        attrs = field.source_attrs
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            display = attrs[0].startswith('get_') and attrs[0].endswith('_display')
+            if display and len(attrs) == 1:
+                plan.columns.add(attrs[0][4:-8])
+            else:
+                plan.complete = False
+            continue
+
+        nested = nested_serializer(field)
+        if not model_field.is_relation:
+            plan.columns.add(model_field.name)
+        elif model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            plan.columns.add(model_field.name)
+            if model_field.name == back_reference or (nested is None and len(attrs) == 1):
+                continue  # the pk of the related row is the local column
+            related = model_field.related_model
+            if nested is not None:
+                sub_plan = plan_for(nested, related)
+            else:
+                sub_plan = plan_for_attribute(related, attrs[1:])
+            join(plan, model_field.name, sub_plan)
+        else:
+            # Reverse foreign key or many-to-many: one prefetch query
+            related = model_field.related_model
+            queryset = related._default_manager.all()
+            if nested is not None:
+                remote = model_field.field.name if model_field.one_to_many else None
+                sub_plan = plan_for(nested, related, back_reference=remote)
+                if remote:
+                    sub_plan.columns.add(remote)
+                queryset = apply_plan(queryset, sub_plan)
+            plan.prefetch.append(Prefetch(model_field.name, queryset=queryset))
+    return plan
+
+
+def plan_for_attribute(model, attrs):
+    """Plan for a plain field reading `related.attr` (e.g. source='category.name')"""
+    plan = QueryPlan(model)
+    try:
+        model_field = model._meta.get_field(attrs[0])
+    except FieldDoesNotExist:
+        model_field = None
+    if len(attrs) == 1 and model_field is not None and not model_field.is_relation:
+        plan.columns.add(model_field.name)
+    else:
+        plan.complete = False
+    return plan
+
+
+def join(plan, name, sub_plan):
+    """Fold a select_related sub-plan into its parent under `name`"""
+    plan.select.append(name)
+    plan.select.extend(f'{name}__{path}' for path in sub_plan.select)
+    plan.columns.update(f'{name}__{column}' for column in sub_plan.columns)
+    plan.complete = plan.complete and sub_plan.complete
+    for prefetch in sub_plan.prefetch:
+        plan.prefetch.append(Prefetch(f'{name}__{prefetch.prefetch_through}', queryset=prefetch.queryset))
+
+
+def apply_plan(queryset, plan, extra_columns=()):
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if plan.select:
+        queryset = queryset.select_related(*plan.select)
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(*plan.prefetch)
+    only = plan.only()
+    if only is not None:
+        queryset = queryset.only(*only, *extra_columns)
+    return queryset
+
+
+class Fieldset:
+    """The fields a request selected for one serializer class"""
+
+    def __init__(self, serializer_class, fields=None, expand=None, lean=False):
+        self.serializer_class = serializer_class
+        self.fields = parse_paths(fields)
+        self.expand = parse_paths(expand)
+        self.lean = lean
+
+    @classmethod
+    def from_request(cls, request, serializer_class, lean=False):
+        params = request.query_params
+        return cls(serializer_class, params.get('fields'), params.get('expand'), lean)
+
+    def serializer(self, instance=None, many=False, **kwargs):
+        """Build the serializer with the unselected fields removed"""
+        serializer = self.serializer_class(instance, many=many, **kwargs)
+        prune(serializer.child if many else serializer, self.fields, self.expand, self.lean)
+        return serializer
+
+    def optimize(self, queryset, extra_columns=()):
+        """
+        Rebuild select_related / prefetch_related / only() for the selected fields.
+
+        extra_columns are kept loaded on top of what the serializer reads, e.g.
+        the foreign key a caller's own Prefetch joins on.
+        """
+        plan = plan_for(self.serializer(), queryset.model)
+        return apply_plan(queryset, plan, extra_columns)
+
+    def serialize(self, instance, many=False, **kwargs):
+        """Serializer over `instance`, with the queryset optimized when it is one"""
+        serializer = self.serializer(many=many, **kwargs)
+        if isinstance(instance, QuerySet):
+            child = serializer.child if many else serializer
+            instance = apply_plan(instance, plan_for(child, instance.model))
+        serializer.instance = instance
+        return serializer
+
+    def compiled(self):
+        """The FastSerializer and QueryPlan for this selection, compiled once and cached"""
+        key = (
+            self.serializer_class,
+            json.dumps(self.fields, sort_keys=True),
+            json.dumps(self.expand, sort_keys=True),
+            self.lean,
+        )
+        entry = _compiled.get(key)
+        if entry is None:
+            serializer = self.serializer()
+            entry = (compile_serializer(serializer), plan_for(serializer, serializer.Meta.model))
+            with _compiled_lock:
+                # ?fields= is client input, so keep the cache bounded
+                if len(_compiled) >= MAX_COMPILED_FIELDSETS:
+                    _compiled.clear()
+                _compiled[key] = entry
+        return entry
+
+    def data(self, instance, many=False):
+        """
+        Read-only representation of `instance`, identical to serializer.data.
+
+        Querysets are optimized like serialize() does; when every selected
+        field is a plain column the rows come from .values() and no model
+        instances are built at all.
+        """
+        fast, plan = self.compiled()
+        if isinstance(instance, QuerySet):
+            if many and fast.lookups is not None:
+                return fast.render_rows(instance.select_related(None).prefetch_related(None).values(*fast.lookups))
+            instance = apply_plan(instance, plan)
+        return fast.render_many(instance) if many else fast.render(instance)
@@ -0,0 +1,196 @@
+"""
+Resized WebP / JPEG variants of uploaded catalog images.
+
+A phone photo uploaded for a product is several megabytes, while a POS tile
+shows it at 100px. After a product, category or banner is saved, each of
+its images in local media storage is decoded once and re-encoded as
+
+    full     1280px   product detail / zoom
+    medium    480px   product pages
+    thumb     160px   tiles and lists
+
+(longest edge, never enlarged), in WebP and JPEG, next to the original in
+the media storage (local or S3). JPEGs are decoded at a reduced scale when
+that is still large enough (Pillow's draft mode). The EXIF orientation is
+applied and the metadata dropped. The results are stored on the row:
+
+    image_variants = {original url: {variant: {"webp", "jpeg", "width", "height"}, "blurhash": "..."}}
+
+"blurhash" is a BlurHash placeholder of the image (kipenzi/blurhash.py),
+computed from the thumb in a process pool, for clients to show while the
+image downloads. `python manage.py backfill_blurhash` fills in the rows
+saved before it existed.
+
+The encoding runs in a thread pool (IMAGE_VARIANT_WORKERS threads; Pillow
+releases the GIL while it decodes and encodes) once the saving transaction
+commits, so the admin request returns as soon as the original is stored.
+Until the variants are ready, clients use the original image URL. Writing
+image_variants moves updated_at, so delta sync delivers them.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from kipenzi.blurhash import placeholder, placeholder_for
+from kipenzi.media_storage import get_storage
+
+from .models import Banner, Product, ProductCategory
+from .utils import media_name, variant_name
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = [('full', 1280), ('medium', 480), ('thumb', 160)]  # largest first: each is resized from the previous
+FORMATS = [
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def image_urls(instance):
+    """The instance's images that are kept in our media storage, in order"""
+    urls = [instance.image]
+    if isinstance(instance, Product) and isinstance(instance.images, list):
+        urls += instance.images
+    return list(dict.fromkeys(url for url in urls if media_name(url)))
+
+
+def needs_variants(instance):
+    """True if the row's image_variants lack an image (or its placeholder) or list a removed one"""
+    urls = image_urls(instance)
+    current = instance.image_variants or {}
+    return set(urls) != set(current) or any('blurhash' not in current[url] for url in urls)
+
+
+def flatten(image, background=(255, 255, 255)):
+    """An RGB copy of an RGBA image, composited on white (JPEG has no alpha)"""
+    if image.mode != 'RGBA':
+        return image
+    flat = Image.new('RGB', image.size, background)
+    flat.paste(image, mask=image.getchannel('A'))
+    return flat
+
+
+def existing_variants(storage, name):
+    """
+    The variants of an image already rendered for another row (uploads are
+    content-addressed, so the same file has the same variants), or None
+    """
+    variants = {}
+    for variant, _ in VARIANTS:
+        targets = {key: variant_name(name, variant, EXTENSIONS[key]) for key, _, _ in FORMATS}
+        if not all(storage.exists(target) for target in targets.values()):
+            return None
+        with storage.open(targets['webp']) as f, Image.open(f) as image:  # reads the header only
+            variants[variant] = {'width': image.width, 'height': image.height}
+        for key, target in targets.items():
+            variants[variant][key] = storage.url(target)
+    return variants
+
+
+def render_variants(name, storage=None):
+    """Store the variants of the image `name`; their URLs and sizes by variant name"""
+    storage = storage or get_storage()
+    existing = existing_variants(storage, name)
+    if existing is not None:
+        existing['blurhash'] = placeholder_for(variant_name(name, 'thumb', EXTENSIONS['webp']), storage)
+        return existing
+    variants = {}
+    with storage.open(name) as f, Image.open(f) as source:
+        source.draft('RGB', (VARIANTS[0][1], VARIANTS[0][1]))  # no-op for formats other than JPEG
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        for variant, size in VARIANTS:
+            image = image.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            entry = {'width': image.width, 'height': image.height}
+            for key, pil_format, options in FORMATS:
+                target = variant_name(name, variant, EXTENSIONS[key])
+                encoded = io.BytesIO()
+                (image if pil_format == 'WEBP' else flatten(image)).save(encoded, pil_format, **options)
+                storage.save(target, encoded.getvalue(), f'image/{key}')
+                entry[key] = storage.url(target)
+            variants[variant] = entry
+        variants['blurhash'] = placeholder(image)  # from the thumb, the last and smallest variant
+    return variants
+
+
+def build_variants(model, pk):
+    """
+    Create the missing variants of the row's images and store them in
+    image_variants. Returns True if the row was updated, False if there was
+    nothing new (or no image could be read).
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return False
+    current = instance.image_variants or {}
+    built = {}
+    for url in image_urls(instance):
+        if 'blurhash' in current.get(url, {}):
+            built[url] = current[url]
+            continue
+        try:
+            built[url] = render_variants(media_name(url))
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logger.warning('No variants for %s: %s', url, e)
+    if built == current:
+        return False
+
+    with transaction.atomic():
+        # The images may have been replaced while encoding: keep the variants of the current ones
+        row = model.objects.select_for_update().filter(pk=pk).first()
+        if row is None:
+            return False
+        urls = image_urls(row)
+        merged = {**(row.image_variants or {}), **built}
+        merged = {url: merged[url] for url in urls if url in merged}
+        model.objects.filter(pk=pk).update(image_variants=merged or None, updated_at=timezone.now())
+    return True
+
+
+def run_in_pool(model, pk):
+    try:
+        build_variants(model, pk)
+    except Exception:
+        logger.exception('Image variants for %s %s failed', model.__name__, pk)
+    finally:
+        connections.close_all()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2), thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def schedule(instance):
+    """Build the variants of a saved product / category / banner after the transaction commits"""
+    if not isinstance(instance, (Product, ProductCategory, Banner)):
+        raise TypeError(f'No image variants for {type(instance).__name__}')
+    if not needs_variants(instance):
+        return
+    model, pk = type(instance), instance.pk
+
+    def submit():
+        if getattr(settings, 'IMAGE_VARIANTS_BACKGROUND', True):
+            executor().submit(run_in_pool, model, pk)
+        else:
+            build_variants(model, pk)
+
+    transaction.on_commit(submit)
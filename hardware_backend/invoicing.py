@@ -0,0 +1,403 @@
+"""
+Invoice line writes in a constant number of queries.
+
+An invoice's items are written with one bulk_create, and its totals are
+computed once in memory (Invoice.set_totals) and saved with the invoice.
+InvoiceItem.save() used to re-sum every item and save the invoice for each
+line written, so an n-line invoice cost O(n^2) work and O(n) queries.
+Invoice.calculate_totals() remains for an item edited on its own: one SQL
+aggregate and one UPDATE.
+
+Editing an invoice diffs the request lines against the stored items
+(sync_items) and the invoice items against its order's items
+(mirror_to_order): lines are paired by primary key, then by product and
+pack type, and only the difference is written, with at most one DELETE, one
+UPDATE (bulk_update) and one INSERT per table. Unchanged lines keep their
+rows and primary keys.
+
+invoice_orders() drafts the invoices of many orders at once (month-end):
+the orders and their customers are read with one query, then locked and
+their existing invoices read with two more, their lines with another, a
+block of invoice numbers is taken from the day's sequence row
+(invoice_numbers), and the invoices and their items are written with one
+bulk_create each.
+"""
+import operator
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, prefetch_related_objects
+from django.utils import timezone
+
+from .models import Invoice, InvoiceItem, InvoiceSequence, Order, OrderItem, Product
+
+CENT = Decimal('0.01')
+MAX_BULK_ORDERS = 1000
+LINE_FIELDS = ['product_name', 'product_description', 'product_image', 'category', 'pack_type']
+
+
+def line_total(quantity, unit_price):
+    return (quantity * unit_price).quantize(CENT)
+
+
+def items_subtotal(items):
+    return sum((item.total_price for item in items), Decimal('0.00'))
+
+
+def clean_line(data):
+    """
+    A request line with the quantity and unit_price it sends as the database
+    stores them (a line may leave either out); ValueError for bad values
+    """
+    line = dict(data)
+    try:
+        if 'quantity' in line:
+            line['quantity'] = int(line['quantity'])
+            if line['quantity'] < 0:
+                raise ValueError
+        if 'unit_price' in line:
+            line['unit_price'] = Decimal(str(line['unit_price'])).quantize(CENT)
+            if line['unit_price'] < 0:
+                raise ValueError
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('Each item needs a whole, non-negative quantity and a non-negative unit_price')
+    return line
+
+
+def invoice_for_order(order, order_items, invoice_date, due_date=None, notes='', terms_and_conditions=''):
+    """An unsaved draft Invoice for the order (its user loaded), totalled from its lines; due in 30 days by default"""
+    invoice = Invoice(
+        order=order,
+        invoice_date=invoice_date,
+        due_date=due_date or invoice_date + timedelta(days=30),
+        customer_name=order.user.business_name,
+        customer_phone=order.user.phone_number,
+        customer_address=order.delivery_address,
+        customer_tin=order.user.tin_number,
+        subtotal=order.subtotal,
+        tax_amount=order.tax_amount,
+        shipping_amount=order.shipping_amount,
+        total_amount=order.total_amount,
+        payment_method=order.payment_method,
+        payment_status=order.payment_status,
+        notes=notes,
+        terms_and_conditions=terms_and_conditions,
+        status='draft'
+    )
+    if order_items:
+        invoice.set_totals(items_subtotal(order_items))
+    return invoice
+
+
+def item_from_order_item(invoice, order_item):
+    """An unsaved InvoiceItem copying an order line (its product is not loaded)"""
+    return InvoiceItem(
+        invoice=invoice,
+        product_id=order_item.product_id,
+        product_name=order_item.product_name,
+        product_description=order_item.product_description,
+        product_image=order_item.product_image,
+        category=order_item.category,
+        quantity=order_item.quantity,
+        unit_price=order_item.unit_price,
+        total_price=order_item.total_price,
+        pack_type=order_item.pack_type,
+    )
+
+
+def line_key(product_id, product_name, pack_type):
+    """What pairs a line with a row that has no matching id: its product, or its name for a line without one"""
+    return (product_id, pack_type or 'Piece') if product_id else (None, product_name, pack_type or 'Piece')
+
+
+def match_lines(rows, lines, row_key, key, line_id=lambda line: None):
+    """
+    Pair each incoming line with a stored row: by primary key (line_id)
+    first, then by key among the rows still unpaired, in order. Returns the
+    [(row or None, line)] pairs in line order (None: a row to insert) and
+    the unpaired rows (to delete).
+    """
+    unpaired = {row.pk: row for row in rows}
+    paired = [unpaired.pop(line_id(line), None) for line in lines]
+    by_key = defaultdict(list)
+    for row in unpaired.values():
+        by_key[row_key(row)].append(row)
+    for i, line in enumerate(lines):
+        candidates = by_key.get(key(line))
+        if paired[i] is None and candidates:
+            paired[i] = candidates.pop(0)
+            del unpaired[paired[i].pk]
+    return list(zip(paired, lines)), list(unpaired.values())
+
+
+def assign(row, values):
+    """Set the values that differ on the row; the names of the fields changed"""
+    changed = {field for field, value in values.items() if getattr(row, field) != value}
+    for field in changed:
+        setattr(row, field, values[field])
+    return changed
+
+
+def write_changes(model, created, changed, fields, removed):
+    """Write a line diff: one DELETE, one UPDATE and one INSERT, each skipped when empty"""
+    if removed:
+        model.objects.filter(pk__in=[row.pk for row in removed]).delete()
+    if changed:
+        model.objects.bulk_update(changed, sorted(fields))
+    if created:
+        model.objects.bulk_create(created)
+
+
+def existing_products(product_ids):
+    """The ids among product_ids that are products, with one query"""
+    product_ids = {product_id for product_id in product_ids if product_id}
+    if not product_ids:
+        return set()
+    return set(Product.objects.filter(pk__in=product_ids).values_list('pk', flat=True))
+
+
+def products_by_name(names):
+    """
+    The product id for each name, with one query: a product of that exact
+    name (any case), else the first product containing it, as the per-line
+    name__icontains lookup this replaces chose it. None when nothing matches.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    query = reduce(operator.or_, (Q(name__icontains=name) for name in names))
+    candidates = list(Product.objects.filter(query).order_by('pk').values_list('pk', 'name'))
+    found = {}
+    for name in names:
+        needle = name.casefold()
+        exact = [pk for pk, product_name in candidates if product_name.casefold() == needle]
+        found[name] = (exact or [pk for pk, product_name in candidates if needle in product_name.casefold()] or [None])[0]
+    return found
+
+
+def sync_items(invoice, lines):
+    """
+    Bring the invoice's items in line with the cleaned request lines, writing
+    only what changed, and set its totals; the caller saves the invoice.
+    A line may carry the invoice_item_id of the item it edits. Fields a line
+    leaves out keep their stored value; a new line defaults to one unit at
+    0.00. Returns the items in line order.
+    """
+    rows = list(invoice.invoice_items.all())
+    products = existing_products(line.get('product_id') for line in lines)
+    pairs, removed = match_lines(
+        rows, lines,
+        row_key=lambda item: line_key(item.product_id, item.product_name, item.pack_type),
+        key=lambda line: line_key(line.get('product_id'), line.get('product_name', ''), line.get('pack_type')),
+        line_id=lambda line: line.get('invoice_item_id'),
+    )
+
+    now = timezone.now()
+    items, created, changed, fields = [], [], [], set()
+    for item, line in pairs:
+        values = {field: line[field] for field in LINE_FIELDS if field in line}
+        if 'product_id' in line:
+            values['product_id'] = line['product_id'] if line['product_id'] in products else None
+        quantity = line.get('quantity', 1 if item is None else item.quantity)
+        unit_price = line.get('unit_price', Decimal('0.00') if item is None else item.unit_price)
+        values.update(quantity=quantity, unit_price=unit_price, total_price=line_total(quantity, unit_price))
+        if item is None:
+            item = InvoiceItem(
+                invoice=invoice,
+                **{'product_name': '', 'product_description': '', 'product_image': '', 'category': '', **values},
+            )
+            created.append(item)
+        else:
+            updated = assign(item, values)
+            if updated:
+                item.updated_at = now  # bulk_update skips auto_now
+                changed.append(item)
+                fields |= updated | {'updated_at'}
+        items.append(item)
+
+    write_changes(InvoiceItem, created, changed, fields, removed)
+    invoice.set_totals(items_subtotal(items))
+    return items
+
+
+def mirror_to_order(invoice, items):
+    """
+    Copy the invoice's customer, payment, lines and totals to its order,
+    writing only the order lines that changed. An order line needs a
+    product: an invoice item without one is matched to a product by name
+    (one query for all of them) and left off the order if none matches.
+    """
+    order = invoice.order
+    order.delivery_address = invoice.customer_address
+    order.delivery_phone = invoice.customer_phone
+    if invoice.payment_method:
+        order.payment_method = invoice.payment_method
+    if invoice.payment_status:
+        order.payment_status = invoice.payment_status
+
+    by_name = products_by_name(item.product_name for item in items if not item.product_id)
+    lines = []
+    for item in items:
+        product_id = item.product_id or by_name.get(item.product_name)
+        if product_id:
+            lines.append({
+                'product_id': product_id,
+                'product_name': item.product_name,
+                'product_description': item.product_description or '',
+                'product_image': item.product_image or '',
+                'category': item.category or '',
+                'quantity': item.quantity,
+                'unit_price': item.unit_price,
+                'total_price': item.total_price,
+                'pack_type': item.pack_type,
+            })
+
+    pairs, removed = match_lines(
+        list(order.order_items.all()), lines,
+        row_key=lambda order_item: (order_item.product_id, order_item.pack_type),
+        key=lambda line: (line['product_id'], line['pack_type']),
+    )
+    created, changed, fields = [], [], set()
+    for order_item, line in pairs:
+        if order_item is None:
+            created.append(OrderItem(order=order, **line))
+        else:
+            updated = assign(order_item, line)
+            if updated:
+                changed.append(order_item)
+                fields |= updated
+    write_changes(OrderItem, created, changed, fields, removed)
+
+    order.subtotal = invoice.subtotal
+    order.tax_amount = invoice.tax_amount
+    order.shipping_amount = invoice.shipping_amount
+    order.total_amount = invoice.total_amount
+    order.save()
+    return order
+
+
+def invoice_numbers(count):
+    """
+    Take the next `count` numbers of today's INV-YYYYMMDD-NNNN sequence.
+
+    The day's InvoiceSequence row is incremented with one UPDATE, whose row
+    lock is held until the caller's transaction ends, so concurrent runs get
+    disjoint blocks rather than an IntegrityError on invoice_number. The
+    first call of a day seeds the row from the highest number already issued
+    that day, compared as a number (as text, INV-...-10000 sorts before
+    INV-...-9999). Numbers taken by a transaction that rolls back are not
+    reused.
+    """
+    now = datetime.now()
+    prefix = f"INV-{now.strftime('%Y%m%d')}-"
+    with transaction.atomic(savepoint=False):  # the caller's transaction, if it has one, holds the lock
+        if not InvoiceSequence.objects.filter(day=now.date()).update(last=F('last') + count):
+            issued = numbers_issued(prefix)
+            try:
+                with transaction.atomic():
+                    InvoiceSequence.objects.create(day=now.date(), last=issued + count)
+            except IntegrityError:  # created by a concurrent run meanwhile
+                InvoiceSequence.objects.filter(day=now.date()).update(last=F('last') + count)
+        last = InvoiceSequence.objects.get(day=now.date()).last
+    return [f'{prefix}{number:04d}' for number in range(last - count + 1, last + 1)]
+
+
+def numbers_issued(prefix):
+    """The highest number of a day's sequence already on an invoice (0 if none)"""
+    numbers = Invoice.objects.filter(invoice_number__startswith=prefix).values_list('invoice_number', flat=True)
+    return max((int(number[len(prefix):]) for number in numbers if number[len(prefix):].isdigit()), default=0)
+
+
+def invoice_orders(order_ids=None, order_status=None, date_from=None, date_to=None, invoice_date=None, **invoice_fields):
+    """
+    Create draft invoices for a list of orders, or for up to MAX_BULK_ORDERS
+    orders not yet invoiced that match the filter (status and created date),
+    oldest first. A filter given with a list narrows it: listed orders it
+    excludes are skipped, as are orders that already have an invoice.
+    Returns the counts and an outcome per order; has_more is set when the
+    filter matched more orders than one call takes.
+
+    The orders are locked (SELECT ... FOR UPDATE) before their invoices are
+    read, so a concurrent run over the same orders waits for this one and
+    then skips them instead of failing on the one invoice per order.
+    """
+    filtered = bool(order_status or date_from or date_to)
+    orders = Order.objects.select_related('user').order_by('created_at')
+    if order_ids is not None:
+        order_ids = list(dict.fromkeys(order_ids))[:MAX_BULK_ORDERS]
+        orders = orders.filter(pk__in=order_ids)
+    else:
+        orders = orders.filter(invoice__isnull=True)
+    if order_status:
+        orders = orders.filter(status=order_status)
+    if date_from:
+        orders = orders.filter(created_at__date__gte=date_from)
+    if date_to:
+        orders = orders.filter(created_at__date__lte=date_to)
+    orders = list(orders[:MAX_BULK_ORDERS + 1])
+    has_more = len(orders) > MAX_BULK_ORDERS
+    orders = orders[:MAX_BULK_ORDERS]
+
+    outcomes = {}
+    if order_ids and filtered:
+        matched = {order.order_id for order in orders}
+        excluded = [order_id for order_id in order_ids if order_id not in matched]
+        if excluded:
+            for order_id in Order.objects.filter(pk__in=excluded).values_list('pk', flat=True):
+                outcomes[order_id] = {
+                    'order_id': order_id, 'status': 'skipped', 'message': 'Order does not match the filter',
+                }
+
+    invoices = []
+    if orders:
+        with transaction.atomic():
+            order_pks = sorted(order.order_id for order in orders)  # one lock order for every run: no deadlock
+            list(Order.objects.select_for_update().filter(pk__in=order_pks).order_by('pk').values_list('pk', flat=True))
+            existing = Invoice.objects.filter(order_id__in=order_pks).values_list('order_id', 'invoice_id', 'invoice_number')
+            for order_id, invoice_id, invoice_number in existing:
+                outcomes[order_id] = {
+                    'order_id': order_id,
+                    'status': 'skipped',
+                    'message': 'Invoice already exists for this order',
+                    'invoice_id': invoice_id,
+                    'invoice_number': invoice_number,
+                }
+            to_invoice = [order for order in orders if order.order_id not in outcomes]
+
+            if to_invoice:
+                prefetch_related_objects(to_invoice, 'order_items')
+                items = []
+                for order in to_invoice:
+                    order_items = list(order.order_items.all())
+                    invoice = invoice_for_order(order, order_items, invoice_date or date.today(), **invoice_fields)
+                    invoices.append(invoice)
+                    items += [item_from_order_item(invoice, order_item) for order_item in order_items]
+
+                for invoice, number in zip(invoices, invoice_numbers(len(invoices))):
+                    invoice.invoice_number = number
+                Invoice.objects.bulk_create(invoices)
+                InvoiceItem.objects.bulk_create(items)
+
+    for invoice in invoices:
+        outcomes[invoice.order_id] = {
+            'order_id': invoice.order_id,
+            'status': 'created',
+            'invoice_id': invoice.invoice_id,
+            'invoice_number': invoice.invoice_number,
+            'total_amount': str(invoice.total_amount),
+        }
+
+    for order_id in order_ids or []:
+        outcomes.setdefault(order_id, {'order_id': order_id, 'status': 'not_found', 'message': 'Order not found'})
+    results = [outcomes[order_id] for order_id in (order_ids or [order.order_id for order in orders])]
+    return {
+        'requested': len(results),
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'skipped': sum(1 for result in results if result['status'] == 'skipped'),
+        'not_found': sum(1 for result in results if result['status'] == 'not_found'),
+        'has_more': has_more,
+        'results': results,
+    }
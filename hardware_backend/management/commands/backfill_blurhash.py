@@ -0,0 +1,75 @@
+"""
+Compute the BlurHash placeholders (and any missing resized variants) of
+images saved before they existed, several images at a time:
+
+    python manage.py backfill_blurhash
+    python manage.py backfill_blurhash --workers 4
+
+Products, categories and banners go through the image variant pipeline
+(image_variants.build_variants). User images still carrying the default
+BlurHash get their own when the image is in our media storage. The BlurHash
+encoding runs in the BLURHASH_WORKERS process pool.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from hardware_backend.image_variants import build_variants, needs_variants
+from hardware_backend.models import Banner, Product, ProductCategory
+from kipenzi.blurhash import placeholder_for_url
+from users.models import DEFAULT_IMAGE_ENCODE, UserImage
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_row(model, pk):
+    try:
+        return build_variants(model, pk)
+    except Exception:
+        logger.exception('Backfill of %s %s failed', model.__name__, pk)
+        return False
+    finally:
+        connections.close_all()
+
+
+def backfill_user_image(pk, url):
+    try:
+        blurhash = placeholder_for_url(url)
+        if blurhash:
+            UserImage.images.filter(pk=pk, image_encode=DEFAULT_IMAGE_ENCODE).update(image_encode=blurhash)
+        return bool(blurhash)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Compute missing BlurHash placeholders and image variants of existing media'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Images processed at once (default IMAGE_VARIANT_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+        rows = []
+        for model in (Product, ProductCategory, Banner):
+            fields = ['image', 'image_variants'] + (['images'] if model is Product else [])
+            rows += [(model, instance.pk) for instance in model.objects.only(*fields).iterator() if needs_variants(instance)]
+        user_images = list(
+            UserImage.images.filter(image_encode=DEFAULT_IMAGE_ENCODE).values_list('pk', 'image')
+        )
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            catalog = sum(pool.map(lambda row: backfill_row(*row), rows))
+            users = sum(pool.map(lambda image: backfill_user_image(*image), user_images))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Catalog rows: {catalog:,} of {len(rows):,} updated; '
+            f'user images: {users:,} of {len(user_images):,} given a BlurHash '
+            f'(the rest are stored elsewhere or unreadable)'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from hardware_backend.catalog_snapshot import build_snapshot, read_manifest
+
+
+class Command(BaseCommand):
+    help = 'Build the compressed offline catalog snapshot if the catalog changed since the last one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the catalog is unchanged')
+
+    def handle(self, *args, **options):
+        previous = read_manifest()
+        manifest = build_snapshot(force=options['force'])
+        if previous is not None and previous['name'] == manifest['name']:
+            self.stdout.write(f"Catalog unchanged, keeping {manifest['name']}")
+            return
+
+        counts = ', '.join(f'{entity}: {count:,}' for entity, count in manifest['counts'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {manifest['name']} ({manifest['size']:,} bytes; {counts})"
+        ))
@@ -0,0 +1,62 @@
+"""
+Create draft invoices for many orders at once, e.g. at month-end for the
+orders delivered that month:
+
+    python manage.py create_invoices_from_orders --status delivered --from 2024-01-01 --to 2024-01-31
+    python manage.py create_invoices_from_orders --order-ids <order_id> <order_id> ...
+
+A filter invoices every matching order that has no invoice yet, in batches
+of MAX_BULK_ORDERS. Given with --order-ids it narrows the list: listed orders
+it excludes are skipped, as are those that already have an invoice.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hardware_backend.invoicing import MAX_BULK_ORDERS, invoice_orders
+from hardware_backend.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Create draft invoices for the given orders, or for the orders matching a filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order-ids', nargs='+', help='Orders to invoice')
+        parser.add_argument('--status', choices=[value for value, _ in Order.ORDER_STATUS_CHOICES], help='Order status')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='Orders created on or after (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='Orders created on or before (YYYY-MM-DD)')
+        parser.add_argument('--invoice-date', type=date.fromisoformat, help='Invoice date (default today)')
+        parser.add_argument('--notes', default='', help='Notes for every invoice')
+
+    def handle(self, *args, **options):
+        order_ids = options['order_ids']
+        filters = {
+            'order_status': options['status'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        }
+        if not order_ids and not any(filters.values()):
+            raise CommandError('Give --order-ids or a filter (--status, --from, --to)')
+        invoice_fields = {'invoice_date': options['invoice_date'], 'notes': options['notes']}
+
+        totals = {'created': 0, 'skipped': 0, 'not_found': 0}
+        batches = [order_ids[i:i + MAX_BULK_ORDERS] for i in range(0, len(order_ids), MAX_BULK_ORDERS)] if order_ids else None
+        while True:
+            if batches is not None:
+                if not batches:
+                    break
+                result = invoice_orders(order_ids=batches.pop(0), **filters, **invoice_fields)
+            else:
+                result = invoice_orders(**filters, **invoice_fields)
+            for key in totals:
+                totals[key] += result[key]
+            for outcome in result['results']:
+                if outcome['status'] != 'created':
+                    self.stdout.write(f"{outcome['order_id']}: {outcome['message']}")
+            if batches is None and not (result['has_more'] and result['created']):
+                break
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Invoices created: {totals['created']:,}; orders skipped: {totals['skipped']:,}; "
+            f"not found: {totals['not_found']:,}"
+        ))
@@ -0,0 +1,33 @@
+"""
+Delete uploaded images (and their resized variants) that no row references
+any more. Run it from cron, e.g. daily:
+
+    python manage.py gc_media
+    python manage.py gc_media --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from hardware_backend.media_gc import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete unreferenced content-addressed media files and their variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+        parser.add_argument(
+            '--grace-seconds', type=int, default=None,
+            help='Keep files newer than this (default MEDIA_GC_GRACE_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = collect_garbage(dry_run=options['dry_run'], grace_seconds=options['grace_seconds'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        prefix = 'Dry run: would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {result['files']:,} files ({result['bytes'] / 1e6:,.1f} MB); "
+            f"kept {result['kept']:,} files referenced by {result['references']:,} rows "
+            f"({result['shared']:,} shared by several rows)"
+        ))
@@ -0,0 +1,468 @@
+"""
+Generate a large, referentially consistent synthetic dataset for load testing.
+
+Unlike populate_sample_data this never calls get_or_create. The small
+reference tables (categories, brands, types, shelves, users) go through
+bulk_create; everything sized in the tens of thousands and up is written as
+chunked multi-row INSERTs of DB-ready tuples (see insert_many). Primary keys
+come from a seeded RNG, so the same --seed always produces the same rows, and
+child rows are generated chunk by chunk so memory stays flat even for the
+xlarge profile (10M sale items). Names and numbers carry --tag, so a second
+dataset in the same database needs a new --seed (and with it a new tag).
+
+    python manage.py generate_synthetic_data --profile=small
+    python manage.py generate_synthetic_data --profile=xlarge --chunk-size=20000
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from hardware_backend.models import (
+    BusinessUser, ProductCategory, Brand, ProductType, Product, ProductBatch,
+    Order, OrderItem, Customer, Shelf, ProductLocation, Sale, SaleItem,
+    Expense, Invoice, InvoiceItem
+)
+
+PROFILES = {
+    'small': {
+        'users': 50, 'categories': 10, 'brands': 20, 'types_per_category': 5,
+        'products': 1000, 'batches_per_product': 2, 'shelves': 20,
+        'customers': 500, 'orders': 2000, 'items_per_order': 4, 'invoice_ratio': 0.5,
+        'sales': 5000, 'items_per_sale': 3, 'expenses': 500,
+    },
+    'medium': {
+        'users': 500, 'categories': 25, 'brands': 100, 'types_per_category': 8,
+        'products': 20000, 'batches_per_product': 3, 'shelves': 100,
+        'customers': 10000, 'orders': 100000, 'items_per_order': 4, 'invoice_ratio': 0.5,
+        'sales': 500000, 'items_per_sale': 3, 'expenses': 10000,
+    },
+    'xlarge': {
+        'users': 2000, 'categories': 40, 'brands': 300, 'types_per_category': 10,
+        'products': 100000, 'batches_per_product': 3, 'shelves': 400,
+        'customers': 50000, 'orders': 1000000, 'items_per_order': 4, 'invoice_ratio': 0.5,
+        'sales': 2500000, 'items_per_sale': 4, 'expenses': 50000,
+    },
+}
+
+BUSINESS_TYPES = ['Retail', 'Wholesale', 'Pharmacy', 'Clinic', 'Hospital']
+LOCATIONS = ['Dar es Salaam', 'Arusha', 'Mwanza', 'Dodoma', 'Mbeya', 'Morogoro', 'Tanga', 'Zanzibar']
+ORDER_STATUSES = ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'delivered', 'delivered', 'cancelled']
+SALE_PAYMENT_METHODS = [choice[0] for choice in Sale.PAYMENT_METHOD_CHOICES]
+SALE_PAYMENT_STATUSES = ['PAID', 'PAID', 'PAID', 'UNPAID', 'PARTIAL']
+EXPENSE_CATEGORIES = [choice[0] for choice in Expense.EXPENSE_CATEGORY_CHOICES]
+EXPENSE_STATUSES = ['PENDING', 'APPROVED', 'APPROVED', 'REJECTED']
+PRODUCT_WORDS = [
+    'Paracetamol', 'Amoxicillin', 'Ibuprofen', 'Metformin', 'Omeprazole', 'Cetirizine',
+    'Ciprofloxacin', 'Azithromycin', 'Vitamin C', 'Zinc', 'Salbutamol', 'Diclofenac',
+]
+PRODUCT_FORMS = ['Tablets', 'Capsules', 'Syrup', 'Suspension', 'Cream', 'Injection', 'Drops']
+STRENGTHS = ['5mg', '10mg', '100mg', '250mg', '500mg', '1g', '5ml', '100ml']
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at/sale_date values"""
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset with chunked bulk_create (for load testing and benchmarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(PROFILES), default='small', help='Dataset size profile')
+        parser.add_argument('--seed', type=int, default=42, help='RNG seed; the same seed produces the same rows')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per insert batch / transaction')
+        parser.add_argument('--days', type=int, default=365, help='Spread orders, sales and expenses over this many days')
+        parser.add_argument('--tag', default=None, help='Suffix for unique names/phones (default: SYN<seed>)')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        self.counts = PROFILES[options['profile']]
+        self.chunk_size = options['chunk_size']
+        self.days = options['days']
+        self.tag = options['tag'] or f"SYN{options['seed']}"
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.totals = {}
+        self._insert_cache = {}
+        self.check_not_generated(options['seed'])
+
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # Benchmark data only: skip the fsync after every chunk (SQLite refuses inside a transaction)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+                cursor.execute('PRAGMA cache_size = -262144')  # 256MB of page cache for the index updates
+
+        self.stdout.write(f"Generating '{options['profile']}' dataset (seed={options['seed']}, tag={self.tag})...")
+        started = time.perf_counter()
+
+        with manual_timestamps(ProductCategory, Brand, ProductType, Shelf, BusinessUser):
+            self.generate_catalog()
+            self.generate_people()
+            self.generate_orders()
+            self.generate_sales()
+            self.generate_expenses()
+
+        elapsed = time.perf_counter() - started
+        rows = sum(self.totals.values())
+        for model_name, count in self.totals.items():
+            self.stdout.write(f'  {model_name}: {count:,}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)'
+        ))
+
+    # Helpers
+
+    def check_not_generated(self, seed):
+        """A second run with the same tag or seed would fail on unique names or primary keys part way through"""
+        if BusinessUser.objects.filter(tin_number__startswith=f'TIN-{self.tag}-').exists():
+            raise CommandError(
+                f'A dataset tagged {self.tag} already exists; pass a new --tag (or --seed, which sets the default tag)'
+            )
+        first_id = self.new_id()
+        self.rng.seed(seed)
+        if ProductCategory.objects.filter(pk=first_id).exists():
+            raise CommandError(f'A dataset generated with --seed {seed} already exists; pass a different --seed')
+
+    def new_id(self):
+        """Seeded UUID-formatted primary key (cheaper than uuid.UUID for millions of rows)"""
+        h = f'{self.rng.getrandbits(128):032x}'
+        return f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{h[16:20]}-{h[20:]}'
+
+    def random_past(self):
+        return self.now - timedelta(seconds=self.rng.randint(0, self.days * 86400))
+
+    def random_expiry(self):
+        return self.db_date((self.now + timedelta(days=self.rng.randint(-30, 900))).date())
+
+    def write(self, model, rows):
+        """bulk_create an iterable of unsaved instances in chunks, one transaction per chunk"""
+        rows = list(rows)
+        for start in range(0, len(rows), self.chunk_size):
+            with transaction.atomic():
+                model.objects.bulk_create(rows[start:start + self.chunk_size])
+        self.totals[model.__name__] = self.totals.get(model.__name__, 0) + len(rows)
+
+    def insert(self, model, columns, rows):
+        """insert_many for an iterable of DB-ready tuples, one transaction per chunk"""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self.insert_many([(model, columns, chunk)])
+                chunk = []
+        self.insert_many([(model, columns, chunk)])
+
+    def db_datetime(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def db_date(self, value):
+        return connection.ops.adapt_datefield_value(value)
+
+    def insert_sql(self, model, columns):
+        """Column list and constant defaults for the columns a generator leaves out"""
+        key = (model, tuple(columns))
+        if key not in self._insert_cache:
+            meta = model._meta
+            fields = [meta.get_field(column) for column in columns]
+            extra = [
+                field for field in meta.concrete_fields
+                if field not in fields and field.attname not in columns
+            ]
+            defaults = tuple(
+                field.get_db_prep_save(field.get_default(), connection)
+                for field in extra
+            )
+            qn = connection.ops.quote_name
+            all_fields = fields + extra
+            prefix = f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(field.column) for field in all_fields)}) VALUES "
+            row_placeholder = f"({', '.join(['%s'] * len(all_fields))})"
+            rows_per_statement = connection.ops.bulk_batch_size(all_fields, [None] * self.chunk_size)
+            self._insert_cache[key] = (prefix, row_placeholder, rows_per_statement, defaults)
+        return self._insert_cache[key]
+
+    def insert_many(self, batches):
+        """
+        Fast path for the high-volume tables: plain INSERTs of DB-ready tuples.
+        bulk_create spends ~100us per row compiling each field, which turns
+        10M sale items into the better part of an hour. Parents are written
+        before children in one transaction per chunk, as bulk_create would.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model, columns, rows in batches:
+                if not rows:
+                    continue
+                prefix, row_placeholder, rows_per_statement, defaults = self.insert_sql(model, columns)
+                if defaults:
+                    rows = [row + defaults for row in rows]
+                if connection.vendor == 'sqlite':
+                    # sqlite3's executemany loops in C; multi-row VALUES is no faster
+                    cursor.executemany(prefix + row_placeholder, rows)
+                else:
+                    for start in range(0, len(rows), rows_per_statement):
+                        batch = rows[start:start + rows_per_statement]
+                        cursor.execute(
+                            prefix + ', '.join([row_placeholder] * len(batch)),
+                            [value for row in batch for value in row],
+                        )
+                self.totals[model.__name__] = self.totals.get(model.__name__, 0) + len(rows)
+
+    # Generators
+
+    def generate_catalog(self):
+        counts, rng, tag = self.counts, self.rng, self.tag
+        created = self.now - timedelta(days=self.days)
+
+        self.category_ids = []
+        categories = []
+        for i in range(counts['categories']):
+            category_id = self.new_id()
+            self.category_ids.append(category_id)
+            categories.append(ProductCategory(
+                category_id=category_id, name=f'Category {i} {tag}', description=f'Synthetic category {i}',
+                created_at=created, updated_at=created,
+            ))
+        self.write(ProductCategory, categories)
+
+        self.brand_ids = [self.new_id() for _ in range(counts['brands'])]
+        self.write(Brand, (
+            Brand(brand_id=brand_id, name=f'Brand {i} {tag}', description=f'Synthetic brand {i}',
+                  created_at=created, updated_at=created)
+            for i, brand_id in enumerate(self.brand_ids)
+        ))
+
+        self.type_categories = []  # (type_id, category_id)
+        types = []
+        for category_id in self.category_ids:
+            for j in range(counts['types_per_category']):
+                type_id = self.new_id()
+                self.type_categories.append((type_id, category_id))
+                types.append(ProductType(
+                    type_id=type_id, name=f'{PRODUCT_FORMS[j % len(PRODUCT_FORMS)]} {j}',
+                    category_id=category_id, created_at=created, updated_at=created,
+                ))
+        self.write(ProductType, types)
+
+        self.shelf_ids = [self.new_id() for _ in range(counts['shelves'])]
+        self.write(Shelf, (
+            Shelf(shelf_id=shelf_id, name=f'Shelf {i}', created_at=created, updated_at=created)
+            for i, shelf_id in enumerate(self.shelf_ids)
+        ))
+
+        # (product_id, name, price, category_id) kept for order/sale/invoice lines
+        self.products = []
+        created_db = self.db_datetime(created)
+
+        def products():
+            for i in range(counts['products']):
+                product_id = self.new_id()
+                type_id, category_id = self.type_categories[i % len(self.type_categories)]
+                name = f'{rng.choice(PRODUCT_WORDS)} {rng.choice(STRENGTHS)} {rng.choice(PRODUCT_FORMS)} #{i}'
+                price = Decimal(rng.randint(5, 2000) * 100)
+                self.products.append((product_id, name, price, category_id))
+                yield (
+                    product_id, name, f'{name} - synthetic', price, category_id,
+                    self.brand_ids[i % len(self.brand_ids)], type_id, rng.random() < 0.05,
+                    rng.randint(0, 500), rng.choice([5, 10, 20]), self.random_expiry(),
+                    created_db, created_db,
+                )
+        self.insert(Product, [
+            'product_id', 'name', 'description', 'price', 'category_id', 'brand_id', 'product_type_id',
+            'is_featured', 'stock_quantity', 'minimum_stock', 'expiry_date', 'created_at', 'updated_at',
+        ], products())
+
+        def batches():
+            for product_id, _, price, _ in self.products:
+                cost_price = (price * Decimal('0.7')).quantize(Decimal('0.01'))
+                for b in range(counts['batches_per_product']):
+                    received = rng.randint(50, 500)
+                    yield (
+                        self.new_id(), product_id, f'BN-{b}-{product_id[:8]}', f'Supplier {rng.randint(1, 50)}',
+                        cost_price, price, received, rng.randint(0, received), self.random_expiry(),
+                        created_db, created_db, created_db,
+                    )
+        self.insert(ProductBatch, [
+            'batch_id', 'product_id', 'batch_number', 'supplier', 'cost_price', 'selling_price',
+            'quantity_received', 'quantity_remaining', 'expiry_date', 'received_date', 'created_at', 'updated_at',
+        ], batches())
+
+        self.insert(ProductLocation, [
+            'location_id', 'product_id', 'shelf_id', 'quantity', 'created_at', 'updated_at',
+        ], (
+            (self.new_id(), product_id, self.shelf_ids[i % len(self.shelf_ids)], rng.randint(0, 200),
+             created_db, created_db)
+            for i, (product_id, _, _, _) in enumerate(self.products)
+        ))
+
+    def generate_people(self):
+        counts, rng, tag = self.counts, self.rng, self.tag
+        password = make_password('password123')
+        phone_base = int(self.tag.encode().hex(), 16) % 10**4
+
+        self.users = []  # (user_id, business_name, phone, location)
+
+        def users():
+            for i in range(counts['users']):
+                user_id = self.new_id()
+                name = f'Business {i} {tag}'
+                phone = f'+255{phone_base:04d}{i:06d}'[:15]
+                location = rng.choice(LOCATIONS)
+                self.users.append((user_id, name, phone, location))
+                created = self.random_past()
+                yield BusinessUser(
+                    user_id=user_id, business_type=rng.choice(BUSINESS_TYPES), business_name=name,
+                    phone_number=phone, business_location=location, tin_number=f'TIN-{tag}-{i}',
+                    password=password, is_verified=rng.random() < 0.9, created_at=created, updated_at=created,
+                )
+        self.write(BusinessUser, users())
+
+        self.customers = []  # (customer_id, name, phone)
+
+        def customers():
+            for i in range(counts['customers']):
+                customer_id = self.new_id()
+                name = f'Customer {i}'
+                phone = f'+2556{i:08d}'
+                self.customers.append((customer_id, name, phone))
+                created_db = self.db_datetime(self.random_past())
+                yield (customer_id, name, phone, rng.choice(LOCATIONS), created_db, created_db)
+        self.insert(Customer, ['customer_id', 'name', 'phone', 'address', 'created_at', 'updated_at'], customers())
+
+    def generate_orders(self):
+        """Orders with their items, and invoices (with items) for a share of them"""
+        counts, rng, tag = self.counts, self.rng, self.tag
+        order_cols = [
+            'order_id', 'user_id', 'subtotal', 'total_amount', 'delivery_address', 'delivery_phone',
+            'status', 'payment_status', 'order_number', 'created_at', 'updated_at',
+        ]
+        item_cols = [
+            'order_item_id', 'order_id', 'product_id', 'quantity', 'unit_price', 'total_price',
+            'product_name', 'product_description', 'created_at',
+        ]
+        invoice_cols = [
+            'invoice_id', 'order_id', 'invoice_number', 'invoice_date', 'due_date', 'status',
+            'customer_name', 'customer_phone', 'customer_address', 'subtotal', 'total_amount',
+            'payment_status', 'created_at', 'updated_at',
+        ]
+        invoice_item_cols = [
+            'invoice_item_id', 'invoice_id', 'product_id', 'quantity', 'unit_price', 'total_price',
+            'product_name', 'created_at', 'updated_at',
+        ]
+        orders, items, invoices, invoice_items = [], [], [], []
+
+        for i in range(counts['orders']):
+            user_id, business_name, phone, location = rng.choice(self.users)
+            order_id = self.new_id()
+            created = self.random_past()
+            created_db = self.db_datetime(created)
+            subtotal = Decimal('0.00')
+            lines = []
+            for product_id, name, price, _ in rng.sample(self.products, counts['items_per_order']):
+                quantity = rng.randint(1, 10)
+                total = price * quantity
+                subtotal += total
+                lines.append((product_id, name, price, quantity, total))
+                items.append((self.new_id(), order_id, product_id, quantity, price, total, name, name, created_db))
+            status = rng.choice(ORDER_STATUSES)
+            payment_status = 'paid' if status == 'delivered' else 'pending'
+            orders.append((
+                order_id, user_id, subtotal, subtotal, location, phone, status, payment_status,
+                f'ORD-{tag}-{i:07d}', created_db, created_db,
+            ))
+
+            if status != 'cancelled' and rng.random() < counts['invoice_ratio']:
+                invoice_id = self.new_id()
+                invoices.append((
+                    invoice_id, order_id, f'INV-{tag}-{i:07d}', self.db_date(created.date()),
+                    self.db_date((created + timedelta(days=30)).date()),
+                    'paid' if status == 'delivered' else 'sent', business_name, phone, location,
+                    subtotal, subtotal, payment_status, created_db, created_db,
+                ))
+                invoice_items.extend(
+                    (self.new_id(), invoice_id, product_id, quantity, price, total, name, created_db, created_db)
+                    for product_id, name, price, quantity, total in lines
+                )
+
+            if len(items) >= self.chunk_size:
+                self.insert_many([
+                    (Order, order_cols, orders), (OrderItem, item_cols, items),
+                    (Invoice, invoice_cols, invoices), (InvoiceItem, invoice_item_cols, invoice_items),
+                ])
+                orders, items, invoices, invoice_items = [], [], [], []
+        self.insert_many([
+            (Order, order_cols, orders), (OrderItem, item_cols, items),
+            (Invoice, invoice_cols, invoices), (InvoiceItem, invoice_item_cols, invoice_items),
+        ])
+
+    def generate_sales(self):
+        counts, rng = self.counts, self.rng
+        sale_cols = [
+            'sale_id', 'customer_id', 'customer_name', 'customer_phone', 'total_amount', 'payment_method',
+            'payment_status', 'salesperson_id', 'salesperson_name', 'sale_date', 'created_at', 'updated_at',
+        ]
+        item_cols = [
+            'sale_item_id', 'sale_id', 'product_id', 'product_name', 'quantity', 'unit_price',
+            'total_price', 'created_at',
+        ]
+        sales, items = [], []
+
+        for _ in range(counts['sales']):
+            sale_id = self.new_id()
+            created_db = self.db_datetime(self.random_past())
+            total = Decimal('0.00')
+            for product_id, name, price, _ in rng.sample(self.products, counts['items_per_sale']):
+                quantity = rng.randint(1, 5)
+                line_total = price * quantity
+                total += line_total
+                items.append((self.new_id(), sale_id, product_id, name, quantity, price, line_total, created_db))
+            customer_id, customer_name, customer_phone = rng.choice(self.customers)
+            salesperson_id, salesperson_name, _, _ = rng.choice(self.users)
+            sales.append((
+                sale_id, customer_id, customer_name, customer_phone, total,
+                rng.choice(SALE_PAYMENT_METHODS), rng.choice(SALE_PAYMENT_STATUSES),
+                salesperson_id, salesperson_name, created_db, created_db, created_db,
+            ))
+
+            if len(items) >= self.chunk_size:
+                self.insert_many([(Sale, sale_cols, sales), (SaleItem, item_cols, items)])
+                sales, items = [], []
+        self.insert_many([(Sale, sale_cols, sales), (SaleItem, item_cols, items)])
+
+    def generate_expenses(self):
+        rng = self.rng
+
+        def expenses():
+            for i in range(self.counts['expenses']):
+                created = self.random_past()
+                created_db = self.db_datetime(created)
+                status = rng.choice(EXPENSE_STATUSES)
+                yield (
+                    self.new_id(), f'Expense {i}', 'Synthetic expense', Decimal(rng.randint(10, 5000) * 100),
+                    rng.choice(EXPENSE_CATEGORIES), status, self.db_date(created.date()),
+                    rng.choice(self.users)[0], rng.choice(self.users)[0] if status != 'PENDING' else None,
+                    created_db, created_db,
+                )
+        self.insert(Expense, [
+            'expense_id', 'title', 'description', 'amount', 'category', 'status', 'expense_date',
+            'created_by_id', 'approved_by_id', 'created_at', 'updated_at',
+        ], expenses())
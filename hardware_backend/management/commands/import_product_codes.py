@@ -0,0 +1,51 @@
+"""
+Bulk import barcodes / SKUs from a CSV file with the columns code,
+product_id and (optionally) pack_type:
+
+    python manage.py import_product_codes codes.csv
+    python manage.py import_product_codes codes.csv --dry-run
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hardware_backend.product_codes import import_codes
+
+MAX_ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = 'Create or reassign product barcodes / SKUs from a CSV file (code, product_id, pack_type)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without saving')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                missing = {'code', 'product_id'} - set(reader.fieldnames or [])
+                if missing:
+                    raise CommandError(f'Missing CSV columns: {", ".join(sorted(missing))}')
+                rows = list(reader)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        with transaction.atomic():
+            result = import_codes(rows)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for error in result['errors'][:MAX_ERRORS_SHOWN]:
+            # Row 1 is the first data row; the header is line 1 of the file
+            self.stderr.write(f"line {error['row'] + 1}: {error['code'] or '(empty)'}: {error['message']}")
+        if len(result['errors']) > MAX_ERRORS_SHOWN:
+            self.stderr.write(f"... and {len(result['errors']) - MAX_ERRORS_SHOWN} more errors")
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['created']:,} created, {result['updated']:,} updated, "
+            f"{result['unchanged']:,} unchanged, {len(result['errors']):,} rejected"
+        ))
@@ -0,0 +1,50 @@
+"""
+Bulk create / update products from a CSV or XLSX file (columns described in
+hardware_backend/product_import.py):
+
+    python manage.py import_products products.xlsx
+    python manage.py import_products products.csv --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from hardware_backend.product_import import CHUNK_SIZE, import_products
+
+MAX_ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = 'Create or update products, shelf locations, batches and barcodes from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without saving')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows written per transaction')
+
+    def handle(self, *args, **options):
+        def progress(summary):
+            self.stdout.write(f"{summary['rows']:,} rows read")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_products(
+                    f, options['path'], dry_run=options['dry_run'],
+                    chunk_size=max(options['chunk_size'], 1), on_chunk=progress,
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if result['ignored_columns']:
+            self.stderr.write(f"Ignored columns: {', '.join(result['ignored_columns'])}")
+        for error in result['errors'][:MAX_ERRORS_SHOWN]:
+            self.stderr.write(f"line {error['row']}: {error['message']}")
+        if result['rejected'] > MAX_ERRORS_SHOWN:
+            self.stderr.write(f"... and {result['rejected'] - MAX_ERRORS_SHOWN} more errors")
+        for error in result['code_errors'][:MAX_ERRORS_SHOWN]:
+            self.stderr.write(f"line {error['row']}: {error['message']} (the product was saved)")
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result['created']:,} created, {result['updated']:,} updated, "
+            f"{result['locations']:,} shelf locations, {result['batches']:,} batches, "
+            f"{result['codes']:,} codes, {result['rejected']:,} rejected"
+        ))
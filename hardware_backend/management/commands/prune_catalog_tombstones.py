@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hardware_backend.models import CatalogTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete catalog tombstones older than CATALOG_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        # Tokens older than the retention window get a full snapshot
+        # (catalog_sync.changes_since), so these tombstones are never read again
+        days = getattr(settings, 'CATALOG_TOMBSTONE_RETENTION_DAYS', 90)
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = CatalogTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted:,} tombstones older than {days} days'))
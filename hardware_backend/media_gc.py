@@ -0,0 +1,127 @@
+"""
+Garbage collection for content-addressed media (utils.store_image).
+
+An uploaded image is stored once under the SHA-256 of its content, so the
+same photo used by 40 products is one file with 40 references. Files are
+never deleted when a row drops or replaces its image, because another row
+may still use them. Instead
+
+    python manage.py gc_media [--dry-run]
+
+counts the references to every file (REFERENCES: the catalog image columns,
+plus the product images copied onto order and invoice lines) and deletes,
+in one sweep, the files in MEDIA_FOLDERS that nothing references, along
+with their resized variants, from the media storage (local or S3; S3
+objects go in DeleteObjects batches). Files written within
+MEDIA_GC_GRACE_SECONDS are kept: their row may not be committed yet.
+
+A reference is matched on the file's key, `<folder>/<sha256>.<ext>`, and
+not on the URL prefix, so rows saved before MEDIA_URL or AWS_S3_PUBLIC_URL
+changed (a CDN put in front, say) still count. If rows reference media but
+none of them matches a stored file, the sweep refuses to delete anything.
+"""
+import posixpath
+import time
+from collections import Counter
+from functools import reduce
+from operator import or_
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+
+from kipenzi.media_storage import get_storage
+
+from .models import Banner, Brand, InvoiceItem, OrderItem, Product, ProductCategory, ProductType
+from .utils import VARIANT_FOLDER
+
+MEDIA_FOLDERS = ['products', 'categories', 'brands', 'product_types', 'banners']
+
+# model -> its columns holding a media URL (or, for JSON fields, a list of them)
+REFERENCES = {
+    Product: ['image', 'images'],
+    ProductCategory: ['image'],
+    Brand: ['logo'],
+    ProductType: ['image'],
+    Banner: ['image'],
+    OrderItem: ['product_image'],
+    InvoiceItem: ['product_image'],
+}
+
+
+def media_key(url):
+    """
+    The stored name a media URL points at, `<folder>/<file>` for a file in
+    MEDIA_FOLDERS, whatever host or prefix served it; None otherwise.
+    """
+    if not isinstance(url, str) or not url:
+        return None
+    parts = urlsplit(url).path.split('/')
+    if len(parts) < 2 or parts[-2] not in MEDIA_FOLDERS or not parts[-1]:
+        return None
+    return f'{parts[-2]}/{parts[-1]}'
+
+
+def reference_counts():
+    """{file name: number of rows referencing it} for all stored media, one query per model"""
+    counts = Counter()
+    for model, fields in REFERENCES.items():
+        rows = model.objects.filter(reduce(or_, (Q(**{f'{field}__isnull': False}) for field in fields)))
+        for values in rows.values_list(*fields).iterator(chunk_size=2000):
+            names = set()
+            for value in values:
+                for url in (value if isinstance(value, list) else [value]):
+                    name = media_key(url)
+                    if name:
+                        names.add(name)
+            counts.update(names)
+    return counts
+
+
+def collect_garbage(dry_run=False, grace_seconds=None):
+    """
+    Delete the unreferenced files (and their variants) in MEDIA_FOLDERS that
+    are older than the grace period. Returns {'files', 'bytes'} deleted and
+    {'kept', 'shared', 'references'}: the files kept, how many of them
+    several rows share, and the rows referencing them. With dry_run nothing
+    is deleted. Raises ValueError, deleting nothing, when rows reference
+    media but none of those files is found in the storage.
+    """
+    if grace_seconds is None:
+        grace_seconds = getattr(settings, 'MEDIA_GC_GRACE_SECONDS', 86400)
+    cutoff = time.time() - grace_seconds
+    storage = get_storage()
+    counts = reference_counts()
+
+    result = {'files': 0, 'bytes': 0, 'kept': 0, 'shared': 0, 'references': sum(counts.values())}
+    garbage = []
+    matched = 0
+    for folder in MEDIA_FOLDERS:
+        kept_stems = set()
+        for stored in storage.list(folder):
+            references = counts.get(stored.name, 0)
+            matched += references > 0
+            if references or stored.modified >= cutoff:
+                result['kept'] += 1
+                result['shared'] += references > 1
+                kept_stems.add(posixpath.splitext(posixpath.basename(stored.name))[0])
+                continue
+            garbage.append(stored)  # also uploads that never finished (UPLOAD_SUFFIX)
+
+        # The variants of the files deleted here, and any whose original is gone
+        for stored in storage.list(f'{folder}/{VARIANT_FOLDER}'):
+            stem = posixpath.basename(stored.name).rsplit('-', 1)[0]
+            if stem not in kept_stems and stored.modified < cutoff:
+                garbage.append(stored)
+
+    if counts and not matched:
+        raise ValueError(
+            f'{len(counts):,} media files are referenced but none was found in the storage; '
+            'check MEDIA_STORAGE and MEDIA_ROOT / AWS_STORAGE_BUCKET_NAME. Nothing was deleted.'
+        )
+
+    result['files'] = len(garbage)
+    result['bytes'] = sum(stored.size for stored in garbage)
+    if not dry_run:
+        storage.delete([stored.name for stored in garbage])
+    return result
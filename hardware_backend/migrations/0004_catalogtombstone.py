@@ -0,0 +1,30 @@
+# Generated manually for catalog delta sync tombstones
+
+from django.db import migrations, models
+import hardware_backend.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_backend', '0003_add_product_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTombstone',
+            fields=[
+                ('tombstone_id', models.CharField(default=hardware_backend.models.generate_uuid, max_length=50, primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=30)),
+                ('object_id', models.CharField(max_length=50)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'catalog_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='products_updated_at_idx'),
+        ),
+    ]
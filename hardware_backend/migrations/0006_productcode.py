@@ -0,0 +1,29 @@
+# Generated manually for product barcodes / SKUs
+
+from django.db import migrations, models
+import django.db.models.deletion
+import hardware_backend.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_backend', '0005_product_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCode',
+            fields=[
+                ('code_id', models.CharField(default=hardware_backend.models.generate_uuid, max_length=50, primary_key=True, serialize=False)),
+                ('code', models.CharField(max_length=64, unique=True)),
+                ('pack_type', models.CharField(choices=[('Piece', 'Piece'), ('Dozen', 'Dozen')], default='Piece', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='codes', to='hardware_backend.product')),
+            ],
+            options={
+                'db_table': 'product_codes',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated manually for the per-day invoice number sequence
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_backend', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('last', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'invoice_sequences',
+            },
+        ),
+    ]
@@ -1,12 +1,21 @@
 from django.db import models
 import uuid
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
 from decimal import Decimal
+from django.utils import timezone
 
 def generate_uuid():
     """Generate a UUID string for model primary keys"""
     return str(uuid.uuid4())
 
+def is_hashed(password):
+    """True for a password already hashed by one of PASSWORD_HASHERS"""
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
 class BusinessUser(models.Model):
     """Business user model for hardware delivery app"""
 
@@ -27,7 +36,7 @@ class BusinessUser(models.Model):
         db_table = "business_users"
     
     def save(self, *args, **kwargs):
-        if self.password and not self.password.startswith('pbkdf2_sha256$'):
+        if self.password and not is_hashed(self.password):
             self.password = make_password(self.password)
         super().save(*args, **kwargs)
     
@@ -43,6 +52,7 @@ class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     image = models.CharField(max_length=500, blank=True, null=True)
+    image_variants = models.JSONField(null=True, blank=True, default=None)  # resized WebP / JPEG copies (image_variants.py)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -96,6 +106,7 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.CharField(max_length=500, blank=True, null=True)
     images = models.JSONField(null=True, blank=True, default=None)  # optional list of up to 3 image URLs
+    image_variants = models.JSONField(null=True, blank=True, default=None)  # resized WebP / JPEG copies (image_variants.py)
 
     # Relationships
     category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, related_name='products')
@@ -123,6 +134,13 @@ class Product(models.Model):
     
     class Meta:
         db_table = "products"
+        indexes = [
+            models.Index(fields=['updated_at'], name='products_updated_at_idx'),  # catalog delta sync
+            # products/browse/ filters and facet counts
+            models.Index(fields=['is_active', 'category'], name='products_active_category_idx'),
+            models.Index(fields=['is_active', 'brand'], name='products_active_brand_idx'),
+            models.Index(fields=['is_active', 'product_type'], name='products_active_type_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -150,11 +168,32 @@ class ProductBatch(models.Model):
     def __str__(self):
         return f"{self.batch_number} - {self.product.name}"
 
+class ProductCode(models.Model):
+    """A barcode or SKU scanned at the till; a product can have several (e.g. one per pack size)"""
+    PACK_TYPE_CHOICES = [
+        ('Piece', 'Piece'),
+        ('Dozen', 'Dozen'),
+    ]
+    
+    code_id = models.CharField(max_length=50, primary_key=True, default=generate_uuid)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='codes')
+    code = models.CharField(max_length=64, unique=True)  # stored normalized, see product_codes.normalize_code
+    pack_type = models.CharField(max_length=10, choices=PACK_TYPE_CHOICES, default='Piece')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = "product_codes"
+    
+    def __str__(self):
+        return f"{self.code} ({self.pack_type}) - {self.product_id}"
+
 class Banner(models.Model):
     """Banner images for home page"""
     banner_id = models.CharField(max_length=50, primary_key=True, default=generate_uuid)
     title = models.CharField(max_length=200)
     image = models.CharField(max_length=500)
+    image_variants = models.JSONField(null=True, blank=True, default=None)  # resized WebP / JPEG copies (image_variants.py)
     description = models.TextField(blank=True, null=True)
     link_url = models.CharField(max_length=500, blank=True, null=True)
     is_active = models.BooleanField(default=True)
@@ -510,19 +549,15 @@ class Invoice(models.Model):
         return f"Invoice {self.invoice_number or self.invoice_id} - {self.customer_name}"
     
     def generate_invoice_number(self):
-        """Generate a human-readable invoice number"""
+        """Generate a human-readable invoice number: the next of today's sequence (invoicing.invoice_numbers)"""
         if not self.invoice_number:
-            from datetime import datetime
-            date_str = datetime.now().strftime('%Y%m%d')
-            # Get the count of invoices for today
-            today_invoices = Invoice.objects.filter(created_at__date=datetime.now().date()).count()
-            self.invoice_number = f"INV-{date_str}-{today_invoices + 1:04d}"
+            from .invoicing import invoice_numbers
+            self.invoice_number = invoice_numbers(1)[0]
             self.save()
         return self.invoice_number
     
-    def calculate_totals(self):
-        """Calculate invoice totals from invoice items"""
-        subtotal = sum(item.total_price for item in self.invoice_items.all())
+    def set_totals(self, subtotal):
+        """Set the invoice totals from the items' subtotal, in memory (the caller saves)"""
         self.subtotal = subtotal
         
         # Medicine products: no tax
@@ -530,7 +565,30 @@ class Invoice(models.Model):
 
         # Total amount
         self.total_amount = self.subtotal - self.discount_amount + self.tax_amount + self.shipping_amount
-        self.save()
+
+    def calculate_totals(self):
+        """
+        Recalculate the invoice totals from its items with one SQL aggregate
+        and write them with one UPDATE, for an item added, edited or deleted on
+        its own. Code writing many items (invoicing.py) sets the totals in
+        memory with set_totals() and saves the invoice once.
+        """
+        subtotal = self.invoice_items.aggregate(subtotal=models.Sum('total_price'))['subtotal']
+        self.set_totals(subtotal or Decimal('0.00'))
+        self.updated_at = timezone.now()
+        Invoice.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal, tax_amount=self.tax_amount, total_amount=self.total_amount,
+            updated_at=self.updated_at,
+        )
+
+
+class InvoiceSequence(models.Model):
+    """The last invoice number issued each day (INV-YYYYMMDD-NNNN); its row lock serializes numbering"""
+    day = models.DateField(primary_key=True)
+    last = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "invoice_sequences"
 
 
 class InvoiceItem(models.Model):
@@ -566,9 +624,20 @@ class InvoiceItem(models.Model):
         return f"{self.quantity}x {self.product_name} - Invoice {self.invoice.invoice_number or self.invoice.invoice_id}"
     
     def save(self, *args, **kwargs):
-        # Calculate total price
+        # Calculate total price (the invoice totals are not touched: call invoice.calculate_totals())
         self.total_price = self.quantity * self.unit_price
         super().save(*args, **kwargs)
-        # Recalculate invoice totals
-        if self.invoice:
-            self.invoice.calculate_totals()
+
+
+class CatalogTombstone(models.Model):
+    """A deleted catalog row, kept so delta-sync clients can drop it (see catalog_sync.py)"""
+    tombstone_id = models.CharField(max_length=50, primary_key=True, default=generate_uuid)
+    entity = models.CharField(max_length=30)  # an entity name from catalog_sync.SYNC_ENTITIES
+    object_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        db_table = "catalog_tombstones"
+    
+    def __str__(self):
+        return f"{self.entity} {self.object_id} deleted {self.deleted_at}"
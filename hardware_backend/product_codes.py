@@ -0,0 +1,121 @@
+"""
+Barcodes and SKUs for POS scanning.
+
+    products/by-code/<code>/          one scanned code
+    products/by-codes/?codes=a,b,c    a whole basket (up to MAX_LOOKUP_CODES)
+    admin/products/codes/import/      bulk create / reassign codes
+
+A product can carry several codes, typically one per pack: the barcode on a
+single piece and the one on the dozen carton. A lookup returns the product
+in the lean POS representation (ProductSerializer's lean fields, or
+?fields=) with the pack_type the scanned code stands for, in one query: the
+product rows joined to product_codes through the unique index on code.
+
+Codes are normalized before they are stored or looked up (surrounding
+whitespace removed, letters upper-cased), so "abc-123 " and "ABC-123" are the
+same SKU.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Product, ProductCode
+
+MAX_CODE_LENGTH = ProductCode._meta.get_field('code').max_length
+MAX_LOOKUP_CODES = 200
+CHUNK_SIZE = 1000  # codes per IN (...) query and per bulk write
+PACK_TYPES = [choice for choice, _ in ProductCode.PACK_TYPE_CHOICES]
+
+
+def normalize_code(code):
+    return str(code if code is not None else '').strip().upper()
+
+
+def chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def lookup(codes, fieldset):
+    """{code: {'code', 'pack_type', 'product'}} for the given codes that belong to active products"""
+    codes = list(dict.fromkeys(code for code in map(normalize_code, codes) if code))
+    if not codes:
+        return {}
+    products = list(
+        fieldset.optimize(Product.objects.filter(is_active=True, codes__code__in=codes))
+        .annotate(scanned_code=F('codes__code'), scanned_pack_type=F('codes__pack_type'))
+    )
+    rendered = fieldset.data(products, many=True)
+    return {
+        product.scanned_code: {'code': product.scanned_code, 'pack_type': product.scanned_pack_type, 'product': data}
+        for product, data in zip(products, rendered)
+    }
+
+
+def clean_rows(rows):
+    """Valid (code, product_id, pack_type) rows and an error for each invalid one"""
+    cleaned = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        code = normalize_code(row.get('code'))
+        product_id = str(row.get('product_id') or '').strip()
+        pack_type = str(row.get('pack_type') or 'Piece').strip().capitalize()
+        if not code:
+            message = 'code is required'
+        elif len(code) > MAX_CODE_LENGTH:
+            message = f'code is longer than {MAX_CODE_LENGTH} characters'
+        elif not product_id:
+            message = 'product_id is required'
+        elif pack_type not in PACK_TYPES:
+            message = f'pack_type must be one of: {", ".join(PACK_TYPES)}'
+        elif code in cleaned:
+            message = f'code is already used in row {cleaned[code][0]} of this import'
+        else:
+            cleaned[code] = (number, product_id, pack_type)
+            continue
+        errors.append({'row': number, 'code': code, 'message': message})
+    return cleaned, errors
+
+
+def import_codes(rows):
+    """
+    Create codes, or point existing ones at a new product / pack type, from
+    [{'code', 'product_id', 'pack_type'}] rows. Invalid rows are reported and
+    skipped; the others are written in one transaction with a fixed number of
+    queries per CHUNK_SIZE rows.
+    """
+    cleaned, errors = clean_rows(rows)
+    product_ids = list({product_id for _, product_id, _ in cleaned.values()})
+    known_products = set()
+    for chunk in chunks(product_ids):
+        known_products.update(Product.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    existing = {}
+    for chunk in chunks(list(cleaned)):
+        existing.update((code.code, code) for code in ProductCode.objects.filter(code__in=chunk))
+
+    now = timezone.now()
+    created, updated, unchanged = [], [], 0
+    for code, (number, product_id, pack_type) in cleaned.items():
+        if product_id not in known_products:
+            errors.append({'row': number, 'code': code, 'message': 'Product not found'})
+        elif code not in existing:
+            created.append(ProductCode(code=code, product_id=product_id, pack_type=pack_type))
+        elif (existing[code].product_id, existing[code].pack_type) == (product_id, pack_type):
+            unchanged += 1
+        else:
+            product_code = existing[code]
+            product_code.product_id = product_id
+            product_code.pack_type = pack_type
+            product_code.updated_at = now  # bulk_update() skips auto_now; delta sync reads it
+            updated.append(product_code)
+
+    with transaction.atomic():
+        ProductCode.objects.bulk_create(created, batch_size=CHUNK_SIZE)
+        ProductCode.objects.bulk_update(updated, ['product', 'pack_type', 'updated_at'], batch_size=CHUNK_SIZE)
+
+    return {
+        'created': len(created),
+        'updated': len(updated),
+        'unchanged': unchanged,
+        'errors': sorted(errors, key=lambda error: error['row']),
+    }
@@ -0,0 +1,197 @@
+"""
+Faceted product listing: products/browse/.
+
+    ?category=<id>[,<id>...]  ?brand=...  ?product_type=...
+    ?min_price=1000  ?max_price=5000  ?in_stock=true  ?featured=true
+    ?ordering=name|-name|price|-price|newest  ?page=1  ?page_size=24
+
+returns one page of active products plus, for every filter dimension, the
+counts the app's filter chips show:
+
+    category / brand / product_type   [{id, name, count, selected}, ...]
+    in_stock / featured               {"true": n, "false": n}
+    price                             {"min": "...", "max": "..."}
+
+Counts are disjunctive: each dimension is counted with every other filter
+applied but not its own, so with one brand selected the other brands still
+show how many products selecting them would add.
+
+The number of queries does not depend on the catalog or the selection: one
+grouped query per id dimension, one aggregate query for the total, the
+in-stock / featured counts and the price range (conditional aggregates over
+the rows the id filters leave), and the page itself. Every query filters on
+is_active plus a category / brand / product type, which the composite
+indexes on Product cover.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Max, Min, Q
+
+from .models import Product
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Multi-value dimensions: (parameter, column, name column)
+ID_FACETS = [
+    ('category', 'category_id', 'category__name'),
+    ('brand', 'brand_id', 'brand__name'),
+    ('product_type', 'product_type_id', 'product_type__name'),
+]
+IN_STOCK = Q(stock_quantity__gt=0)
+ORDERINGS = {
+    'name': ('name', 'pk'),
+    '-name': ('-name', 'pk'),
+    'price': ('price', 'pk'),
+    '-price': ('-price', 'pk'),
+    'newest': ('-created_at', 'pk'),
+}
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def parse_ids(params, name):
+    """?brand=a,b and ?brand=a&brand=b both give ['a', 'b']"""
+    return [value.strip() for item in params.getlist(name) for value in item.split(',') if value.strip()]
+
+
+def parse_bool(params, name):
+    value = params.get(name, '').strip().lower()
+    if not value:
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def parse_price(params, name):
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'{name} must be a number')
+    if not price.is_finite() or price < 0:
+        raise ValueError(f'{name} must be a positive number')
+    return price
+
+
+def parse_positive_int(params, name, default, maximum=None):
+    value = params.get(name, '').strip()
+    if not value:
+        return default
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f'{name} must be a positive integer')
+    return min(int(value), maximum) if maximum else int(value)
+
+
+def parse_filters(params):
+    """{dimension: Q} for the filters present in the query string; ValueError for bad values"""
+    filters = {}
+    selected = {}
+    for name, column, _ in ID_FACETS:
+        ids = parse_ids(params, name)
+        selected[name] = set(ids)
+        if ids:
+            filters[name] = Q(**{f'{column}__in': ids})
+
+    min_price = parse_price(params, 'min_price')
+    max_price = parse_price(params, 'max_price')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError('min_price must not be greater than max_price')
+    price = Q()
+    if min_price is not None:
+        price &= Q(price__gte=min_price)
+    if max_price is not None:
+        price &= Q(price__lte=max_price)
+    if price:
+        filters['price'] = price
+
+    in_stock = parse_bool(params, 'in_stock')
+    if in_stock is not None:
+        filters['in_stock'] = IN_STOCK if in_stock else ~IN_STOCK
+    featured = parse_bool(params, 'featured')
+    if featured is not None:
+        filters['featured'] = Q(is_featured=featured)
+    return filters, selected
+
+
+def combine(filters, exclude=()):
+    """All the filters except the dimensions in `exclude`, ANDed"""
+    q = Q()
+    for name, condition in filters.items():
+        if name not in exclude:
+            q &= condition
+    return q
+
+
+def format_price(value):
+    return None if value is None else f'{value:.2f}'
+
+
+def facet_counts(filters, selected):
+    """Facet counts for every dimension, plus the number of products matching all filters"""
+    active = Product.objects.filter(is_active=True)
+    facets = {}
+    for name, column, name_column in ID_FACETS:
+        rows = (
+            active.filter(combine(filters, exclude=(name,)))
+            .values(column, name_column)
+            .annotate(count=Count('pk'))
+            .order_by(name_column, column)
+        )
+        facets[name] = [
+            {'id': row[column], 'name': row[name_column], 'count': row['count'], 'selected': row[column] in selected[name]}
+            for row in rows
+        ]
+
+    # The id filters apply to every count below, so they go in the WHERE clause
+    id_dimensions = [name for name, _, _ in ID_FACETS]
+    scalar_dimensions = [name for name in filters if name not in id_dimensions]
+    without_stock = combine(filters, exclude=id_dimensions + ['in_stock'])
+    without_featured = combine(filters, exclude=id_dimensions + ['featured'])
+    without_price = combine(filters, exclude=id_dimensions + ['price'])
+    totals = active.filter(combine(filters, exclude=scalar_dimensions)).aggregate(
+        total=Count('pk', filter=combine(filters, exclude=id_dimensions) or None),
+        in_stock=Count('pk', filter=without_stock & IN_STOCK),
+        out_of_stock=Count('pk', filter=without_stock & ~IN_STOCK),
+        featured=Count('pk', filter=without_featured & Q(is_featured=True)),
+        not_featured=Count('pk', filter=without_featured & Q(is_featured=False)),
+        min_price=Min('price', filter=without_price or None),
+        max_price=Max('price', filter=without_price or None),
+    )
+    facets['in_stock'] = {'true': totals['in_stock'], 'false': totals['out_of_stock']}
+    facets['featured'] = {'true': totals['featured'], 'false': totals['not_featured']}
+    facets['price'] = {'min': format_price(totals['min_price']), 'max': format_price(totals['max_price'])}
+    return totals['total'], facets
+
+
+def browse(params, fieldset):
+    """One page of products matching `params` with its facet counts; ValueError for bad parameters"""
+    filters, selected = parse_filters(params)
+    ordering = params.get('ordering', 'name')
+    if ordering not in ORDERINGS:
+        raise ValueError(f'ordering must be one of: {", ".join(ORDERINGS)}')
+    page = parse_positive_int(params, 'page', 1)
+    page_size = parse_positive_int(params, 'page_size', DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE)
+
+    total, facets = facet_counts(filters, selected)
+    products = []
+    offset = (page - 1) * page_size
+    if offset < total:
+        queryset = Product.objects.filter(is_active=True).filter(combine(filters)).order_by(*ORDERINGS[ordering])
+        products = fieldset.data(queryset[offset:offset + page_size], many=True)
+
+    return {
+        'products': products,
+        'pagination': {
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': (total + page_size - 1) // page_size,
+        },
+        'facets': facets,
+    }
@@ -0,0 +1,517 @@
+"""
+Bulk product import from a CSV or XLSX file.
+
+    POST admin/products/import/                      multipart "file", optional dry_run=true
+    python manage.py import_products products.xlsx [--dry-run]
+
+One row per product; the header row names the columns (any order, case and
+spaces ignored, unknown columns skipped):
+
+    name, price, category, brand, product_type   required for new products
+    shelf                                        shelf name or id, required for new products
+    product_id                                   update this product
+    description, image, subtype, size, color, material, weight, dimensions,
+    is_active, is_featured, stock_quantity, minimum_stock, expiry_date
+    barcode, pack_type                           a scan code (product_codes.py)
+    batch_number, supplier, cost_price, selling_price,
+    batch_quantity, batch_expiry_date            a stock batch (by batch_number)
+
+Categories, brands, product types and shelves can be given by name or id. A
+row updates an existing product when its product_id, its barcode, or its name
+and brand match one, and creates a product otherwise. On update, empty cells
+leave the current value alone; an existing batch keeps its quantities.
+
+The file is read row by row (csv, or openpyxl in read-only mode) and written
+CHUNK_SIZE rows at a time. Names are resolved through dictionaries loaded
+once, so a chunk costs a fixed number of queries: finding the existing
+products, locations and batches, then bulk_create / bulk_update of each. A
+row that fails validation is reported with its line number and skipped; the
+rest of the file is still imported. A barcode that cannot be saved (already
+used by another row) is listed in code_errors instead: its product was
+written, so every row counts once as created, updated or rejected. Each chunk is written and committed in
+its own transaction, so a long import holds no locks between chunks and an
+interrupted one keeps the chunks already written; a dry run writes each chunk
+and rolls it back. (A dry run therefore sees a product as new in every chunk
+that names it.)
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import (
+    Brand, Product, ProductBatch, ProductCategory, ProductCode, ProductLocation, ProductType, Shelf,
+)
+from .product_codes import MAX_CODE_LENGTH, PACK_TYPES, import_codes, normalize_code
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - only .xlsx files need it
+    openpyxl = None
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+TEXT, DECIMAL, INTEGER, BOOLEAN, DATE = 'text', 'decimal', 'integer', 'boolean', 'date'
+PRODUCT_COLUMNS = {
+    'name': TEXT, 'description': TEXT, 'price': DECIMAL, 'image': TEXT, 'subtype': TEXT, 'size': TEXT,
+    'color': TEXT, 'material': TEXT, 'weight': DECIMAL, 'dimensions': TEXT, 'is_active': BOOLEAN,
+    'is_featured': BOOLEAN, 'stock_quantity': INTEGER, 'minimum_stock': INTEGER, 'expiry_date': DATE,
+}
+BATCH_COLUMNS = {
+    'batch_number': TEXT, 'supplier': TEXT, 'cost_price': DECIMAL, 'selling_price': DECIMAL,
+    'batch_quantity': INTEGER, 'batch_expiry_date': DATE,
+}
+REFERENCE_COLUMNS = ['category', 'brand', 'product_type', 'shelf']
+SINGULAR = {'categories': 'category', 'brands': 'brand', 'shelves': 'shelf'}
+COLUMNS = {
+    'product_id', 'barcode', 'pack_type', *PRODUCT_COLUMNS, *BATCH_COLUMNS, *REFERENCE_COLUMNS,
+}
+REQUIRED_FOR_NEW = ['name', 'price', 'category', 'brand', 'product_type', 'shelf']
+FOREIGN_KEYS = ['category', 'brand', 'product_type']
+TRUE_VALUES = ('true', '1', 'yes', 'y')
+FALSE_VALUES = ('false', '0', 'no', 'n')
+
+
+class RowError(ValueError):
+    pass
+
+
+def column_name(header):
+    return str(header if header is not None else '').strip().lower().replace(' ', '_')
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header:
+        raise ValueError('The file is empty')
+    columns = [column_name(value) for value in header]
+    yield columns
+    for values in reader:
+        if any(value.strip() for value in values):
+            yield reader.line_num, dict(zip(columns, values))
+
+
+def read_xlsx(file):
+    if openpyxl is None:
+        raise ValueError('Reading .xlsx files needs openpyxl installed; upload a CSV file instead')
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ValueError('The file is empty')
+        columns = [column_name(value) for value in header]
+        yield columns
+        for line, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                yield line, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """The column names, then (line number, {column: value}) for each non-empty row"""
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(file)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return read_csv(file)
+    raise ValueError('Upload a .csv or .xlsx file')
+
+
+def text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet numbers: 6001234567890.0 is a barcode, not a float
+    return '' if value is None else str(value).strip()
+
+
+def parse_value(kind, value):
+    """A cell converted to `kind`; None for an empty cell, RowError if it does not parse"""
+    if isinstance(value, str):
+        value = value.strip()
+    if value in (None, ''):
+        return None
+    if kind == TEXT:
+        return text(value)
+    if kind == DECIMAL:
+        try:
+            number = Decimal(text(value).replace(',', ''))
+        except InvalidOperation:
+            raise RowError('must be a number')
+        if not number.is_finite():
+            raise RowError('must be a number')
+        return number
+    if kind == INTEGER:
+        try:
+            number = Decimal(text(value).replace(',', ''))
+        except InvalidOperation:
+            raise RowError('must be a whole number')
+        if not number.is_finite() or number != number.to_integral_value():
+            raise RowError('must be a whole number')
+        return int(number)
+    if kind == BOOLEAN:
+        if isinstance(value, bool):
+            return value
+        if text(value).lower() in TRUE_VALUES:
+            return True
+        if text(value).lower() in FALSE_VALUES:
+            return False
+        raise RowError('must be true or false')
+    if kind == DATE:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        try:
+            return date.fromisoformat(text(value))
+        except ValueError:
+            raise RowError('must be a date (YYYY-MM-DD)')
+    raise AssertionError(kind)
+
+
+def parse_cells(raw, columns):
+    """{column: value} for the non-empty cells of `columns`; RowError listing every bad cell"""
+    values = {}
+    problems = []
+    for column, kind in columns.items():
+        if column not in raw:
+            continue
+        try:
+            value = parse_value(kind, raw[column])
+        except RowError as e:
+            problems.append(f'{column} {e}')
+            continue
+        if value is not None:
+            values[column] = value
+    if problems:
+        raise RowError('; '.join(problems))
+    return values
+
+
+class References:
+    """Categories, brands, product types and shelves by id and by (case-folded) name"""
+
+    def __init__(self):
+        self.categories = {}
+        for category_id, name in ProductCategory.objects.values_list('category_id', 'name'):
+            self.categories[category_id] = self.categories[name.casefold()] = category_id
+        self.brands = {}
+        for brand_id, name in Brand.objects.values_list('brand_id', 'name'):
+            self.brands[brand_id] = self.brands[name.casefold()] = brand_id
+        self.type_categories = {}
+        self.types = {}  # (category_id, name) -> type_id; names are unique per category
+        for type_id, name, category_id in ProductType.objects.values_list('type_id', 'name', 'category_id'):
+            self.type_categories[type_id] = category_id
+            self.types[(category_id, name.casefold())] = type_id
+        self.shelves = {}
+        for shelf_id, name in Shelf.objects.values_list('shelf_id', 'name'):
+            self.shelves[shelf_id] = shelf_id
+            # Shelf names are not unique: an ambiguous name resolves to None
+            key = name.casefold()
+            self.shelves[key] = None if key in self.shelves and self.shelves[key] != shelf_id else shelf_id
+
+    def resolve(self, kind, value):
+        table = getattr(self, kind)
+        key = value if value in table else value.casefold()
+        if key not in table:
+            raise RowError(f'{SINGULAR[kind]} "{value}" not found')
+        if table[key] is None:
+            raise RowError(f'more than one shelf is called "{value}"; use its id')
+        return table[key]
+
+    def resolve_type(self, value, category_id):
+        if value in self.type_categories:
+            if category_id and self.type_categories[value] != category_id:
+                raise RowError(f'product type "{value}" belongs to another category')
+            return value
+        type_id = self.types.get((category_id, value.casefold()))
+        if type_id is None:
+            raise RowError(f'product type "{value}" not found in the category')
+        return type_id
+
+
+def parse_row(line, raw, references):
+    """The cells of one row converted and checked, before looking at the database"""
+    row = {'line': line, 'product_id': text(raw.get('product_id')) or None}
+    row['values'] = parse_cells(raw, PRODUCT_COLUMNS)
+    row['batch'] = parse_cells(raw, BATCH_COLUMNS)
+    if row['batch'] and 'batch_number' not in row['batch']:
+        raise RowError('batch_number is required for batch columns')
+
+    for column in REFERENCE_COLUMNS:
+        value = text(raw.get(column))
+        kind = {'category': 'categories', 'brand': 'brands', 'shelf': 'shelves'}.get(column)
+        row[column] = references.resolve(kind, value) if value and kind else (value or None)
+
+    row['barcode'] = normalize_code(text(raw.get('barcode')))
+    if len(row['barcode']) > MAX_CODE_LENGTH:
+        raise RowError(f'barcode is longer than {MAX_CODE_LENGTH} characters')
+    row['pack_type'] = text(raw.get('pack_type')).capitalize() or 'Piece'
+    if row['pack_type'] not in PACK_TYPES:
+        raise RowError(f'pack_type must be one of: {", ".join(PACK_TYPES)}')
+    return row
+
+
+def validation_message(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f'{field} {" ".join(messages)}' for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+class ProductImport:
+    """Imports rows chunk by chunk and keeps the running totals"""
+
+    def __init__(self, columns, dry_run=False):
+        self.columns = set(columns)
+        self.dry_run = dry_run
+        self.references = References()
+        self.product_fields = [column for column in PRODUCT_COLUMNS if column in self.columns]
+        self.product_fields += [column for column in FOREIGN_KEYS if column in self.columns]
+        self.summary = {
+            'rows': 0, 'created': 0, 'updated': 0, 'locations': 0, 'batches': 0, 'codes': 0,
+            'rejected': 0, 'errors': [], 'code_errors': [], 'ignored_columns': sorted(set(columns) - COLUMNS - {''}),
+            'dry_run': dry_run,
+        }
+
+    def reject(self, line, message):
+        self.summary['rejected'] += 1
+        if len(self.summary['errors']) < MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'row': line, 'message': message})
+
+    def code_error(self, line, message):
+        if len(self.summary['code_errors']) < MAX_REPORTED_ERRORS:
+            self.summary['code_errors'].append({'row': line, 'message': message})
+
+    def import_chunk(self, raw_rows):
+        self.summary['rows'] += len(raw_rows)
+        rows = []
+        for line, raw in raw_rows:
+            try:
+                rows.append(parse_row(line, raw, self.references))
+            except RowError as e:
+                self.reject(line, str(e))
+        rows = self.match_products(rows)
+        rows = self.build_products(rows)
+        rows = self.build_locations_and_batches(rows)
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                self.write(rows)
+                if self.dry_run:
+                    transaction.set_rollback(True)
+        except DatabaseError as e:
+            for row in rows:
+                self.reject(row['line'], f'not saved: {e}')
+
+    def match_products(self, rows):
+        """Find the existing product of each row by product_id, barcode or name and brand"""
+        by_code = {}
+        barcodes = [row['barcode'] for row in rows if row['barcode'] and not row['product_id']]
+        if barcodes:
+            by_code = dict(ProductCode.objects.filter(code__in=barcodes).values_list('code', 'product_id'))
+
+        by_name = {}
+        names = [row['values']['name'] for row in rows if 'name' in row['values'] and row['brand']]
+        if names:
+            for product_id, name, brand_id in Product.objects.filter(name__in=names).values_list(
+                'product_id', 'name', 'brand_id'
+            ):
+                by_name.setdefault((name, brand_id), product_id)
+
+        for row in rows:
+            row['existing_id'] = row['product_id'] or by_code.get(row['barcode']) or by_name.get(
+                (row['values'].get('name'), row['brand'])
+            )
+        ids = {row['existing_id'] for row in rows if row['existing_id']}
+        self.existing = Product.objects.in_bulk(list(ids)) if ids else {}
+
+        matched = []
+        claimed = {}
+        for row in rows:
+            if row['product_id'] and row['product_id'] not in self.existing:
+                self.reject(row['line'], f'product "{row["product_id"]}" not found')
+                continue
+            key = row['existing_id'] or (row['values'].get('name'), row['brand'])
+            if key in claimed:
+                self.reject(row['line'], f'same product as row {claimed[key]}')
+                continue
+            claimed[key] = row['line']
+            matched.append(row)
+        return matched
+
+    def build_products(self, rows):
+        """A new or updated Product for each row, validated like a model form would"""
+        now = timezone.now()
+        valid = []
+        for row in rows:
+            product = self.existing.get(row['existing_id'])
+            if product is None:
+                missing = [column for column in REQUIRED_FOR_NEW if row['values'].get(column, row.get(column)) is None]
+                if missing:
+                    self.reject(row['line'], f'new product: {", ".join(missing)} required')
+                    continue
+                product = Product(description='')  # the column is NOT NULL in the migrations
+            for column, value in row['values'].items():
+                setattr(product, column, value)
+            try:
+                if row['category']:
+                    product.category_id = row['category']
+                if row['brand']:
+                    product.brand_id = row['brand']
+                if row['product_type']:
+                    product.product_type_id = self.references.resolve_type(row['product_type'], product.category_id)
+                product.clean_fields(exclude=FOREIGN_KEYS)
+            except RowError as e:
+                self.reject(row['line'], str(e))
+                continue
+            except ValidationError as e:
+                self.reject(row['line'], validation_message(e))
+                continue
+            product.updated_at = now  # bulk_update() skips auto_now; delta sync reads it
+            row['product'] = product
+            row['created'] = row['existing_id'] is None
+            valid.append(row)
+        return valid
+
+    def build_locations_and_batches(self, rows):
+        product_ids = [row['product'].pk for row in rows if not row['created']]
+        locations = {}
+        if product_ids and any(row['shelf'] for row in rows):
+            for location in ProductLocation.objects.filter(product_id__in=product_ids):
+                locations[(location.product_id, location.shelf_id)] = location
+        batches = {}
+        numbers = [row['batch']['batch_number'] for row in rows if row['batch'] and not row['created']]
+        if numbers:
+            for batch in ProductBatch.objects.filter(product_id__in=product_ids, batch_number__in=numbers):
+                batches[(batch.product_id, batch.batch_number)] = batch
+
+        now = timezone.now()
+        valid = []
+        for row in rows:
+            product = row['product']
+            row['location'] = None
+            if row['shelf']:
+                location = locations.get((product.pk, row['shelf']))
+                if location is None:
+                    location = ProductLocation(product=product, shelf_id=row['shelf'], quantity=max(product.stock_quantity, 0))
+                    row['location'] = location
+                elif 'stock_quantity' in row['values']:
+                    location.quantity = max(product.stock_quantity, 0)
+                    location.updated_at = now
+                    row['location'] = location
+
+            row['batch_object'] = None
+            if row['batch']:
+                try:
+                    row['batch_object'] = self.build_batch(row, batches.get((product.pk, row['batch']['batch_number'])), now)
+                except RowError as e:
+                    self.reject(row['line'], str(e))
+                    continue
+                except ValidationError as e:
+                    self.reject(row['line'], validation_message(e))
+                    continue
+            valid.append(row)
+        return valid
+
+    def build_batch(self, row, batch, now):
+        values = row['batch']
+        product = row['product']
+        expiry_date = values.get('batch_expiry_date') or row['values'].get('expiry_date')
+        if batch is None:
+            quantity = values.get('batch_quantity', row['values'].get('stock_quantity'))
+            missing = [
+                column for column, value in (
+                    ('supplier', values.get('supplier')), ('cost_price', values.get('cost_price')),
+                    ('batch_quantity', quantity), ('batch_expiry_date', expiry_date),
+                ) if value is None
+            ]
+            if missing:
+                raise RowError(f'new batch: {", ".join(missing)} required')
+            batch = ProductBatch(
+                product=product, batch_number=values['batch_number'], quantity_received=quantity,
+                quantity_remaining=quantity,
+            )
+        else:
+            batch.updated_at = now
+        batch.supplier = values.get('supplier', batch.supplier)
+        batch.cost_price = values.get('cost_price', batch.cost_price)
+        batch.selling_price = values.get('selling_price', batch.selling_price or product.price)
+        batch.expiry_date = expiry_date or batch.expiry_date
+        batch.clean_fields(exclude=['product'])
+        return batch
+
+    def write(self, rows):
+        created = [row['product'] for row in rows if row['created']]
+        updated = [row['product'] for row in rows if not row['created']]
+        Product.objects.bulk_create(created)
+        if updated and self.product_fields:
+            Product.objects.bulk_update(updated, self.product_fields + ['updated_at'])
+
+        locations = [row['location'] for row in rows if row['location'] is not None]
+        ProductLocation.objects.bulk_create([location for location in locations if location._state.adding])
+        changed = [location for location in locations if not location._state.adding]
+        if changed:
+            ProductLocation.objects.bulk_update(changed, ['quantity', 'updated_at'])
+
+        batches = [row['batch_object'] for row in rows if row['batch_object'] is not None]
+        ProductBatch.objects.bulk_create([batch for batch in batches if batch._state.adding])
+        existing_batches = [batch for batch in batches if not batch._state.adding]
+        if existing_batches:
+            ProductBatch.objects.bulk_update(
+                existing_batches, ['supplier', 'cost_price', 'selling_price', 'expiry_date', 'updated_at']
+            )
+
+        codes = [
+            {'code': row['barcode'], 'product_id': row['product'].pk, 'pack_type': row['pack_type']}
+            for row in rows if row['barcode']
+        ]
+        code_result = import_codes(codes) if codes else {'created': 0, 'updated': 0, 'errors': []}
+
+        self.summary['created'] += len(created)
+        self.summary['updated'] += len(updated)
+        self.summary['locations'] += len(locations)
+        self.summary['batches'] += len(batches)
+        self.summary['codes'] += code_result['created'] + code_result['updated']
+        lines = [row['line'] for row in rows if row['barcode']]
+        for error in code_result['errors']:
+            line = lines[error['row'] - 1]
+            first = next(row['line'] for row in rows if row['barcode'] == error['code'])
+            # import_codes numbers its own rows; report the file's line instead
+            message = f'barcode is already used in row {first}' if first != line else f'barcode {error["message"]}'
+            self.code_error(line, message)
+
+
+def import_products(file, filename, dry_run=False, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """
+    Import the products in a CSV / XLSX file; returns the summary
+    {rows, created, updated, locations, batches, codes, rejected, errors, code_errors, ...}.
+    ValueError if the file itself cannot be read.
+    """
+    rows = read_rows(file, filename)
+    columns = next(rows)
+    if not {'name', 'product_id', 'barcode'} & set(columns):
+        raise ValueError('The header row needs a name, product_id or barcode column')
+
+    job = ProductImport(columns, dry_run=dry_run)
+    chunk = []
+    for line, raw in rows:
+        chunk.append((line, raw))
+        if len(chunk) >= chunk_size:
+            job.import_chunk(chunk)
+            chunk = []
+            if on_chunk:
+                on_chunk(job.summary)
+    if chunk:
+        job.import_chunk(chunk)
+        if on_chunk:
+            on_chunk(job.summary)
+    job.summary['errors'].sort(key=lambda error: error['row'])
+    job.summary['code_errors'].sort(key=lambda error: error['row'])
+    return job.summary
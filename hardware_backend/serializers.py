@@ -1,10 +1,12 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     BusinessUser, ProductCategory, Brand, ProductType, 
-    Product, ProductBatch, Banner, HardwareOTP, Order, OrderItem,
+    Product, ProductBatch, ProductCode, Banner, HardwareOTP, Order, OrderItem,
     Customer, Shelf, ProductLocation, Sale, SaleItem, Expense,
     Invoice, InvoiceItem
 )
+from .invoicing import MAX_BULK_ORDERS, clean_line, sync_items
 import random
 import string
 
@@ -56,10 +58,10 @@ class ProductCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = [
-            'category_id', 'name', 'description', 'image', 
+            'category_id', 'name', 'description', 'image', 'image_variants',
             'is_active', 'created_at'
         ]
-        read_only_fields = ['category_id', 'created_at']
+        read_only_fields = ['category_id', 'image_variants', 'created_at']
 
 class BrandSerializer(serializers.ModelSerializer):
     """Serializer for brands"""
@@ -117,6 +119,13 @@ class ProductBatchSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['batch_id', 'received_date', 'created_at', 'updated_at']
 
+class ProductCodeSerializer(serializers.ModelSerializer):
+    """Serializer for product barcodes / SKUs"""
+    class Meta:
+        model = ProductCode
+        fields = ['code_id', 'product', 'code', 'pack_type', 'created_at', 'updated_at']
+        read_only_fields = ['code_id', 'created_at', 'updated_at']
+
 class ProductSerializer(serializers.ModelSerializer):
     """Serializer for products"""
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -127,13 +136,15 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = [
-            'product_id', 'name', 'description', 'price', 'image', 'images',
+            'product_id', 'name', 'description', 'price', 'image', 'images', 'image_variants',
             'category', 'category_name', 'brand', 'brand_name',
             'product_type', 'product_type_name', 'subtype', 'size',
             'color', 'material', 'weight', 'dimensions', 'is_active',
             'is_featured', 'stock_quantity', 'minimum_stock', 'expiry_date', 'batches', 'created_at'
         ]
-        read_only_fields = ['product_id', 'created_at']
+        # Default for list endpoints (see fieldsets.py); more via ?fields= / ?expand=
+        lean_fields = ['product_id', 'name', 'price', 'image', 'image_variants', 'is_featured', 'stock_quantity']
+        read_only_fields = ['product_id', 'image_variants', 'created_at']
         extra_kwargs = {
             'description': {'required': False, 'allow_blank': True, 'allow_null': True},
         }
@@ -143,10 +154,10 @@ class BannerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Banner
         fields = [
-            'banner_id', 'title', 'image', 'description', 
+            'banner_id', 'title', 'image', 'image_variants', 'description',
             'link_url', 'is_active', 'order', 'created_at'
         ]
-        read_only_fields = ['banner_id', 'created_at']
+        read_only_fields = ['banner_id', 'image_variants', 'created_at']
 
 class HomePageSerializer(serializers.Serializer):
     """Serializer for home page data"""
@@ -170,6 +181,14 @@ class ProductTypeWithProductsSerializer(serializers.ModelSerializer):
             'type_id', 'name', 'category_name', 'description',
             'image', 'is_active', 'products'
         ]
+        # products_page attaches the active products itself
+        lean_fields = ['type_id', 'name', 'category_name', 'description', 'image', 'is_active']
+
+class ProductTypeSyncSerializer(serializers.ModelSerializer):
+    """Product types for catalog delta sync: the category as an id, nothing nested"""
+    class Meta:
+        model = ProductType
+        fields = ['type_id', 'name', 'category', 'description', 'image', 'is_active', 'created_at']
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer for order items"""
@@ -182,6 +201,10 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'total_price', 'product_name', 'product_description', 
             'product_image', 'created_at'
         ]
+        lean_fields = [
+            'order_item_id', 'quantity', 'unit_price', 'total_price',
+            'product_name', 'product_description', 'product_image', 'created_at'
+        ]
         read_only_fields = ['order_item_id', 'total_price', 'created_at']
 
 class OrderItemResponseSerializer(serializers.ModelSerializer):
@@ -196,7 +219,7 @@ class OrderItemResponseSerializer(serializers.ModelSerializer):
     
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['product_id'] = instance.product.product_id
+        data['product_id'] = instance.product_id  # the FK column: no query per item
         return data
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -214,6 +237,10 @@ class OrderSerializer(serializers.ModelSerializer):
             'payment_method', 'payment_status', 'order_items', 
             'created_at', 'updated_at'
         ]
+        lean_fields = [
+            'order_id', 'total_amount', 'delivery_phone', 'status', 'status_display',
+            'payment_method', 'payment_status', 'created_at', 'updated_at'
+        ]
         read_only_fields = ['order_id', 'total_amount', 'subtotal', 'tax_amount', 
                            'shipping_amount', 'created_at', 'updated_at']
 
@@ -232,7 +259,7 @@ class OrderResponseSerializer(serializers.ModelSerializer):
             'user_id', 'business_name', 'business_phone', 'business_location',
             'delivery_address', 'delivery_phone', 'delivery_notes',
             'payment_method', 'payment_timing', 'total_amount', 'partial_amount',
-            'mobile_money_number', 'items'
+            'mobile_money_number', 'order_status', 'items'
         ]
 
 class CreateOrderSerializer(serializers.ModelSerializer):
@@ -577,7 +604,7 @@ class ProductWithLocationSerializer(serializers.ModelSerializer):
 
 class InvoiceItemSerializer(serializers.ModelSerializer):
     """Serializer for invoice items"""
-    product_id = serializers.CharField(source='product.product_id', read_only=True, allow_null=True)
+    product_id = serializers.CharField(read_only=True, allow_null=True)  # the FK column: no query per item
     
     class Meta:
         model = InvoiceItem
@@ -616,6 +643,24 @@ class CreateInvoiceFromOrderSerializer(serializers.Serializer):
     terms_and_conditions = serializers.CharField(required=False, allow_blank=True)
 
 
+class BulkCreateInvoicesFromOrdersSerializer(CreateInvoiceFromOrderSerializer):
+    """Serializer for creating invoices for many orders: a list of order ids or an order filter"""
+    order_ids = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_BULK_ORDERS
+    )
+    order_status = serializers.ChoiceField(choices=Order.ORDER_STATUS_CHOICES, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    
+    def validate(self, data):
+        if 'order_ids' not in data and not any(key in data for key in ('order_status', 'date_from', 'date_to')):
+            raise serializers.ValidationError('Give order_ids or an order filter (order_status, date_from, date_to)')
+        return data
+
+
 class UpdateInvoiceSerializer(serializers.ModelSerializer):
     """Serializer for updating invoices"""
     invoice_items = serializers.ListField(
@@ -641,6 +686,12 @@ class UpdateInvoiceSerializer(serializers.ModelSerializer):
                 )
         return value
     
+    def validate_invoice_items(self, value):
+        try:
+            return [clean_line(item_data) for item_data in value]
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+    
     def update(self, instance, validated_data):
         invoice_items_data = validated_data.pop('invoice_items', None)
         
@@ -648,32 +699,13 @@ class UpdateInvoiceSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        # Update invoice items if provided
-        if invoice_items_data is not None:
-            # Delete existing items
-            instance.invoice_items.all().delete()
+        with transaction.atomic():
+            if invoice_items_data is not None:
+                # Write only the lines that changed and total them in memory
+                sync_items(instance, invoice_items_data)
+            else:
+                # Same items; the discount or shipping may have changed
+                instance.set_totals(instance.subtotal)
             
-            # Create new items
-            for item_data in invoice_items_data:
-                product_id = item_data.get('product_id')
-                product = None
-                if product_id:
-                    try:
-                        product = Product.objects.get(product_id=product_id)
-                    except Product.DoesNotExist:
-                        pass
-                
-                InvoiceItem.objects.create(
-                    invoice=instance,
-                    product=product,
-                    product_name=item_data.get('product_name', ''),
-                    product_description=item_data.get('product_description', ''),
-                    product_image=item_data.get('product_image', ''),
-                    category=item_data.get('category', ''),
-                    quantity=item_data.get('quantity', 1),
-                    unit_price=item_data.get('unit_price', 0),
-                    pack_type=item_data.get('pack_type', 'Piece')
-                )
-        
-        instance.save()
+            instance.save()
         return instance 
\ No newline at end of file
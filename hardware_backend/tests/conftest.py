@@ -0,0 +1,14 @@
+import pytest
+from django.core.management import call_command
+
+from .dataset import seed_dataset
+
+
+@pytest.fixture(scope='session', params=['small', 'large'])
+def dataset(request, django_db_setup, django_db_blocker):
+    """Seed one dataset profile for the whole session; tests roll back their own writes"""
+    with django_db_blocker.unblock():
+        refs = seed_dataset(request.param)
+    yield request.param, refs
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
@@ -0,0 +1,230 @@
+"""
+Seeded, bulk-inserted dataset for the query-budget suite.
+
+PROFILES sets how many rows of each model are created; seed_dataset() returns
+the ids the budget file refers to ($product, $order, ...).
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+
+from hardware_backend.models import (
+    BusinessUser, ProductCategory, Brand, ProductType, Product, ProductBatch, ProductCode,
+    Banner, HardwareOTP, Order, OrderItem, Customer, Shelf, ProductLocation, Sale, SaleItem,
+    Expense, Invoice, InvoiceItem
+)
+
+PROFILES = {
+    'small': {
+        'categories': 3, 'brands': 3, 'types_per_category': 2, 'products': 30,
+        'users': 5, 'orders': 20, 'items_per_order': 3, 'invoices': 10,
+        'customers': 10, 'sales': 20, 'shelves': 3, 'banners': 3, 'expenses': 10,
+    },
+    'large': {
+        'categories': 10, 'brands': 10, 'types_per_category': 4, 'products': 300,
+        'users': 30, 'orders': 200, 'items_per_order': 5, 'invoices': 100,
+        'customers': 100, 'sales': 200, 'shelves': 10, 'banners': 10, 'expenses': 100,
+    },
+}
+
+
+def seed_dataset(profile, seed=1234):
+    """Create the dataset for `profile` and return the ids of representative rows"""
+    counts = PROFILES[profile]
+    rng = random.Random(seed)
+    today = date.today()
+
+    categories = ProductCategory.objects.bulk_create([
+        ProductCategory(name=f'Category {i}', description=f'Category {i}')
+        for i in range(counts['categories'])
+    ])
+    brands = Brand.objects.bulk_create([
+        Brand(name=f'Brand {i}', description=f'Brand {i}')
+        for i in range(counts['brands'])
+    ])
+    product_types = ProductType.objects.bulk_create([
+        ProductType(name=f'Type {i}-{j}', category=category)
+        for i, category in enumerate(categories)
+        for j in range(counts['types_per_category'])
+    ])
+
+    products = []
+    for i in range(counts['products']):
+        product_type = product_types[i % len(product_types)]
+        products.append(Product(
+            name=f'Product {i}',
+            description=f'Description for product {i}',
+            price=Decimal(rng.randint(500, 50000)),
+            category=product_type.category,
+            brand=brands[i % len(brands)],
+            product_type=product_type,
+            is_featured=i % 5 == 0,
+            stock_quantity=rng.randint(0, 40),
+            minimum_stock=10,
+            expiry_date=today + timedelta(days=rng.randint(1, 400)),
+        ))
+    products = Product.objects.bulk_create(products)
+
+    ProductBatch.objects.bulk_create([
+        ProductBatch(
+            product=product,
+            batch_number=f'B-{i}',
+            supplier='Supplier',
+            cost_price=product.price * Decimal('0.7'),
+            selling_price=product.price,
+            quantity_received=50,
+            quantity_remaining=rng.randint(0, 50),
+            expiry_date=today + timedelta(days=rng.randint(1, 400)),
+        )
+        for i, product in enumerate(products)
+    ])
+
+    ProductCode.objects.bulk_create([
+        ProductCode(product=product, code=f'{6000000000000 + i * 2 + offset}', pack_type=pack_type)
+        for i, product in enumerate(products)
+        for offset, pack_type in enumerate(['Piece', 'Dozen'])
+    ])
+
+    shelves = Shelf.objects.bulk_create([
+        Shelf(name=f'Shelf {i}') for i in range(counts['shelves'])
+    ])
+    ProductLocation.objects.bulk_create([
+        ProductLocation(product=product, shelf=shelves[i % len(shelves)], quantity=product.stock_quantity)
+        for i, product in enumerate(products)
+    ])
+
+    banners = Banner.objects.bulk_create([
+        Banner(title=f'Banner {i}', image=f'https://example.com/banner-{i}.jpg', order=i)
+        for i in range(counts['banners'])
+    ])
+
+    password = make_password('password123')
+    users = BusinessUser.objects.bulk_create([
+        BusinessUser(
+            business_type='Retail',
+            business_name=f'Pharmacy {i}',
+            phone_number=f'+2557{i:08d}',
+            business_location='Dar es Salaam',
+            tin_number=f'TIN-{i:06d}',
+            password=password,
+            is_verified=True,
+        )
+        for i in range(counts['users'])
+    ])
+
+    HardwareOTP.objects.create(phone_number=users[0].phone_number, otp='4321')
+
+    orders = Order.objects.bulk_create([
+        Order(
+            user=users[i % len(users)],
+            delivery_address='Dar es Salaam',
+            delivery_phone=users[i % len(users)].phone_number,
+            status=('pending', 'confirmed', 'delivered')[i % 3],
+            order_number=f'ORD-SEED-{i:05d}',
+        )
+        for i in range(counts['orders'])
+    ])
+    order_items = []
+    for order in orders:
+        for product in rng.sample(products, counts['items_per_order']):
+            quantity = rng.randint(1, 5)
+            order_items.append(OrderItem(
+                order=order,
+                product=product,
+                quantity=quantity,
+                unit_price=product.price,
+                total_price=product.price * quantity,
+                product_name=product.name,
+                product_description=product.description,
+            ))
+    OrderItem.objects.bulk_create(order_items)
+
+    invoices = Invoice.objects.bulk_create([
+        Invoice(
+            order=order,
+            invoice_number=f'INV-SEED-{i:05d}',
+            invoice_date=today,
+            customer_name=order.user.business_name,
+            customer_phone=order.delivery_phone,
+            customer_address=order.delivery_address,
+        )
+        for i, order in enumerate(orders[:counts['invoices']])
+    ])
+    InvoiceItem.objects.bulk_create([
+        InvoiceItem(
+            invoice=invoice,
+            product=item.product,
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            total_price=item.total_price,
+            product_name=item.product_name,
+        )
+        for invoice in invoices
+        for item in order_items
+        if item.order_id == invoice.order_id
+    ])
+
+    customers = Customer.objects.bulk_create([
+        Customer(name=f'Customer {i}', phone=f'+2556{i:08d}')
+        for i in range(counts['customers'])
+    ])
+    sales = Sale.objects.bulk_create([
+        Sale(
+            customer=customers[i % len(customers)],
+            customer_name=customers[i % len(customers)].name,
+            total_amount=Decimal('0'),
+            payment_status=rng.choice(['PAID', 'UNPAID']),
+            salesperson=users[i % len(users)],
+            salesperson_name=users[i % len(users)].business_name,
+        )
+        for i in range(counts['sales'])
+    ])
+    SaleItem.objects.bulk_create([
+        SaleItem(
+            sale=sale,
+            product=product,
+            product_name=product.name,
+            quantity=1,
+            unit_price=product.price,
+            total_price=product.price,
+        )
+        for sale in sales
+        for product in rng.sample(products, 2)
+    ])
+
+    expenses = Expense.objects.bulk_create([
+        Expense(
+            title=f'Expense {i}',
+            description='Seeded expense',
+            amount=Decimal(rng.randint(1000, 100000)),
+            category='Office',
+            expense_date=today - timedelta(days=i % 30),
+            created_by=users[i % len(users)],
+        )
+        for i in range(counts['expenses'])
+    ])
+
+    return {
+        'category': categories[0].category_id,
+        'category_name': categories[0].name,
+        'brand': brands[0].brand_id,
+        'brand_name': brands[0].name,
+        'product_type': product_types[0].type_id,
+        'product_type_name': product_types[0].name,
+        'product': products[0].product_id,
+        'product_2': products[1].product_id,
+        'code': '6000000000000',
+        'batch': ProductBatch.objects.filter(product=products[0]).values_list('batch_id', flat=True).first(),
+        'shelf': shelves[0].shelf_id,
+        'banner': banners[0].banner_id,
+        'user': users[0].user_id,
+        'user_phone': users[0].phone_number,
+        'order': orders[0].order_id,
+        'uninvoiced_order': orders[counts['invoices']].order_id,
+        'invoice': invoices[0].invoice_id,
+        'customer': customers[0].customer_id,
+        'sale': sales[0].sale_id,
+        'expense': expenses[0].expense_id,
+    }
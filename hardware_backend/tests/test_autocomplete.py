@@ -0,0 +1,48 @@
+"""
+POS autocomplete index (autocomplete.py): built by the first lookup, and
+safe to fork while a build holds the lock.
+"""
+import os
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from hardware_backend import autocomplete
+from hardware_backend.models import Brand, Product, ProductCategory, ProductType
+
+
+@pytest.fixture
+def no_index(monkeypatch):
+    monkeypatch.setattr(autocomplete, '_index', None)
+    monkeypatch.setattr(autocomplete, '_build_lock', autocomplete._build_lock)  # restored after the test
+
+
+@pytest.mark.django_db
+def test_first_lookup_builds_the_index(no_index):
+    key = uuid.uuid4().hex[:8]
+    category = ProductCategory.objects.create(name=f'Autocomplete {key}')
+    product = Product.objects.create(
+        name=f'Zebrawood plank {key}', description='', price=Decimal('10.00'), category=category,
+        brand=Brand.objects.create(name=f'Brand {key}'),
+        product_type=ProductType.objects.create(name='Planks', category=category),
+    )
+
+    index = autocomplete.get_index()
+
+    assert autocomplete._index is index
+    assert [row['product_id'] for row in index.search(f'zebrawood plank {key}')] == [product.product_id]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+def test_forked_child_does_not_inherit_a_held_build_lock(no_index):
+    lock = autocomplete._build_lock
+    lock.acquire()  # a build running in the parent (gunicorn --preload) when the worker forks
+    try:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if autocomplete._build_lock.acquire(timeout=2) else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        lock.release()
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,60 @@
+"""
+BlurHash placeholders (kipenzi/blurhash.py). The expected strings are worked
+out by hand from the reference algorithm (https://github.com/woltapp/blurhash),
+whose basis is cos(pi * i * x / width) * cos(pi * j * y / height):
+
+    size flag       (x - 1) + (y - 1) * 9, one base83 digit
+    max AC          floor(max|AC| * 166 - 0.5) clamped to 0..82, one digit
+    DC              the average colour as sRGB 0xRRGGBB, four digits
+    each AC         sign * sqrt(AC / max) on 19 levels per channel, two digits
+"""
+import pytest
+from PIL import Image
+
+from kipenzi.blurhash import encode, placeholder
+
+
+def test_encode_single_pixel():
+    # Every basis is 1 at (0, 0), so each AC term is twice the DC: for red (1, 0, 0)
+    # linear, max AC 2 clamps to 82 ("~"), 0xFF0000 is "TI:j", and each AC term
+    # quantises to 18,9,9 = 6678 ("|c")
+    assert encode(1, 1, bytes([255, 0, 0])) == 'L~TI:j' + '|c' * 11
+    # black: no energy at all, max AC 0 and every AC term 9,9,9 = 3429 ("fQ")
+    assert encode(1, 1, bytes([0, 0, 0])) == 'L00000' + 'fQ' * 11
+
+
+def test_encode_two_pixels():
+    # White then black, 2x1 components: DC is linear 0.5 = sRGB 188 (0xBCBCBC -> "Lqe9");
+    # the AC term is 1.0, so max AC clamps to 82 ("~") and the term to 18,18,18 = 6858 ("~q")
+    assert encode(2, 1, bytes([255, 255, 255, 0, 0, 0]), x_components=2, y_components=1) == '1~Lqe9~q'
+    # black then white: the basis is cos(pi / 2) = 0 at the white pixel, so no AC energy
+    assert encode(2, 1, bytes([0, 0, 0, 255, 255, 255]), x_components=2, y_components=1) == '10Lqe9fQ'
+
+
+def test_encode_rejects_bad_components():
+    with pytest.raises(ValueError):
+        encode(1, 1, bytes(3), x_components=0)
+    with pytest.raises(ValueError):
+        encode(1, 1, bytes(3), y_components=10)
+
+
+def test_placeholder_composites_transparency_on_white():
+    white = placeholder(Image.new('RGB', (64, 48), (255, 255, 255)))
+    assert white[2:6] == 'TSUA'  # 0xFFFFFF
+
+    assert placeholder(Image.new('RGBA', (64, 48), (255, 0, 0, 0))) == white  # invisible red
+    assert placeholder(Image.new('LA', (64, 48), (0, 0))) == white
+    assert placeholder(Image.new('RGBA', (64, 48), (255, 0, 0, 255)))[2:6] == 'TI:j'  # opaque red
+
+
+def test_placeholder_of_portrait_and_landscape_images():
+    portrait = Image.new('RGB', (300, 1200), (255, 0, 0))
+    portrait.paste((0, 0, 255), (0, 600, 300, 1200))
+    hash = placeholder(portrait)
+    # 3x4 components for a portrait image: size flag 2 + 3 * 9 = 29 ("T"), 11 AC terms
+    assert hash[0] == 'T' and len(hash) == 2 + 4 + 2 * 11
+
+    # 4x3 for a landscape one: 3 + 2 * 9 = 21 ("L")
+    landscape = placeholder(portrait.transpose(Image.Transpose.ROTATE_90))
+    assert landscape[0] == 'L' and len(landscape) == 2 + 4 + 2 * 11
+    assert landscape[2:6] == hash[2:6]  # the same average colour
@@ -0,0 +1,141 @@
+"""
+Bulk admin actions (bulk_admin.py) through the admin/<target>/bulk/ views.
+"""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from hardware_backend.models import Brand, BusinessUser, CatalogTombstone, Product, ProductCategory, ProductType
+
+
+def unique(name):
+    return f'{name} {uuid.uuid4().hex[:8]}'
+
+
+@pytest.fixture
+def catalog(db):
+    """Two categories that both have a "Drills" type; only the first has "Saws" """
+    old, new = ProductCategory.objects.create(name=unique('Old')), ProductCategory.objects.create(name=unique('New'))
+    types = {
+        'old_drills': ProductType.objects.create(name='Drills', category=old),
+        'old_saws': ProductType.objects.create(name='Saws', category=old),
+        'new_drills': ProductType.objects.create(name='drills', category=new),
+        'new_other': ProductType.objects.create(name='Other', category=new),
+    }
+    brand = Brand.objects.create(name=unique('Brand'))
+    drills = Product.objects.bulk_create([
+        Product(name=f'Drill {i}', description='', price=Decimal('100.00'), category=old, brand=brand,
+                product_type=types['old_drills'], is_active=i != 0)
+        for i in range(3)
+    ])
+    saw = Product.objects.create(name='Saw', description='', price=Decimal('50.00'), category=old, brand=brand,
+                                 product_type=types['old_saws'])
+    return {'old': old, 'new': new, 'brand': brand, 'drills': drills, 'saw': saw, **types}
+
+
+def bulk(client, target, ids, action, value=None):
+    response = client.post(f'/hardware/admin/{target}/bulk/', {'ids': ids, 'action': action, 'value': value},
+                           content_type='application/json', HTTP_ACCEPT='application/json')
+    return response.status_code, response.json()
+
+
+def ids(products):
+    return [product.product_id for product in products]
+
+
+@pytest.mark.django_db
+def test_deactivate_counts_only_rows_changed(client, catalog):
+    drills = catalog['drills']
+    code, body = bulk(client, 'products', ids(drills), 'deactivate')
+
+    assert code == 200
+    assert body['data'] == {'action': 'deactivate', 'requested': 3, 'affected': 2}  # one was inactive already
+    assert not Product.objects.filter(pk__in=ids(drills), is_active=True).exists()
+
+
+@pytest.mark.django_db
+def test_set_price_validates_the_value(client, catalog):
+    drills = catalog['drills']
+    assert bulk(client, 'products', ids(drills), 'set_price', '-1')[0] == 400
+    assert bulk(client, 'products', ids(drills), 'set_price', 'cheap')[0] == 400
+
+    code, body = bulk(client, 'products', ids(drills), 'set_price', '1500.00')
+    assert (code, body['data']['affected']) == (200, 3)
+    assert set(Product.objects.filter(pk__in=ids(drills)).values_list('price', flat=True)) == {Decimal('1500.00')}
+
+
+@pytest.mark.django_db
+def test_bad_requests_are_rejected(client, catalog):
+    assert bulk(client, 'products', [], 'activate')[0] == 400
+    assert bulk(client, 'products', ids(catalog['drills']), 'explode')[0] == 400
+    assert bulk(client, 'products', [1, 2], 'activate')[0] == 400
+
+
+@pytest.mark.django_db
+def test_move_category_takes_the_type_of_the_same_name(client, catalog):
+    drills = catalog['drills']
+    code, body = bulk(client, 'products', ids(drills), 'move_category', catalog['new'].category_id)
+
+    assert (code, body['data']['affected']) == (200, 3)
+    moved = Product.objects.filter(pk__in=ids(drills))
+    assert set(moved.values_list('category_id', 'product_type_id')) == {
+        (catalog['new'].category_id, catalog['new_drills'].type_id),
+    }
+
+
+@pytest.mark.django_db
+def test_move_category_without_a_matching_type_moves_nothing(client, catalog):
+    products = catalog['drills'] + [catalog['saw']]
+    code, body = bulk(client, 'products', ids(products), 'move_category', catalog['new'].category_id)
+
+    assert code == 400
+    assert 'Saws' in body['message']
+    assert set(Product.objects.filter(pk__in=ids(products)).values_list('category_id', flat=True)) == {
+        catalog['old'].category_id,
+    }
+
+
+@pytest.mark.django_db
+def test_move_category_to_a_chosen_type(client, catalog):
+    products = catalog['drills'] + [catalog['saw']]
+    new = catalog['new'].category_id
+
+    code, _ = bulk(client, 'products', ids(products), 'move_category',
+                   {'category': new, 'product_type': catalog['old_saws'].type_id})
+    assert code == 400  # a type of another category
+
+    code, body = bulk(client, 'products', ids(products), 'move_category',
+                      {'category': new, 'product_type': catalog['new_other'].type_id})
+    assert (code, body['data']['affected']) == (200, 4)
+    assert set(Product.objects.filter(pk__in=ids(products)).values_list('category_id', 'product_type_id')) == {
+        (new, catalog['new_other'].type_id),
+    }
+    assert bulk(client, 'products', ids(catalog['drills']), 'move_category', 'no-such-category')[0] == 400
+
+
+@pytest.mark.django_db
+def test_delete_writes_tombstones(client, catalog):
+    brand = catalog['brand']
+    code, body = bulk(client, 'brands', [brand.brand_id], 'delete')
+
+    assert code == 200
+    assert body['data']['affected'] == 1
+    assert body['data']['deleted'][Product._meta.db_table] == 4  # cascaded
+    assert not Product.objects.filter(brand_id=brand.brand_id).exists()
+    assert CatalogTombstone.objects.filter(object_id=brand.brand_id).exists()
+    assert CatalogTombstone.objects.filter(object_id=catalog['saw'].product_id).exists()
+
+
+@pytest.mark.django_db
+def test_categories_and_users(client, catalog):
+    code, body = bulk(client, 'categories', [catalog['old'].category_id, catalog['new'].category_id], 'deactivate')
+    assert (code, body['data']['affected']) == (200, 2)
+
+    key = uuid.uuid4().hex[:12]
+    user = BusinessUser.objects.create(business_type='Retail', business_name='Bulk', phone_number=f'+{key}',
+                                       business_location='Arusha', tin_number=f'TIN-{key}', password='x')
+    code, body = bulk(client, 'users', [user.user_id, 'missing'], 'verify')
+    assert (code, body['data']) == (200, {'action': 'verify', 'requested': 2, 'affected': 1})
+    user.refresh_from_db()
+    assert user.is_verified
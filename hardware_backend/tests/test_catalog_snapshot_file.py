@@ -0,0 +1,97 @@
+"""
+Downloading a built catalog snapshot (catalog/snapshot/<name>): byte ranges,
+If-Range and conditional GETs (kipenzi/file_serving.py).
+"""
+import gzip
+import hashlib
+import json
+
+import pytest
+from django.utils.http import http_date
+
+from hardware_backend.catalog_snapshot import build_snapshot
+
+
+@pytest.fixture
+def snapshot(settings, tmp_path, db):
+    settings.CATALOG_SNAPSHOT_DIR = str(tmp_path)
+    manifest = build_snapshot(force=True)
+    with open(tmp_path / manifest['name'], 'rb') as f:
+        return manifest, f'/hardware/catalog/snapshot/{manifest["name"]}', f.read()
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+def test_whole_file(client, snapshot):
+    manifest, url, content = snapshot
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert hashlib.sha256(body(response)).hexdigest() == manifest['sha256']
+    assert response['ETag'] == f'"{manifest["sha256"]}"'
+    assert response['Accept-Ranges'] == 'bytes'
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response['Content-Disposition'] == f'attachment; filename="{manifest["name"]}"'
+    assert json.loads(gzip.decompress(content).splitlines()[0])['type'] == 'meta'
+
+
+def test_byte_ranges(client, snapshot):
+    manifest, url, content = snapshot
+    size = len(content)
+
+    response = client.get(url, HTTP_RANGE='bytes=0-99')
+    assert response.status_code == 206
+    assert response['Content-Range'] == f'bytes 0-99/{size}'
+    assert response['Content-Length'] == '100'
+    assert body(response) == content[:100]
+
+    response = client.get(url, HTTP_RANGE='bytes=100-')  # resuming a download
+    assert (response.status_code, body(response)) == (206, content[100:])
+
+    response = client.get(url, HTTP_RANGE='bytes=-10')
+    assert (response.status_code, response['Content-Range']) == (206, f'bytes {size - 10}-{size - 1}/{size}')
+    assert body(response) == content[-10:]
+
+    response = client.get(url, HTTP_RANGE=f'bytes={size}-')
+    assert (response.status_code, response['Content-Range']) == (416, f'bytes */{size}')
+
+    response = client.get(url, HTTP_RANGE='bytes=0-1,5-9')  # multi-range: the whole file
+    assert (response.status_code, body(response)) == (200, content)
+
+
+def test_if_range(client, snapshot):
+    manifest, url, content = snapshot
+    etag = f'"{manifest["sha256"]}"'
+
+    response = client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+    assert (response.status_code, body(response)) == (206, content[10:20])
+
+    # The client holds part of another version: it gets the whole current file
+    response = client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=f'"{"0" * 64}"')
+    assert (response.status_code, body(response)) == (200, content)
+
+
+def test_conditional_get(client, snapshot):
+    manifest, url, _ = snapshot
+    etag = f'"{manifest["sha256"]}"'
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert (response.status_code, response.content) == (304, b'')
+    assert response['ETag'] == etag
+
+    last_modified = client.get(url)['Last-Modified']
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code == 200
+    assert client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+def test_head_and_unknown_names(client, snapshot):
+    manifest, url, content = snapshot
+
+    response = client.head(url)
+    assert (response.status_code, response['Content-Length']) == (200, str(len(content)))
+    assert client.post(url).status_code == 405
+    assert client.get(url.replace(manifest['sha256'], 'f' * 64)).status_code == 404
+    assert client.get('/hardware/catalog/snapshot/manifest.json').status_code == 404
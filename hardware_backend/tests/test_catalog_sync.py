@@ -0,0 +1,105 @@
+"""
+Catalog delta sync (catalog_sync.py) through catalog/changes/: what a client
+holding a token gets after updates, deactivations and cascading deletes.
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from hardware_backend.catalog_sync import make_token
+from hardware_backend.models import Brand, Product, ProductCategory, ProductType
+
+
+@pytest.fixture
+def catalog(db, settings):
+    settings.CATALOG_SYNC_OVERLAP_SECONDS = 0  # only rows written after the token
+    category = ProductCategory.objects.create(name=f'Sync {uuid.uuid4().hex[:8]}')
+    brand = Brand.objects.create(name=f'Sync {uuid.uuid4().hex[:8]}')
+    types = [ProductType.objects.create(name=f'Sync type {i}', category=category) for i in range(2)]
+    products = [
+        Product.objects.create(name=f'Sync product {i}', description='', price=Decimal('10.00'), category=category,
+                               brand=brand, product_type=types[i % 2])
+        for i in range(3)
+    ]
+    return {'category': category, 'brand': brand, 'types': types, 'products': products}
+
+
+def sync(client, since=None):
+    response = client.get('/hardware/catalog/changes/', {'since': since} if since else {},
+                          HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+    return response.json()['data']
+
+
+def changed_ids(data, entity, key):
+    return [row[key] for row in data['changes'][entity]['changed']]
+
+
+def test_first_sync_is_a_full_snapshot(client, catalog):
+    data = sync(client)
+
+    assert data['full'] is True and data['token'].isdigit()
+    assert {p.product_id for p in catalog['products']} <= set(changed_ids(data, 'products', 'product_id'))
+    assert catalog['category'].category_id in changed_ids(data, 'categories', 'category_id')
+
+
+def test_delta_after_an_update(client, catalog):
+    token = sync(client)['token']
+    product = catalog['products'][0]
+    product.price = Decimal('12.50')
+    product.save()
+
+    data = sync(client, token)
+
+    assert data['full'] is False
+    assert changed_ids(data, 'products', 'product_id') == [product.product_id]
+    assert data['changes']['products']['changed'][0]['price'] == '12.50'
+    assert all(not changes['changed'] and not changes['deleted']
+               for entity, changes in data['changes'].items() if entity != 'products')
+    assert sync(client, data['token'])['changes']['products']['changed'] == []
+
+
+def test_delta_after_a_deactivation(client, catalog):
+    token = sync(client)['token']
+    product = catalog['products'][1]
+    product.is_active = False
+    product.save()
+
+    changes = sync(client, token)['changes']['products']
+
+    assert changes['changed'] == []
+    assert changes['deactivated'] == [product.product_id]
+    assert changes['deleted'] == []
+
+
+def test_category_delete_tombstones_its_types_and_products(client, catalog):
+    token = sync(client)['token']
+    category = catalog['category']
+
+    response = client.delete(f'/hardware/admin/categories/{category.category_id}/delete/', HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+
+    changes = sync(client, token)['changes']
+    assert changes['categories']['deleted'] == [category.category_id]
+    assert sorted(changes['product_types']['deleted']) == sorted(t.type_id for t in catalog['types'])
+    assert sorted(changes['products']['deleted']) == sorted(p.product_id for p in catalog['products'])
+    assert changes['brands']['deleted'] == []
+
+
+def test_expired_token_gets_a_full_snapshot(client, catalog, settings):
+    settings.CATALOG_TOMBSTONE_RETENTION_DAYS = 30
+    expired = make_token(timezone.now() - timedelta(days=31))
+    recent = make_token(timezone.now() - timedelta(days=29))
+
+    assert sync(client, expired)['full'] is True
+    assert sync(client, recent)['full'] is False
+
+
+@pytest.mark.parametrize('since', ['yesterday', '-5', '12.5'])
+def test_malformed_token_is_rejected(client, db, since):
+    response = client.get('/hardware/catalog/changes/', {'since': since}, HTTP_ACCEPT='application/json')
+    assert response.status_code == 400
+    assert response.json()['message'] == 'Invalid sync token'
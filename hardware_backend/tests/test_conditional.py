@@ -0,0 +1,94 @@
+"""
+Conditional GET (kipenzi/conditional.py): a repeat request with the ETag it
+was given gets an empty 304, and the ETag moves whenever the catalog does.
+"""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from hardware_backend.models import Brand, Product, ProductCategory, ProductType
+
+
+@pytest.fixture
+def products(db):
+    category = ProductCategory.objects.create(name=f'ETag {uuid.uuid4().hex[:8]}')
+    brand = Brand.objects.create(name=f'ETag {uuid.uuid4().hex[:8]}')
+    product_type = ProductType.objects.create(name='ETag type', category=category)
+    return [
+        Product.objects.create(name=f'ETag product {i}', description='', price=Decimal('10.00'), category=category,
+                               brand=brand, product_type=product_type)
+        for i in range(2)
+    ]
+
+
+def get(client, url, etag=None):
+    headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+    return client.get(url, HTTP_ACCEPT='application/json', **headers)
+
+
+def detail_url(product):
+    return f'/hardware/products/{product.product_id}/'
+
+
+def test_repeat_get_with_the_etag_is_not_modified(client, products):
+    first = get(client, detail_url(products[0]))
+    assert first.status_code == 200
+    assert first['Cache-Control'] == 'public, max-age=60'
+    assert 'Accept' in first['Vary']
+
+    repeat = get(client, detail_url(products[0]), first['ETag'])
+
+    assert repeat.status_code == 304
+    assert repeat.content == b''
+    assert repeat['ETag'] == first['ETag']
+    assert get(client, detail_url(products[0]), '"stale"').status_code == 200
+
+
+def test_etag_depends_on_the_url(client, products):
+    assert get(client, detail_url(products[0]))['ETag'] != get(client, detail_url(products[1]))['ETag']
+    etag = get(client, detail_url(products[0]))['ETag']
+    assert get(client, f'{detail_url(products[0])}?fields=name', etag).status_code == 200
+
+
+def test_etag_changes_after_a_product_update(client, products):
+    etag = get(client, detail_url(products[0]))['ETag']
+
+    response = client.put(f'/hardware/admin/products/{products[0].product_id}/', {'price': '12.50'},
+                          content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+
+    fresh = get(client, detail_url(products[0]), etag)
+    assert fresh.status_code == 200
+    assert fresh['ETag'] != etag
+    assert fresh.json()['data']['product']['price'] == '12.50'
+
+
+def test_etag_changes_after_another_product_is_deleted(client, products):
+    etag = get(client, '/hardware/products/')['ETag']
+
+    response = client.delete(f'/hardware/admin/products/{products[1].product_id}/delete/', HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+
+    fresh = get(client, '/hardware/products/', etag)
+    assert fresh.status_code == 200
+    assert fresh['ETag'] != etag
+
+
+def test_private_endpoint_revalidates(client, products):
+    first = get(client, '/hardware/admin/product-types/')
+    assert first.status_code == 200
+    assert set(first['Cache-Control'].split(', ')) == {'private', 'no-cache'}
+
+    assert get(client, '/hardware/admin/product-types/', first['ETag']).status_code == 304
+
+
+def test_errors_and_disabled_setting_get_no_etag(client, products, settings):
+    missing = get(client, '/hardware/products/no-such-product/')
+    assert missing.status_code == 404
+    assert not missing.has_header('ETag')
+
+    settings.CONDITIONAL_GET_ENABLED = False
+    response = get(client, detail_url(products[0]))
+    assert response.status_code == 200
+    assert not response.has_header('ETag') and not response.has_header('Cache-Control')
@@ -0,0 +1,177 @@
+"""
+The connection pool behind the pooled database backends (kipenzi/db_backends):
+checkout and checkin, overflow, recycling, pre-ping and the wait timeout,
+with stand-in driver connections.
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+from django.db.utils import OperationalError
+
+from kipenzi.db_backends import pool as pool_module
+from kipenzi.db_backends.mixins import PooledDatabaseWrapperMixin
+from kipenzi.db_backends.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def rollback(self):
+        if not self.alive:
+            raise OperationalError('server has gone away')
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def ping(connection):
+    if not connection.alive:
+        raise OperationalError('server has gone away')
+
+
+class Driver:
+    """connect() for the pool, numbering the connections it opens"""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        self.opened.append(FakeConnection(len(self.opened) + 1))
+        return self.opened[-1]
+
+
+@pytest.fixture
+def driver():
+    return Driver()
+
+
+def make_pool(**options):
+    return ConnectionPool('test', ping, **{'size': 2, 'max_overflow': 1, 'timeout': 0.2, **options})
+
+
+def test_checkin_makes_the_connection_reusable(driver):
+    pool = make_pool()
+    first = pool.acquire(driver)
+    second = pool.acquire(driver)
+    pool.release(first)
+    pool.release(second)
+
+    assert pool.acquire(driver) is second  # LIFO: the most recently used, warmest connection
+    assert pool.acquire(driver) is first
+    assert len(driver.opened) == 2
+    assert (first.rollbacks, second.rollbacks) == (1, 1)  # no transaction left open for the next request
+    stats = pool.stats()
+    assert (stats['open'], stats['checked_out'], stats['idle'], stats['connects']) == (2, 2, 0, 2)
+
+
+def test_overflow_connections_close_on_checkin(driver):
+    pool = make_pool(size=1, max_overflow=1)
+    kept, overflow = pool.acquire(driver), pool.acquire(driver)
+    assert pool.stats()['overflow'] == 1
+
+    pool.release(kept)
+    pool.release(overflow)
+
+    assert overflow.closed and not kept.closed
+    assert (pool.stats()['open'], pool.stats()['idle']) == (1, 1)
+
+
+def test_expired_connections_are_recycled(driver, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pool_module.time, 'monotonic', lambda: now[0])
+    pool = make_pool(recycle=60)
+    old = pool.acquire(driver)
+    pool.release(old)
+
+    now[0] += 61
+    fresh = pool.acquire(driver)
+    assert fresh is not old and old.closed
+
+    now[0] += 61  # expired while checked out: closed on checkin, not kept
+    pool.release(fresh)
+    assert fresh.closed and pool.stats()['idle'] == 0 and pool.stats()['open'] == 0
+
+
+def test_pre_ping_replaces_dead_connections(driver):
+    pool = make_pool()
+    dead = pool.acquire(driver)
+    pool.release(dead)
+    dead.alive = False
+
+    replacement = pool.acquire(driver)
+
+    assert replacement is not dead and dead.closed
+    assert pool.stats()['ping_failures'] == 1
+    assert pool.stats()['open'] == 1
+
+
+def test_without_pre_ping_idle_connections_are_trusted(driver):
+    pool = make_pool(pre_ping=False)
+    connection = pool.acquire(driver)
+    pool.release(connection)
+    connection.alive = False
+
+    assert pool.acquire(driver) is connection
+    pool.release(connection)  # its rollback fails: closed, not pooled
+    assert connection.closed and pool.stats()['open'] == 0
+
+
+def test_exhausted_pool_times_out(driver):
+    pool = make_pool(size=1, max_overflow=0, timeout=0.05)
+    pool.acquire(driver)
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout) as raised:
+        pool.acquire(driver)
+
+    assert time.monotonic() - started >= 0.05
+    assert isinstance(raised.value, OperationalError)  # handled like an unreachable database
+    assert (pool.stats()['timeouts'], pool.stats()['waits']) == (1, 1)
+
+
+def test_waiting_caller_gets_the_returned_connection(driver):
+    pool = make_pool(size=1, max_overflow=0, timeout=2)
+    held = pool.acquire(driver)
+    timer = threading.Timer(0.05, pool.release, [held])
+    timer.start()
+
+    assert pool.acquire(driver) is held
+    timer.join()
+    assert pool.stats()['waits'] == 1 and pool.stats()['wait_ms_max'] >= 40
+
+
+def test_failed_connect_frees_its_slot(driver):
+    pool = make_pool(size=1, max_overflow=0)
+
+    def refused():
+        raise OperationalError('connection refused')
+
+    with pytest.raises(OperationalError):
+        pool.acquire(refused)
+    assert pool.stats()['open'] == 0
+    assert pool.acquire(driver) is driver.opened[0]
+
+
+def test_discard_closes_instead_of_pooling(driver):
+    pool = make_pool()
+    connection = pool.acquire(driver)
+    pool.discard(connection)
+
+    assert connection.closed
+    assert (pool.stats()['open'], pool.stats()['idle']) == (0, 0)
+
+
+def test_default_ping_is_a_select_1():
+    connection = sqlite3.connect(':memory:')
+    PooledDatabaseWrapperMixin.ping_connection(connection)
+
+    connection.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        PooledDatabaseWrapperMixin.ping_connection(connection)
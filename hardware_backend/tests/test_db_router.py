@@ -0,0 +1,94 @@
+"""
+Read-replica routing (kipenzi/db_router.py) against two local databases:
+the default test database as the primary and 'replica_test' as the replica,
+each holding a brand the other does not.
+"""
+import json
+
+import pytest
+from django.db import connections, transaction
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+
+from hardware_backend.models import Brand
+from kipenzi import db_router
+from kipenzi.db_backends.pool import PoolTimeout
+from kipenzi.db_router import PIN_COOKIE, ReplicaPinningMiddleware, read_from_replica
+
+pytestmark = [
+    pytest.mark.django_db(transaction=True, databases=['default', 'replica_test']),
+    pytest.mark.usefixtures('two_databases'),
+]
+
+
+@pytest.fixture
+def two_databases():
+    Brand.objects.using('default').create(name='On primary')
+    Brand.objects.using('replica_test').create(name='On replica')
+    db_router._replica_down_until.clear()
+    with override_settings(REPLICA_DATABASE_ALIAS='replica_test', REPLICA_STICKY_SECONDS=5):
+        yield
+    db_router._replica_down_until.clear()
+
+
+@read_from_replica
+def brand_names(request):
+    if request.method == 'POST':
+        Brand.objects.create(name='Written')
+    if request.GET.get('atomic'):
+        with transaction.atomic():
+            return JsonResponse({'names': list(Brand.objects.values_list('name', flat=True))})
+    return JsonResponse({'names': list(Brand.objects.values_list('name', flat=True))})
+
+
+def call(method='get', cookies=None, **params):
+    request = getattr(RequestFactory(), method)('/brands/', params)
+    request.COOKIES.update(cookies or {})
+    response = ReplicaPinningMiddleware(brand_names)(request)
+    return response, set(json.loads(response.content)['names'])
+
+
+def test_get_reads_from_the_replica():
+    _, names = call()
+    assert names == {'On replica'}
+
+
+def test_reads_after_a_write_stay_on_the_primary_and_pin_the_client():
+    response, names = call('post')
+    assert names == {'On primary', 'Written'}
+
+    pin = response.cookies[PIN_COOKIE]
+    assert pin['max-age'] == 5
+    _, names = call(cookies={PIN_COOKIE: pin.value})
+    assert 'On primary' in names
+    _, names = call(cookies={PIN_COOKIE: '0'})  # an expired pin
+    assert names == {'On replica'}
+
+
+def test_reads_in_a_transaction_use_the_primary():
+    _, names = call(atomic='1')
+    assert names == {'On primary'}
+
+
+def test_unavailable_replica_falls_back_to_the_primary(monkeypatch):
+    def exhausted():
+        raise PoolTimeout('Database pool "replica_test" exhausted')
+
+    monkeypatch.setattr(connections['replica_test'], 'ensure_connection', exhausted)
+    response, names = call()
+    assert response.status_code == 200
+    assert names == {'On primary'}
+
+    # skipped for REPLICA_RETRY_SECONDS, then tried again
+    monkeypatch.undo()
+    _, names = call()
+    assert names == {'On primary'}
+    db_router._replica_down_until.clear()
+    _, names = call()
+    assert names == {'On replica'}
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='missing')
+def test_no_replica_configured_reads_from_the_primary():
+    _, names = call()
+    assert names == {'On primary'}
@@ -0,0 +1,75 @@
+"""
+Parity between the compiled read-only serializers (fast_serializers.py) and DRF.
+
+Every case renders the same queryset through serializer.data and through
+Fieldset.data() and compares the rendered JSON bytes.
+"""
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from hardware_backend.fieldsets import Fieldset
+from hardware_backend.models import Order, Product, Sale
+from hardware_backend.serializers import (
+    OrderSerializer, ProductSerializer, ProductWithLocationSerializer, SaleSerializer,
+)
+
+CASES = [
+    ('product-full', ProductSerializer, Product, {}),
+    ('product-lean', ProductSerializer, Product, {'lean': True}),
+    ('product-expand', ProductSerializer, Product, {'lean': True, 'expand': 'batches,brand_name,created_at'}),
+    ('product-fields', ProductSerializer, Product, {'fields': 'name,category_name,images,batches.product_name'}),
+    ('sale-full', SaleSerializer, Sale, {}),
+    ('sale-fields', SaleSerializer, Sale, {'fields': 'sale_id,total_amount,sale_date,items.unit_price'}),
+    ('order-full', OrderSerializer, Order, {}),
+    ('order-lean', OrderSerializer, Order, {'lean': True}),
+    ('order-expand', OrderSerializer, Order, {'lean': True, 'expand': 'user,order_items.product.batches'}),
+    ('product-locations', ProductWithLocationSerializer, Product, {}),
+]
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name, serializer_class, model, options', CASES, ids=[case[0] for case in CASES])
+def test_fast_path_matches_drf(name, serializer_class, model, options, dataset):
+    fieldset = Fieldset(serializer_class, **options)
+    queryset = model.objects.all()
+
+    expected = render(fieldset.serialize(queryset, many=True).data)
+    assert render(fieldset.data(queryset, many=True)) == expected
+
+    instance = queryset.first()
+    assert render(fieldset.data(instance)) == render(fieldset.serializer(instance).data)
+
+
+@pytest.mark.django_db
+def test_fast_path_matches_drf_outside_utc(dataset):
+    fieldset = Fieldset(OrderSerializer, expand='order_items')
+    with timezone.override('Africa/Dar_es_Salaam'):
+        expected = render(fieldset.serialize(Order.objects.all(), many=True).data)
+        assert render(fieldset.data(Order.objects.all(), many=True)) == expected
+    assert b'+03:00' in expected
+
+
+def test_lean_products_render_from_values_rows():
+    fast, plan = Fieldset(ProductSerializer, lean=True).compiled()
+    assert fast.lookups == ['product_id', 'name', 'price', 'image', 'image_variants', 'is_featured', 'stock_quantity']
+    full, plan = Fieldset(ProductSerializer).compiled()
+    assert full.lookups is None  # batches need model instances
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route, kwargs, fields', [
+    ('admin_get_all_products', {}, {'is_active', 'category', 'category_name', 'brand_name', 'product_type_name'}),
+    ('admin_get_all_orders', {}, {'user', 'order_items'}),
+    ('admin_get_orders_by_status', {'order_status': 'pending'}, {'user', 'order_items'}),
+])
+def test_admin_lists_render_every_field(route, kwargs, fields, dataset, client):
+    [row, *_] = client.get(reverse(route, kwargs=kwargs)).json()['data']
+    assert fields <= set(row)
+    [sparse, *_] = client.get(reverse(route, kwargs=kwargs), {'fields': 'name,status'}).json()['data']
+    assert set(sparse) <= {'name', 'status'}
@@ -0,0 +1,55 @@
+"""
+generate_synthetic_data: the small profile writes the rows it promises with
+every foreign key pointing at a real row, and a second run with the same tag
+or seed stops before writing anything.
+"""
+import io
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from hardware_backend.management.commands.generate_synthetic_data import PROFILES
+from hardware_backend.models import (
+    BusinessUser, Customer, Expense, Invoice, Order, OrderItem, Product, ProductBatch, ProductCategory, Sale,
+)
+
+
+def generate(*args):
+    call_command('generate_synthetic_data', '--profile=small', *args, stdout=io.StringIO())
+
+
+@pytest.mark.django_db
+def test_small_profile_row_counts_and_foreign_keys():
+    small = PROFILES['small']
+    before = {model: model.objects.count() for model in (Product, Order, Sale)}
+
+    generate('--seed=7')
+
+    assert BusinessUser.objects.filter(tin_number__startswith='TIN-SYN7-').count() == small['users']
+    assert ProductCategory.objects.filter(name__endswith=' SYN7').count() == small['categories']
+    assert Product.objects.count() - before[Product] == small['products']
+    assert ProductBatch.objects.filter(product__category__name__endswith=' SYN7').count() == \
+        small['products'] * small['batches_per_product']
+    assert Order.objects.count() - before[Order] == small['orders']
+    assert OrderItem.objects.filter(order__order_number__startswith='ORD-SYN7-').count() == \
+        small['orders'] * small['items_per_order']
+    assert Invoice.objects.filter(invoice_number__startswith='INV-SYN7-').exists()
+    assert Sale.objects.count() - before[Sale] == small['sales']
+    assert Customer.objects.count() >= small['customers']
+    assert Expense.objects.count() >= small['expenses']
+    connection.check_constraints()  # every generated foreign key resolves
+
+
+@pytest.mark.django_db
+def test_second_run_with_the_same_tag_or_seed_is_refused():
+    generate('--seed=8')
+    users = BusinessUser.objects.count()
+
+    with pytest.raises(CommandError, match='tagged SYN8 already exists'):
+        generate('--seed=8')
+    with pytest.raises(CommandError, match='--seed 8 already exists'):
+        generate('--seed=8', '--tag=OTHER')
+
+    assert BusinessUser.objects.count() == users
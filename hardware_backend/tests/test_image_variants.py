@@ -0,0 +1,108 @@
+"""
+Resized image variants (image_variants.py) of an uploaded banner, rendered
+inline (IMAGE_VARIANTS_BACKGROUND is off in the test settings), and the
+backfill_blurhash command.
+"""
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from hardware_backend.management.commands.backfill_blurhash import backfill_row
+from hardware_backend.models import Banner
+from kipenzi.media_storage import get_storage
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_STORAGE = 'local'
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_URL = '/media/'
+    return get_storage()
+
+
+def camera_jpeg(width, height, orientation):
+    """A landscape photo as a phone stores it: sideways pixels plus an EXIF orientation"""
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    image.paste((30, 30, 200), (0, 0, width // 2, height))
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    exif[MAKE] = 'Test phone'
+    encoded = io.BytesIO()
+    image.save(encoded, 'JPEG', exif=exif.tobytes(), quality=90)
+    return encoded.getvalue()
+
+
+def open_variant(storage, url):
+    with storage.open(storage.name(url)) as f:
+        image = Image.open(io.BytesIO(f.read()))
+        image.load()
+        return image
+
+
+@pytest.mark.django_db
+def test_uploaded_jpeg_gets_upright_variants_without_exif(client, storage, django_capture_on_commit_callbacks):
+    upload = SimpleUploadedFile('phone.jpeg', camera_jpeg(2000, 1000, orientation=6), 'image/jpeg')
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post('/hardware/admin/banners/create/', {'title': 'Variants', 'image': upload})
+    assert response.status_code == 201
+
+    banner = Banner.objects.get(banner_id=response.json()['data']['banner_id'])
+    assert banner.image.startswith('/media/banners/') and banner.image.endswith('.jpg')
+    variants = banner.image_variants[banner.image]
+
+    # Orientation 6 is a 90 degree turn: the 2000x1000 pixels show as 1000x2000
+    expected = {'full': (640, 1280), 'medium': (240, 480), 'thumb': (80, 160)}
+    for variant, size in expected.items():
+        entry = variants[variant]
+        assert (entry['width'], entry['height']) == size
+        for key, pil_format in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            image = open_variant(storage, entry[key])
+            assert (image.format, image.size) == (pil_format, size)
+            assert not image.getexif()
+            assert 'exif' not in image.info
+        assert entry['webp'].startswith('/media/banners/variants/')
+
+    assert isinstance(variants['blurhash'], str) and len(variants['blurhash']) > 6
+    # the top of the upright image is the left half of the sideways one: blue
+    top = open_variant(storage, variants['thumb']['jpeg']).getpixel((40, 10))
+    assert top[2] > 150 and top[0] < 100
+
+
+@pytest.mark.django_db
+def test_same_upload_reuses_the_rendered_variants(client, storage, django_capture_on_commit_callbacks):
+    content = camera_jpeg(800, 600, orientation=1)
+    banners = []
+    for title in ('First', 'Second'):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post('/hardware/admin/banners/create/', {
+                'title': title, 'image': SimpleUploadedFile('shop.jpg', content, 'image/jpeg'),
+            })
+        banners.append(Banner.objects.get(banner_id=response.json()['data']['banner_id']))
+
+    first, second = (banner.image_variants[banner.image] for banner in banners)
+    assert banners[0].image == banners[1].image
+    # the second banner reuses the stored files; only its placeholder is recomputed (from the WebP thumb)
+    assert {k: v for k, v in first.items() if k != 'blurhash'} == {k: v for k, v in second.items() if k != 'blurhash'}
+    assert second['blurhash']
+    assert first['full']['width'] == 800  # never enlarged
+    assert len(list(storage.list('banners/variants'))) == 6
+
+
+@pytest.mark.django_db
+def test_backfill_counts_only_the_rows_it_updated(storage):
+    storage.save('banners/shop.jpg', camera_jpeg(400, 300, orientation=1), 'image/jpeg')
+    readable = Banner.objects.create(title='Readable', image='/media/banners/shop.jpg')
+    missing = Banner.objects.create(title='Missing', image='/media/banners/gone.jpg')
+
+    assert [backfill_row(Banner, banner.pk) for banner in (readable, missing)] == [True, False]
+    assert backfill_row(Banner, readable.pk) is False  # nothing left to build
+
+    readable.refresh_from_db()
+    missing.refresh_from_db()
+    assert readable.image_variants[readable.image]['blurhash']
+    assert missing.image_variants is None
@@ -0,0 +1,337 @@
+"""
+Invoice items are written in bulk with the totals computed once, so the
+queries to create or rewrite an invoice do not depend on its line count.
+"""
+import io
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from hardware_backend import invoicing
+from hardware_backend.invoicing import invoice_numbers
+from hardware_backend.models import (
+    Brand, BusinessUser, Invoice, InvoiceItem, InvoiceSequence, Order, OrderItem, Product, ProductCategory,
+    ProductType,
+)
+from hardware_backend.serializers import UpdateInvoiceSerializer
+
+
+@pytest.fixture
+def products(db):
+    category = ProductCategory.objects.create(name=f'Invoice test {uuid.uuid4().hex[:8]}')
+    brand = Brand.objects.create(name=f'Invoice test {uuid.uuid4().hex[:8]}')
+    product_type = ProductType.objects.create(name='Invoice test type', category=category)
+    return Product.objects.bulk_create([
+        Product(name=f'Line product {i}', description='', price=Decimal(100 + i), category=category,
+                brand=brand, product_type=product_type)
+        for i in range(200)
+    ])
+
+
+@pytest.fixture
+def numbering_started(db):
+    """Today's invoice number sequence exists, so the first invoice does not pay for starting it"""
+    invoice_numbers(0)
+
+
+def statements(queries):
+    """
+    Queries run, a bulk write of lines counted once: SQLite splits a
+    bulk_create or bulk_update into batches of 999 parameters
+    """
+    tables = (InvoiceItem._meta.db_table, OrderItem._meta.db_table)
+    batches = [(verb, table) for verb in ('INSERT INTO', 'UPDATE') for table in tables]
+    sql = [query['sql'] for query in queries.captured_queries]
+    batched = [next((b for b in batches if text.startswith(f'{b[0]} "{b[1]}"')), None) for text in sql]
+    return sum(1 for b in batched if b is None) + len({b for b in batched if b is not None})
+
+
+def make_user():
+    key = uuid.uuid4().hex[:12]
+    return BusinessUser.objects.create(
+        business_type='Retail', business_name=f'Pharmacy {key}', phone_number=f'+{key[:12]}',
+        business_location='Dar es Salaam', tin_number=f'TIN-{key}', password='x',
+    )
+
+
+def make_order(products, lines, user=None):
+    user = user or make_user()
+    order = Order.objects.create(user=user, delivery_address='Dar es Salaam', delivery_phone=user.phone_number)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, quantity=2, unit_price=product.price, total_price=product.price * 2,
+                  product_name=product.name, product_description='')
+        for product in products[:lines]
+    ])
+    return order
+
+
+def create_invoice(client, order):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(f'/hardware/invoices/create-from-order/{order.order_id}/', {},
+                               content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 201, response.content
+    return Invoice.objects.get(invoice_id=response.json()['data']['invoice_id']), statements(queries)
+
+
+@pytest.mark.django_db
+def test_create_invoice_from_order_queries_do_not_grow_with_lines(client, products, numbering_started):
+    _, two_lines = create_invoice(client, make_order(products, 2))
+    invoice, many_lines = create_invoice(client, make_order(products, 200))
+
+    assert many_lines == two_lines
+    assert invoice.invoice_items.count() == 200
+    assert invoice.subtotal == sum(product.price * 2 for product in products)
+    assert invoice.total_amount == invoice.subtotal + invoice.shipping_amount
+
+
+def edit_lines(invoice, lines):
+    serializer = UpdateInvoiceSerializer(invoice, data={'discount_amount': '50.00', 'invoice_items': lines}, partial=True)
+    assert serializer.is_valid(), serializer.errors
+    with CaptureQueriesContext(connection) as queries:
+        serializer.save()
+    return statements(queries)
+
+
+@pytest.mark.django_db
+def test_update_invoice_items_queries_do_not_grow_with_lines(client, products):
+    def edit(lines):
+        invoice, _ = create_invoice(client, make_order(products, lines))
+        # every line changed, the last one removed and a new one added
+        return invoice, edit_lines(invoice, [
+            {'invoice_item_id': item.invoice_item_id, 'product_id': item.product_id, 'quantity': 3, 'unit_price': item.unit_price}
+            for item in invoice.invoice_items.order_by('unit_price')[:lines - 1]
+        ] + [{'product_id': products[-1].product_id, 'product_name': products[-1].name, 'quantity': 1, 'unit_price': 10}])
+
+    _, two_lines = edit(2)
+    invoice, many_lines = edit(199)
+
+    assert many_lines == two_lines
+    invoice.refresh_from_db()
+    assert invoice.invoice_items.count() == 199
+    assert invoice.subtotal == sum(product.price * 3 for product in products[:198]) + 10
+    assert invoice.total_amount == invoice.subtotal - Decimal('50.00')
+
+
+@pytest.mark.django_db
+def test_update_invoice_writes_only_changed_lines(client, products):
+    invoice, _ = create_invoice(client, make_order(products, 3))
+    order_items = {item.product_id: item.order_item_id for item in invoice.order.order_items.all()}
+    items = {item.product_id: item for item in invoice.invoice_items.all()}
+    first, second, third = products[:3]
+
+    response = client.patch(f'/hardware/invoices/{invoice.invoice_id}/update/', {'invoice_items': [
+        # matched by id, unchanged
+        {'invoice_item_id': items[first.product_id].invoice_item_id, 'product_id': first.product_id,
+         'quantity': 2, 'unit_price': str(first.price)},
+        # matched by product, quantity changed
+        {'product_id': second.product_id, 'quantity': 5, 'unit_price': str(second.price)},
+        # the third line is removed; a line without a product is found by name for the order
+        {'product_name': products[10].name.upper(), 'quantity': 1, 'unit_price': '7.00'},
+    ]}, content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+
+    after = {item.product_id: item for item in invoice.invoice_items.all()}
+    assert after[first.product_id].invoice_item_id == items[first.product_id].invoice_item_id
+    assert after[first.product_id].updated_at == items[first.product_id].updated_at
+    assert after[second.product_id].invoice_item_id == items[second.product_id].invoice_item_id
+    assert after[second.product_id].quantity == 5
+    assert third.product_id not in after and None in after
+
+    order = Order.objects.get(pk=invoice.order_id)
+    lines = {item.product_id: item for item in order.order_items.all()}
+    assert set(lines) == {first.product_id, second.product_id, products[10].product_id}
+    assert lines[first.product_id].order_item_id == order_items[first.product_id]
+    assert lines[second.product_id].order_item_id == order_items[second.product_id]
+    assert lines[second.product_id].quantity == 5
+    assert order.total_amount == Invoice.objects.get(pk=invoice.pk).total_amount
+
+
+@pytest.mark.django_db
+def test_partial_line_keeps_the_fields_it_leaves_out(client, products):
+    invoice, _ = create_invoice(client, make_order(products, 2))
+    item = invoice.invoice_items.get(product=products[0])
+
+    response = client.put(f'/hardware/invoices/{invoice.invoice_id}/update/', {'invoice_items': [
+        {'invoice_item_id': item.invoice_item_id, 'quantity': 5},
+    ]}, content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+
+    item.refresh_from_db()
+    assert (item.product_id, item.unit_price, item.quantity) == (products[0].product_id, products[0].price, 5)
+    assert item.total_price == products[0].price * 5
+    order_item = OrderItem.objects.get(order=invoice.order_id)
+    assert (order_item.product_id, order_item.unit_price, order_item.quantity) == (products[0].product_id, products[0].price, 5)
+
+
+@pytest.mark.django_db
+def test_invalid_line_is_a_validation_error(products):
+    invoice = Invoice.objects.create(invoice_date='2024-01-01', customer_name='C', customer_phone='1', customer_address='A')
+    serializer = UpdateInvoiceSerializer(invoice, data={'invoice_items': [{'quantity': 'two', 'unit_price': 5}]}, partial=True)
+    assert not serializer.is_valid()
+    assert 'invoice_items' in serializer.errors
+
+
+@pytest.mark.django_db
+def test_calculate_totals_after_a_standalone_item_edit(client, products):
+    invoice, _ = create_invoice(client, make_order(products, 3))
+    item = invoice.invoice_items.order_by('unit_price').first()
+    item.quantity = 10
+    item.save()
+
+    with CaptureQueriesContext(connection) as queries:
+        invoice.calculate_totals()
+    assert len(queries) == 2  # one aggregate, one UPDATE
+
+    expected = sum(line.total_price for line in InvoiceItem.objects.filter(invoice=invoice))
+    invoice.refresh_from_db()
+    assert invoice.subtotal == expected
+
+
+def bulk_create(client, data):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post('/hardware/invoices/bulk-create-from-orders/', data,
+                               content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code < 300, response.content
+    return response.json()['data'], statements(queries)
+
+
+@pytest.mark.django_db
+def test_bulk_invoices_queries_do_not_grow_with_orders(client, products, numbering_started):
+    user = make_user()
+    few, few_queries = bulk_create(client, {'order_ids': [make_order(products, 3, user).order_id for _ in range(2)]})
+    many, many_queries = bulk_create(client, {'order_ids': [make_order(products, 3, user).order_id for _ in range(40)]})
+
+    assert (few['created'], many['created']) == (2, 40)
+    assert many_queries == few_queries
+    invoices = Invoice.objects.filter(invoice_id__in=[result['invoice_id'] for result in few['results'] + many['results']])
+    numbers = sorted(invoice.invoice_number for invoice in invoices)
+    assert len(set(numbers)) == 42 and numbers[-1].endswith(f'{int(numbers[0][-4:]) + 41:04d}')
+    invoice = invoices.get(invoice_id=many['results'][0]['invoice_id'])
+    assert invoice.invoice_items.count() == 3
+    assert invoice.subtotal == sum(product.price * 2 for product in products[:3])
+
+
+@pytest.mark.django_db
+def test_bulk_invoices_skip_invoiced_and_unknown_orders(client, products):
+    invoiced, _ = create_invoice(client, make_order(products, 2))
+    order = make_order(products, 2)
+
+    result, _ = bulk_create(client, {'order_ids': [invoiced.order_id, order.order_id, 'no-such-order']})
+
+    assert [outcome['status'] for outcome in result['results']] == ['skipped', 'created', 'not_found']
+    assert result['results'][0]['invoice_id'] == invoiced.invoice_id
+    assert Invoice.objects.filter(order=order).exists()
+    # the next single invoice continues the sequence
+    later, _ = create_invoice(client, make_order(products, 2))
+    assert later.invoice_number > result['results'][1]['invoice_number']
+
+
+@pytest.mark.django_db
+def test_bulk_invoices_skip_listed_orders_the_filter_excludes(client, products):
+    delivered, pending = make_order(products, 2), make_order(products, 2)
+    Order.objects.filter(pk=delivered.pk).update(status='delivered')
+
+    result, _ = bulk_create(client, {
+        'order_ids': [delivered.order_id, pending.order_id, 'no-such-order'], 'order_status': 'delivered',
+    })
+
+    assert [outcome['status'] for outcome in result['results']] == ['created', 'skipped', 'not_found']
+    assert result['results'][1]['message'] == 'Order does not match the filter'
+    assert (result['created'], result['skipped'], result['not_found']) == (1, 1, 1)
+    assert not Invoice.objects.filter(order=pending).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_invoices_skip_an_order_invoiced_by_a_concurrent_run(products):
+    order = make_order(products, 2)
+    invoice_table = Invoice._meta.db_table
+    concurrent = []
+
+    def invoiced_meanwhile(execute, sql, params, many, context):
+        # the other run commits its invoice while this one waits for the order lock
+        if not concurrent and sql.startswith('SELECT') and f'FROM "{invoice_table}"' in sql:
+            concurrent.append(Invoice.objects.create(
+                order=order, invoice_number='INV-CONCURRENT', invoice_date=date.today(),
+                customer_name='Other run', customer_phone='0700000000', customer_address='Dodoma',
+            ))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(invoiced_meanwhile):
+        result = invoicing.invoice_orders(order_ids=[order.order_id])
+
+    assert concurrent
+    assert [(outcome['order_id'], outcome['status']) for outcome in result['results']] == [(order.order_id, 'skipped')]
+    assert result['results'][0]['invoice_number'] == 'INV-CONCURRENT'
+    assert Invoice.objects.filter(order=order).count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_invoices_need_ids_or_a_filter(client):
+    response = client.post('/hardware/invoices/bulk-create-from-orders/', {},
+                           content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_create_invoices_from_orders_command(products):
+    user = make_user()
+    orders = [make_order(products, 2, user) for _ in range(3)]
+    Order.objects.filter(pk__in=[order.pk for order in orders]).update(created_at=datetime(2001, 1, 31, 12, tzinfo=dt_timezone.utc))
+    Order.objects.filter(pk__in=[order.pk for order in orders[:2]]).update(status='delivered')
+    out = io.StringIO()
+
+    call_command('create_invoices_from_orders', '--status', 'delivered', '--from', '2001-01-01', '--to', '2001-01-31', stdout=out)
+
+    assert set(Invoice.objects.filter(order__in=orders).values_list('order_id', flat=True)) == {
+        orders[0].order_id, orders[1].order_id,
+    }
+    assert 'Invoices created: 2;' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_create_invoices_from_orders_command_filters_the_listed_orders(products):
+    delivered, pending = make_order(products, 2), make_order(products, 2)
+    Order.objects.filter(pk=delivered.pk).update(status='delivered')
+    out = io.StringIO()
+
+    call_command('create_invoices_from_orders', '--order-ids', delivered.order_id, pending.order_id,
+                 '--status', 'delivered', stdout=out)
+
+    assert Invoice.objects.filter(order=delivered).exists()
+    assert not Invoice.objects.filter(order=pending).exists()
+    assert f'{pending.order_id}: Order does not match the filter' in out.getvalue()
+    assert 'Invoices created: 1; orders skipped: 1;' in out.getvalue()
+
+
+def today_prefix():
+    return f"INV-{datetime.now().strftime('%Y%m%d')}-"
+
+
+@pytest.mark.django_db
+def test_invoice_numbers_continue_past_9999():
+    prefix = today_prefix()
+    for number in ('0042', '9999'):  # as text, '9999' sorts after '10000'
+        Invoice.objects.create(invoice_number=f'{prefix}{number}', invoice_date=date.today(), customer_name='Seq',
+                               customer_phone='0700000000', customer_address='Arusha')
+
+    assert invoice_numbers(2) == [f'{prefix}10000', f'{prefix}10001']
+    assert invoice_numbers(1) == [f'{prefix}10002']
+    assert InvoiceSequence.objects.get(day=date.today()).last == 10002
+
+
+@pytest.mark.django_db
+def test_sequence_started_by_a_concurrent_run_is_shared(monkeypatch):
+    prefix = today_prefix()
+    issued = invoicing.numbers_issued
+
+    def started_meanwhile(prefix):
+        InvoiceSequence.objects.create(day=date.today(), last=7)  # another run got there first
+        return issued(prefix)
+
+    monkeypatch.setattr(invoicing, 'numbers_issued', started_meanwhile)
+    assert invoice_numbers(3) == [f'{prefix}0008', f'{prefix}0009', f'{prefix}0010']
@@ -0,0 +1,81 @@
+"""
+orjson renderer and parser (kipenzi/json_renderers.py): byte-for-byte the
+same output as DRF's JSONRenderer, the same ParseError on bad input, and the
+stdlib path when orjson is not installed. Native floats below 1e-4 or from
+1e16 up are the one documented difference.
+"""
+import io
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from kipenzi import json_renderers
+from kipenzi.json_renderers import FastJSONParser, FastJSONRenderer
+
+pytestmark = pytest.mark.skipif(json_renderers.orjson is None, reason='orjson is not installed')
+
+UTC = dt_timezone.utc
+EAT = dt_timezone(timedelta(hours=3))
+
+
+@pytest.mark.parametrize('data', [
+    {'price': Decimal('12.50'), 'tax': Decimal('0.1'), 'total': Decimal('1E+20'), 'tiny': Decimal('0.00001')},
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+    {'utc': datetime(2024, 1, 2, 3, 4, 5, 6000, tzinfo=UTC), 'eat': datetime(2024, 1, 2, 3, 4, tzinfo=EAT),
+     'naive': datetime(2024, 1, 2, 3, 4, 5), 'day': date(2024, 1, 2)},
+    {'message': gettext_lazy('This field is required.')},
+    {'text': 'line\u2028separator\u2029paragraph'},
+    {1: 'int', 2.5: 'float', True: 'bool', None: 'none'},
+    {'floats': [1e15, 0.0001, 1.5, 0.1 + 0.2, -0.0, 123456789012345.6]},
+    Decimal('-2.5E-7'),
+    {'nested': [{'count': 2 ** 63}, {'big': 2 ** 70}], 'empty': [], 'none': None},
+])
+def test_output_matches_drf(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_native_floats_outside_plain_notation_keep_the_orjson_format():
+    data = {'floats': [1e20, 1e16, -2.5e-05, 1.5e-07]}
+
+    rendered = FastJSONRenderer().render(data)
+
+    assert rendered == b'{"floats":[1e20,1e16,-0.000025,1.5e-7]}'
+    assert json.loads(rendered) == json.loads(JSONRenderer().render(data)) == data
+
+
+def test_indented_output_matches_drf():
+    data = {'a': [1, {'b': Decimal('2.50')}], 'c': 'd'}
+    context = {'indent': 2}
+
+    assert FastJSONRenderer().render(data, 'application/json', context) == \
+        JSONRenderer().render(data, 'application/json', context)
+
+
+@pytest.mark.parametrize('parser', [FastJSONParser(), JSONParser()])
+@pytest.mark.parametrize('body', [b'{"a": ', b'{"a": 1,}', b'\xff'])
+def test_malformed_json_is_a_parse_error(parser, body):
+    with pytest.raises(ParseError, match='JSON parse error'):
+        parser.parse(io.BytesIO(body))
+
+
+def test_parser_reads_what_the_renderer_writes():
+    data = {'name': 'Panadol', 'price': 12.5, 'tags': ['pain', '\u2028'], 'stock': None}
+    assert FastJSONParser().parse(io.BytesIO(FastJSONRenderer().render(data))) == data
+
+
+def test_without_orjson_the_stdlib_is_used(monkeypatch):
+    data = {'price': Decimal('12.50'), 'total': 1e20, 'message': gettext_lazy('This field is required.')}
+    expected = JSONRenderer().render(data)
+    monkeypatch.setattr(json_renderers, 'orjson', None)
+
+    assert FastJSONRenderer().render(data) == expected
+    assert FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5]}')) == {'a': [1, 2.5]}
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(io.BytesIO(b'{"a": '))
@@ -0,0 +1,126 @@
+"""
+Media garbage collection (media_gc.py) against a scratch MEDIA_ROOT.
+"""
+import io
+import os
+import uuid
+
+import pytest
+from django.core.management import call_command
+
+from hardware_backend.media_gc import collect_garbage, media_key
+from hardware_backend.models import Banner
+from hardware_backend.utils import variant_name
+from kipenzi.media_storage import get_storage
+
+LONG_AGO = 1_000_000_000  # 2001, well past any grace period
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_STORAGE = 'local'
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_URL = '/media/'
+    return get_storage()
+
+
+def stored(storage, folder='banners', data=None, old=True):
+    """A content-addressed file, written long ago unless `old` is False"""
+    name = storage.save_hashed(folder, iter([data or uuid.uuid4().bytes]), '.jpg')
+    if old:
+        os.utime(storage.path(name), (LONG_AGO, LONG_AGO))
+    return name
+
+
+def banner(url):
+    return Banner.objects.create(title=f'GC {uuid.uuid4().hex[:8]}', image=url)
+
+
+def test_media_key_ignores_the_host_and_prefix():
+    assert media_key('/media/products/abc.jpg') == 'products/abc.jpg'
+    assert media_key('https://cdn.example.com/assets/products/abc.jpg?v=2') == 'products/abc.jpg'
+    assert media_key('https://example.com/banner-0.jpg') is None
+    assert media_key('/media/elsewhere/abc.jpg') is None
+    assert media_key('') is None
+
+
+@pytest.mark.django_db
+def test_references_survive_a_change_of_media_url(storage, settings):
+    name = stored(storage)
+    orphan = stored(storage)
+    banner(f'https://old-bucket.s3.amazonaws.com/{name}')  # saved before a CDN was put in front
+
+    settings.MEDIA_URL = '/cdn/media/'
+    result = collect_garbage()
+
+    assert get_storage().exists(name)
+    assert not get_storage().exists(orphan)
+    assert (result['files'], result['kept']) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_nothing_is_deleted_when_no_reference_matches(storage):
+    orphan = stored(storage)
+    variant = variant_name(orphan, 'thumb', 'webp')
+    storage.save(variant, b'variant')
+    os.utime(storage.path(variant), (LONG_AGO, LONG_AGO))
+    banner(f'/media/banners/{uuid.uuid4().hex}.jpg')  # the storage points somewhere else
+
+    with pytest.raises(ValueError, match='Nothing was deleted'):
+        collect_garbage()
+    assert storage.exists(orphan)
+    assert storage.exists(variant)
+
+
+def variants_of(storage, name, old=True):
+    names = [variant_name(name, variant, ext) for variant in ('full', 'thumb') for ext in ('webp', 'jpg')]
+    for variant in names:
+        storage.save(variant, b'variant')
+        if old:
+            os.utime(storage.path(variant), (LONG_AGO, LONG_AGO))
+    return names
+
+
+@pytest.mark.django_db
+def test_shared_files_are_kept_and_old_orphans_removed(storage):
+    shared, orphan, fresh = stored(storage), stored(storage), stored(storage, old=False)
+    shared_variants, orphan_variants = variants_of(storage, shared), variants_of(storage, orphan)
+    stray_variant = variants_of(storage, 'banners/deleted-long-ago.jpg')[0]
+    for _ in range(3):
+        banner(storage.url(shared))
+
+    result = collect_garbage()
+
+    assert all(storage.exists(name) for name in [shared, fresh] + shared_variants)
+    assert not any(storage.exists(name) for name in [orphan, stray_variant] + orphan_variants)
+    assert result['kept'] == 2  # the shared file and the one inside the grace period
+    assert (result['shared'], result['references']) == (1, 3)
+    assert result['files'] == 1 + len(orphan_variants) + 4
+
+
+@pytest.mark.django_db
+def test_grace_period_keeps_recent_orphans(storage):
+    banner(storage.url(stored(storage)))
+    orphan = stored(storage, old=False)
+
+    assert collect_garbage()['files'] == 0
+    assert collect_garbage(grace_seconds=-60)['files'] == 1
+    assert not storage.exists(orphan)
+
+
+@pytest.mark.django_db
+def test_dry_run_deletes_nothing(storage):
+    banner(storage.url(stored(storage)))
+    orphan = stored(storage)
+    orphan_variants = variants_of(storage, orphan)
+
+    result = collect_garbage(dry_run=True)
+
+    assert result['files'] == 1 + len(orphan_variants)
+    assert result['bytes'] == 16 + 7 * len(orphan_variants)
+    assert all(storage.exists(name) for name in [orphan] + orphan_variants)
+
+    output = io.StringIO()
+    call_command('gc_media', '--dry-run', stdout=output)
+    assert output.getvalue().startswith('Dry run: would delete 5 files')
+    assert all(storage.exists(name) for name in [orphan] + orphan_variants)
@@ -0,0 +1,132 @@
+"""
+Serving uploaded media at MEDIA_URL (kipenzi/media_serving.py): hidden and
+partial files, caching, web server offload and precompressed siblings.
+"""
+import gzip
+import hashlib
+
+import pytest
+from django.http import Http404
+from django.test import RequestFactory
+
+from kipenzi.media_serving import IMMUTABLE, serve_media
+
+HASH = hashlib.sha256(b'photo').hexdigest()
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_OFFLOAD = ''
+    settings.MEDIA_CACHE_SECONDS = 600
+
+    def write(name, data=b'data'):
+        path = tmp_path.joinpath(*name.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    write(f'products/{HASH}.jpg', b'photo')
+    write(f'products/variants/{HASH}-thumb.webp', b'thumb')
+    write('products/legacy-photo.jpg', b'legacy')
+    return write
+
+
+def body(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+@pytest.mark.parametrize('name', [
+    '.env',
+    'products/.hidden.jpg',
+    '.git/config',
+    f'products/{HASH}.jpg.upload',
+    'products/tmpabc123.upload',
+    '../secret.txt',
+    'products/../../secret.txt',
+    'products/missing.jpg',
+    'products',
+])
+def test_hidden_partial_and_outside_files_are_not_found(media, tmp_path, name):
+    media('.env', b'SECRET_KEY=x')
+    media('products/.hidden.jpg')
+    media('.git/config')
+    media(f'products/{HASH}.jpg.upload')
+    media('products/tmpabc123.upload')
+    (tmp_path.parent / 'secret.txt').write_bytes(b'outside MEDIA_ROOT')
+
+    with pytest.raises(Http404):
+        serve_media(RequestFactory().get(f'/media/{name}'), name)
+
+
+def test_content_addressed_files_are_immutable(client, media):
+    response = client.get(f'/media/products/{HASH}.jpg')
+    assert response.status_code == 200
+    assert body(response) == b'photo'
+    assert response['Content-Type'] == 'image/jpeg'
+    assert response['Cache-Control'] == IMMUTABLE
+    assert response['ETag'] == f'"{HASH}"'
+    assert 'sandbox' in response['Content-Security-Policy']
+    assert client.get(f'/media/products/{HASH}.jpg', HTTP_IF_NONE_MATCH=f'"{HASH}"').status_code == 304
+
+    response = client.get(f'/media/products/variants/{HASH}-thumb.webp')
+    assert (response['Cache-Control'], response['ETag']) == (IMMUTABLE, f'"{HASH}-thumb"')
+
+
+def test_other_files_get_the_short_max_age(client, media):
+    response = client.get('/media/products/legacy-photo.jpg')
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=600'
+    assert response['ETag'] != f'"{HASH}"'
+    assert 'immutable' not in response['Cache-Control']
+
+
+def test_x_sendfile(client, media, settings, tmp_path):
+    settings.MEDIA_OFFLOAD = 'x-sendfile'
+    response = client.get(f'/media/products/{HASH}.jpg')
+
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response['X-Sendfile'] == str(tmp_path / 'products' / f'{HASH}.jpg')
+    assert (response['Cache-Control'], response['ETag']) == (IMMUTABLE, f'"{HASH}"')
+    assert client.get(f'/media/products/{HASH}.jpg', HTTP_IF_NONE_MATCH=f'"{HASH}"').status_code == 304
+
+
+def test_x_accel_redirect(client, media, settings):
+    settings.MEDIA_OFFLOAD = 'x-accel-redirect'
+    settings.MEDIA_ACCEL_PREFIX = '/protected-media/'
+    media('brands/logo with space.png')
+    response = client.get(f'/media/products/variants/{HASH}-thumb.webp')
+
+    assert response['X-Accel-Redirect'] == f'/protected-media/products/variants/{HASH}-thumb.webp'
+    assert 'X-Sendfile' not in response
+    response = client.get('/media/brands/logo with space.png')
+    assert response['X-Accel-Redirect'] == '/protected-media/brands/logo%20with%20space.png'
+
+
+def test_precompressed_siblings(client, media):
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+    media('brands/logo.svg', svg)
+    media('brands/logo.svg.gz', gzip.compress(svg))
+    media('brands/logo.svg.br', b'brotli bytes')
+
+    response = client.get('/media/brands/logo.svg', HTTP_ACCEPT_ENCODING='gzip, br')
+    assert (response['Content-Encoding'], body(response)) == ('br', b'brotli bytes')
+    assert 'Accept-Encoding' in response['Vary']
+    etag = response['ETag']
+    assert etag.endswith('-br"')
+
+    response = client.get('/media/brands/logo.svg', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body(response)) == svg
+
+    response = client.get('/media/brands/logo.svg')
+    assert 'Content-Encoding' not in response
+    assert body(response) == svg
+    assert response['ETag'] != etag
+
+    # images are never looked up, even with a sibling on disk
+    media(f'products/{HASH}.jpg.gz', gzip.compress(b'photo'))
+    response = client.get(f'/media/products/{HASH}.jpg', HTTP_ACCEPT_ENCODING='gzip')
+    assert 'Content-Encoding' not in response
+    assert body(response) == b'photo'
@@ -0,0 +1,88 @@
+"""
+Local media storage (kipenzi/media_storage.py): content-addressed saves,
+hashed while the chunks are written, and reuse of identical uploads.
+"""
+import hashlib
+import os
+
+import pytest
+
+from kipenzi.media_storage import UPLOAD_SUFFIX, get_storage
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_STORAGE = 'local'
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_URL = '/media/'
+    return get_storage()
+
+
+def chunks(*parts):
+    yield from parts
+
+
+def folder_files(storage, folder):
+    return sorted(os.listdir(storage.path(folder)))
+
+
+def test_save_hashed_names_the_file_by_its_content(storage):
+    parts = [b'\xff\xd8first chunk ', b'second chunk ', b'last chunk\xff\xd9']
+    name = storage.save_hashed('products', chunks(*parts), '.jpg', 'image/jpeg')
+
+    assert name == f"products/{hashlib.sha256(b''.join(parts)).hexdigest()}.jpg"
+    assert storage.url(name) == f'/media/{name}'
+    assert storage.name(storage.url(name)) == name
+    with storage.open(name) as f:
+        assert f.read() == b''.join(parts)
+    assert folder_files(storage, 'products') == [os.path.basename(name)]  # no .upload left behind
+
+
+def test_identical_upload_reuses_the_file(storage):
+    first = storage.save_hashed('products', chunks(b'same ', b'bytes'), '.png')
+    os.utime(storage.path(first), (1, 1))
+
+    second = storage.save_hashed('products', chunks(b'same bytes'), '.png')  # chunked differently
+
+    assert second == first
+    assert folder_files(storage, 'products') == [os.path.basename(first)]
+    assert os.path.getmtime(storage.path(first)) > 1  # the gc_media grace period starts again
+    assert storage.save_hashed('products', chunks(b'other bytes'), '.png') != first
+
+
+def test_failed_upload_leaves_nothing(storage):
+    def broken():
+        yield b'half an image'
+        raise OSError('client went away')
+
+    with pytest.raises(OSError):
+        storage.save_hashed('brands', broken(), '.jpg')
+    assert not any(name.endswith(UPLOAD_SUFFIX) for name in folder_files(storage, 'brands'))
+    assert list(storage.list('brands')) == []
+
+
+def test_list_and_delete(storage):
+    names = [storage.save_hashed('banners', chunks(data), '.jpg') for data in (b'a', b'b')]
+    storage.save('banners/variants/x-thumb.webp', b'variant')
+
+    assert sorted(stored.name for stored in storage.list('banners')) == sorted(names)
+    assert [stored.size for stored in storage.list('banners/variants')] == [7]
+
+    storage.delete(names + ['banners/missing.jpg'])
+    assert list(storage.list('banners')) == []
+    assert storage.exists('banners/variants/x-thumb.webp')
+
+
+@pytest.mark.parametrize('url', [
+    '/media/../../../../etc/passwd',
+    '/media/products/../../settings.py',
+    '/media//etc/passwd/../..',
+    '/media/..',
+    '/media/',
+])
+def test_name_rejects_urls_outside_the_media_root(storage, url):
+    assert storage.name(url) is None
+
+
+def test_name_normalizes_urls_inside_the_media_root(storage):
+    assert storage.name('/media/products/../brands/./a.jpg') == 'brands/a.jpg'
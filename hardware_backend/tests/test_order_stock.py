@@ -0,0 +1,58 @@
+"""
+Cancelling or deleting an order puts its quantities back on the products'
+stock, with one read and one bulk UPDATE however many lines it has.
+"""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from hardware_backend.models import Brand, BusinessUser, Order, OrderItem, Product, ProductCategory, ProductType
+
+
+@pytest.fixture
+def order(db):
+    category = ProductCategory.objects.create(name=f'Stock {uuid.uuid4().hex[:8]}')
+    brand = Brand.objects.create(name=f'Stock {uuid.uuid4().hex[:8]}')
+    product_type = ProductType.objects.create(name='Stock type', category=category)
+    first, second = [
+        Product.objects.create(name=f'Stock product {i}', description='', price=Decimal('10.00'), category=category,
+                               brand=brand, product_type=product_type, stock_quantity=5)
+        for i in range(2)
+    ]
+    key = uuid.uuid4().hex[:12]
+    user = BusinessUser.objects.create(business_type='Retail', business_name=f'Stock {key}', phone_number=f'+{key}',
+                                       business_location='Mwanza', tin_number=f'TIN-{key}', password='x')
+    order = Order.objects.create(user=user, delivery_address='Mwanza', delivery_phone=user.phone_number)
+    for product, quantity, pack_type in ((first, 2, 'Piece'), (first, 1, 'Dozen'), (second, 4, 'Piece')):
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=product.price,
+                                 product_name=product.name, pack_type=pack_type)
+    return order, first, second
+
+
+def stock(*products):
+    return [Product.objects.get(pk=product.pk).stock_quantity for product in products]
+
+
+def test_cancel_restores_stock(client, order):
+    order, first, second = order
+    updated_at = first.updated_at
+
+    response = client.post(f'/hardware/orders/{order.order_id}/cancel/', HTTP_ACCEPT='application/json')
+
+    assert response.status_code == 200, response.content
+    data = response.json()['data']
+    assert data['status'] == 'cancelled'
+    assert len(data['order_items']) == 3 and data['user']['user_id'] == order.user_id
+    assert stock(first, second) == [8, 9]
+    assert Product.objects.get(pk=first.pk).updated_at > updated_at  # ETags and delta sync see the change
+
+
+def test_delete_restores_stock(client, order):
+    order, first, second = order
+
+    response = client.delete(f'/hardware/orders/{order.order_id}/delete/', HTTP_ACCEPT='application/json')
+
+    assert response.status_code == 200, response.content
+    assert not Order.objects.filter(pk=order.pk).exists()
+    assert stock(first, second) == [8, 9]
@@ -0,0 +1,152 @@
+"""
+Barcodes / SKUs (product_codes.py): scan lookups by code, pack-level codes,
+the bulk basket lookup and the import_product_codes command.
+"""
+import io
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+
+from hardware_backend.models import Brand, Product, ProductCategory, ProductCode, ProductType
+
+
+@pytest.fixture
+def catalog(db):
+    category = ProductCategory.objects.create(name=f'Codes {uuid.uuid4().hex[:8]}')
+    brand = Brand.objects.create(name=f'Codes {uuid.uuid4().hex[:8]}')
+    product_type = ProductType.objects.create(name='Codes type', category=category)
+
+    def product(name, active=True):
+        return Product.objects.create(name=name, description='', price=Decimal('5.00'), category=category,
+                                      brand=brand, product_type=product_type, is_active=active)
+
+    paracetamol, ibuprofen, withdrawn = product('Paracetamol'), product('Ibuprofen'), product('Withdrawn', active=False)
+    ProductCode.objects.bulk_create([
+        ProductCode(product=paracetamol, code='4006381333931', pack_type='Piece'),
+        ProductCode(product=paracetamol, code='PARA-12', pack_type='Dozen'),
+        ProductCode(product=ibuprofen, code='IBU-1'),
+        ProductCode(product=withdrawn, code='OLD-1'),
+    ])
+    return {'paracetamol': paracetamol, 'ibuprofen': ibuprofen, 'withdrawn': withdrawn}
+
+
+def get(client, url, params=None):
+    return client.get(url, params or {}, HTTP_ACCEPT='application/json')
+
+
+def test_scan_finds_the_product_in_one_query(client, catalog, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        response = get(client, '/hardware/products/by-code/4006381333931/')
+
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert (data['code'], data['pack_type']) == ('4006381333931', 'Piece')
+    assert data['product']['product_id'] == catalog['paracetamol'].product_id
+    assert data['product']['name'] == 'Paracetamol'
+
+
+def test_pack_code_gives_its_pack_type(client, catalog):
+    data = get(client, '/hardware/products/by-code/para-12/').json()['data']  # normalized like a stored code
+
+    assert (data['code'], data['pack_type']) == ('PARA-12', 'Dozen')
+    assert data['product']['product_id'] == catalog['paracetamol'].product_id
+
+
+@pytest.mark.parametrize('code', ['UNKNOWN', 'OLD-1'])
+def test_unknown_code_or_inactive_product_is_not_found(client, catalog, code):
+    response = get(client, f'/hardware/products/by-code/{code}/')
+    assert response.status_code == 404
+    assert response.json()['message'] == 'No product found for this code'
+
+
+def test_code_is_unique(catalog):
+    with pytest.raises(IntegrityError), transaction.atomic():
+        ProductCode.objects.create(product=catalog['ibuprofen'], code='PARA-12')
+
+
+def test_basket_lookup_reports_missing_codes(client, catalog, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        response = get(client, '/hardware/products/by-codes/', {'codes': 'ibu-1, NOPE,PARA-12,OLD-1,IBU-1'})
+
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert [(result['code'], result['pack_type'], result['product']['name']) for result in data['results']] == [
+        ('IBU-1', 'Piece', 'Ibuprofen'), ('PARA-12', 'Dozen', 'Paracetamol'),
+    ]
+    assert data['not_found'] == ['NOPE', 'OLD-1']
+
+
+@pytest.mark.parametrize('codes, message', [
+    (' , ', 'codes is required'),
+    (','.join(f'C{i}' for i in range(201)), 'At most 200 codes per request'),
+])
+def test_basket_lookup_validates_codes(client, db, codes, message):
+    response = get(client, '/hardware/products/by-codes/', {'codes': codes})
+    assert response.status_code == 400
+    assert response.json()['message'] == message
+
+
+def test_admin_import_creates_and_reassigns_codes(client, catalog):
+    response = client.post('/hardware/admin/products/codes/import/', {'codes': [
+        {'code': 'ibu-12', 'product_id': catalog['ibuprofen'].product_id, 'pack_type': 'dozen'},
+        {'code': 'IBU-1', 'product_id': catalog['paracetamol'].product_id},
+        {'code': 'PARA-12', 'product_id': catalog['paracetamol'].product_id, 'pack_type': 'Dozen'},
+    ]}, content_type='application/json', HTTP_ACCEPT='application/json')
+
+    assert response.status_code == 200, response.content
+    result = response.json()['data']
+    assert (result['created'], result['updated'], result['unchanged'], result['errors']) == (1, 1, 1, [])
+    assert ProductCode.objects.get(code='IBU-12').pack_type == 'Dozen'
+    assert ProductCode.objects.get(code='IBU-1').product_id == catalog['paracetamol'].product_id
+
+
+def test_admin_import_needs_a_list_of_rows(client, db):
+    response = client.post('/hardware/admin/products/codes/import/', {'codes': 'IBU-1'},
+                           content_type='application/json', HTTP_ACCEPT='application/json')
+    assert response.status_code == 400
+
+
+def write_csv(tmp_path, catalog):
+    path = tmp_path / 'codes.csv'
+    para, ibu = catalog['paracetamol'].product_id, catalog['ibuprofen'].product_id
+    path.write_text(
+        'code,product_id,pack_type\n'
+        f'NEW-1,{para},Piece\n'
+        f'PARA-12,{ibu},Dozen\n'
+        f'IBU-1,{ibu},\n'
+        f'BAD-PACK,{para},Crate\n'
+        'GHOST,no-such-product,Piece\n'
+        f'new-1,{ibu},Piece\n'
+        f',{ibu},Piece\n'
+    )
+    return path
+
+
+def test_import_product_codes_command(tmp_path, catalog):
+    out, err = io.StringIO(), io.StringIO()
+
+    call_command('import_product_codes', str(write_csv(tmp_path, catalog)), stdout=out, stderr=err)
+
+    assert '1 created, 1 updated, 1 unchanged, 4 rejected' in out.getvalue()
+    assert err.getvalue().splitlines() == [
+        'line 5: BAD-PACK: pack_type must be one of: Piece, Dozen',
+        'line 6: GHOST: Product not found',
+        'line 7: NEW-1: code is already used in row 1 of this import',
+        'line 8: (empty): code is required',
+    ]
+    assert ProductCode.objects.get(code='NEW-1').product_id == catalog['paracetamol'].product_id
+    assert ProductCode.objects.get(code='PARA-12').product_id == catalog['ibuprofen'].product_id
+    assert not ProductCode.objects.filter(code__in=['BAD-PACK', 'GHOST']).exists()
+
+
+def test_import_product_codes_dry_run_saves_nothing(tmp_path, catalog):
+    out = io.StringIO()
+
+    call_command('import_product_codes', str(write_csv(tmp_path, catalog)), '--dry-run', stdout=out, stderr=io.StringIO())
+
+    assert out.getvalue().startswith('Dry run: 1 created, 1 updated')
+    assert not ProductCode.objects.filter(code='NEW-1').exists()
+    assert ProductCode.objects.get(code='PARA-12').product_id == catalog['paracetamol'].product_id
@@ -0,0 +1,101 @@
+"""
+Faceted product listing (product_facets.py) through products/browse/: each
+dimension is counted with every filter but its own, and bad parameters are
+a 400.
+"""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from hardware_backend.models import Brand, Product, ProductCategory, ProductType
+
+
+@pytest.fixture
+def catalog(db):
+    """One category: brand A has a featured in-stock product and an out-of-stock one, brand B one in stock"""
+    category = ProductCategory.objects.create(name=f'Facets {uuid.uuid4().hex[:8]}')
+    product_type = ProductType.objects.create(name='Facets type', category=category)
+    brands = {key: Brand.objects.create(name=f'Facets {key} {uuid.uuid4().hex[:8]}') for key in 'AB'}
+
+    def product(name, brand, price, stock, featured=False, active=True):
+        return Product.objects.create(
+            name=name, description='', price=Decimal(price), category=category, brand=brands[brand],
+            product_type=product_type, stock_quantity=stock, is_featured=featured, is_active=active,
+        )
+
+    product('A1', 'A', '10.00', 5, featured=True)
+    product('A2', 'A', '20.00', 0)
+    product('B1', 'B', '30.00', 3)
+    product('B hidden', 'B', '1000.00', 9, featured=True, active=False)
+    return {'category': category, 'brands': brands}
+
+
+def browse(client, catalog, **params):
+    response = client.get('/hardware/products/browse/', {'category': catalog['category'].category_id, **params},
+                          HTTP_ACCEPT='application/json')
+    assert response.status_code == 200, response.content
+    return response.json()['data']
+
+
+def brand_counts(data, catalog):
+    ids = {brand.brand_id: key for key, brand in catalog['brands'].items()}
+    return {ids[row['id']]: (row['count'], row['selected']) for row in data['facets']['brand']}
+
+
+def test_selected_brand_still_counts_the_other_brands(client, catalog):
+    data = browse(client, catalog, brand=catalog['brands']['A'].brand_id)
+
+    assert [product['name'] for product in data['products']] == ['A1', 'A2']
+    assert data['pagination']['total'] == 2
+    assert brand_counts(data, catalog) == {'A': (2, True), 'B': (1, False)}
+    assert data['facets']['in_stock'] == {'true': 1, 'false': 1}
+    assert data['facets']['featured'] == {'true': 1, 'false': 1}
+    assert data['facets']['price'] == {'min': '10.00', 'max': '20.00'}
+    [category] = data['facets']['category']
+    assert (category['count'], category['selected']) == (2, True)
+
+
+def test_in_stock_and_price_counts_ignore_their_own_filter(client, catalog):
+    data = browse(client, catalog, in_stock='true', min_price='15')
+
+    assert [product['name'] for product in data['products']] == ['B1']
+    assert data['facets']['in_stock'] == {'true': 1, 'false': 1}  # A2 and B1 cost 15 or more
+    assert data['facets']['price'] == {'min': '10.00', 'max': '30.00'}  # A1 and B1 are in stock
+    assert data['facets']['featured'] == {'true': 0, 'false': 1}
+    assert brand_counts(data, catalog) == {'B': (1, False)}
+
+
+def test_featured_counts_ignore_the_featured_filter(client, catalog):
+    data = browse(client, catalog, featured='true')
+
+    assert [product['name'] for product in data['products']] == ['A1']
+    assert data['facets']['featured'] == {'true': 1, 'false': 2}
+    assert data['facets']['in_stock'] == {'true': 1, 'false': 0}
+    assert data['facets']['price'] == {'min': '10.00', 'max': '10.00'}
+
+
+def test_ordering_and_pages(client, catalog):
+    data = browse(client, catalog, ordering='-price', page_size='2', page='2')
+
+    assert [product['name'] for product in data['products']] == ['A1']
+    assert data['pagination'] == {'page': 2, 'page_size': 2, 'total': 3, 'pages': 2}
+    assert browse(client, catalog, page='3', page_size='2')['products'] == []
+    assert browse(client, catalog, page_size='500')['pagination']['page_size'] == 100
+
+
+@pytest.mark.parametrize('params, message', [
+    ({'min_price': 'cheap'}, 'min_price must be a number'),
+    ({'max_price': '-1'}, 'max_price must be a positive number'),
+    ({'min_price': 'NaN'}, 'min_price must be a positive number'),
+    ({'min_price': '50', 'max_price': '10'}, 'min_price must not be greater than max_price'),
+    ({'ordering': 'cheapest'}, 'ordering must be one of: name, -name, price, -price, newest'),
+    ({'page_size': '0'}, 'page_size must be a positive integer'),
+    ({'page_size': 'all'}, 'page_size must be a positive integer'),
+    ({'page': '-1'}, 'page must be a positive integer'),
+    ({'in_stock': 'maybe'}, 'in_stock must be true or false'),
+])
+def test_bad_parameters_are_rejected(client, db, params, message):
+    response = client.get('/hardware/products/browse/', params, HTTP_ACCEPT='application/json')
+    assert response.status_code == 400
+    assert response.json()['message'] == message
@@ -0,0 +1,133 @@
+"""
+Bulk product import (product_import.py): rows created, updated and rejected,
+duplicate rows, barcode matching and barcodes that cannot be saved, dry runs
+and one transaction per chunk.
+"""
+import csv
+import io
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from hardware_backend.models import (
+    Brand, Product, ProductBatch, ProductCategory, ProductCode, ProductLocation, ProductType, Shelf,
+)
+from hardware_backend.product_import import import_products
+
+HEADER = ['name', 'price', 'category', 'brand', 'product_type', 'shelf', 'barcode', 'stock_quantity']
+
+
+@pytest.fixture
+def refs(db):
+    key = uuid.uuid4().hex[:8]
+    category = ProductCategory.objects.create(name=f'Import category {key}')
+    return {
+        'category': category.name,
+        'brand': Brand.objects.create(name=f'Import brand {key}').name,
+        'product_type': ProductType.objects.create(name=f'Import type {key}', category=category).name,
+        'shelf': Shelf.objects.create(name=f'Import shelf {key}').name,
+        'key': key,
+        'barcode': str(uuid.uuid4().int)[:13],
+    }
+
+
+def csv_file(rows, header=HEADER):
+    content = io.StringIO()
+    writer = csv.writer(content)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return io.BytesIO(content.getvalue().encode())
+
+
+def row(refs, name, price='100', barcode='', stock='5'):
+    return [f'{name} {refs["key"]}', price, refs['category'], refs['brand'], refs['product_type'], refs['shelf'], barcode, stock]
+
+
+def products(refs):
+    return Product.objects.filter(name__endswith=refs['key'])
+
+
+@pytest.mark.django_db
+def test_rows_are_created_updated_and_rejected(refs):
+    result = import_products(csv_file([
+        row(refs, 'Hammer', barcode=refs['barcode']),
+        row(refs, 'Wrench', price='250.50'),
+        row(refs, 'Free', price='free'),
+        [f'Orphan {refs["key"]}', '10', 'No such category', refs['brand'], refs['product_type'], refs['shelf'], '', ''],
+        [f'Unfinished {refs["key"]}', '10'],
+    ]), 'products.csv')
+
+    assert (result['rows'], result['created'], result['updated'], result['rejected']) == (5, 2, 0, 3)
+    assert [error['row'] for error in result['errors']] == [4, 5, 6]
+    assert 'category "No such category" not found' in result['errors'][1]['message']
+    assert 'required' in result['errors'][2]['message']
+    wrench = products(refs).get(name__startswith='Wrench')
+    assert wrench.price == Decimal('250.50')
+    assert ProductLocation.objects.get(product=wrench).quantity == 5
+
+    result = import_products(csv_file([row(refs, 'Wrench', price='300', stock='8')]), 'products.csv')
+    assert (result['created'], result['updated']) == (0, 1)  # matched by name and brand
+    wrench.refresh_from_db()
+    assert (wrench.price, wrench.stock_quantity) == (Decimal('300.00'), 8)
+    assert ProductLocation.objects.get(product=wrench).quantity == 8
+
+
+@pytest.mark.django_db
+def test_duplicate_rows_are_rejected(refs):
+    result = import_products(csv_file([row(refs, 'Level'), row(refs, 'Level', price='120')]), 'products.csv')
+
+    assert (result['created'], result['rejected']) == (1, 1)
+    assert result['errors'] == [{'row': 3, 'message': 'same product as row 2'}]
+    assert products(refs).get().price == Decimal('100.00')
+
+
+@pytest.mark.django_db
+def test_barcode_matches_the_existing_product(refs):
+    barcode = refs['barcode']
+    import_products(csv_file([row(refs, 'Drill', barcode=barcode)]), 'products.csv')
+    drill = products(refs).get()
+    assert ProductCode.objects.get(code=barcode).product_id == drill.product_id
+
+    # a different name, but the barcode says which product the row is
+    result = import_products(csv_file([['Cordless drill', '450', barcode]], header=['name', 'price', 'barcode']), 'products.csv')
+
+    assert (result['created'], result['updated'], result['rejected']) == (0, 1, 0)
+    drill.refresh_from_db()
+    assert (drill.name, drill.price) == ('Cordless drill', Decimal('450.00'))
+
+
+@pytest.mark.django_db
+def test_barcode_that_cannot_be_saved_is_not_a_rejected_row(refs):
+    barcode = refs['barcode']
+    result = import_products(csv_file([row(refs, 'Chisel', barcode=barcode), row(refs, 'Punch', barcode=barcode)]),
+                             'products.csv')
+
+    assert (result['rows'], result['created'], result['updated'], result['rejected']) == (2, 2, 0, 0)
+    assert result['errors'] == []
+    assert result['code_errors'] == [{'row': 3, 'message': 'barcode is already used in row 2'}]
+    assert ProductCode.objects.get(code=barcode).product.name.startswith('Chisel')
+    assert products(refs).count() == 2
+
+
+@pytest.mark.django_db
+def test_dry_run_writes_nothing(refs):
+    result = import_products(csv_file([row(refs, 'Saw'), row(refs, 'Vice')]), 'products.csv', dry_run=True)
+
+    assert (result['created'], result['dry_run']) == (2, True)
+    assert not products(refs).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_each_chunk_commits_on_its_own(refs):
+    in_transaction = []
+    result = import_products(
+        csv_file([row(refs, f'Bolt {i}') for i in range(5)] + [row(refs, 'Nut', price='cheap')]),
+        'products.csv', chunk_size=2, on_chunk=lambda summary: in_transaction.append(connection.in_atomic_block),
+    )
+
+    assert (result['created'], result['rejected']) == (5, 1)
+    assert in_transaction == [False, False, False]  # every chunk committed before the next is read
+    assert products(refs).count() == 5
+    assert ProductBatch.objects.filter(product__in=products(refs)).count() == 0
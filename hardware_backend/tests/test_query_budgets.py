@@ -0,0 +1,101 @@
+"""
+Query-count and response-time budgets for every route in hardware_backend/urls.py.
+
+Each route is called against the seeded small and large datasets (see
+dataset.py) and must answer 2xx (or the "status" its budget expects) within
+the max_queries / max_ms declared for it in query_budgets.json. A new N+1 or
+an unbounded list shows up as a query count that grows with the dataset; a
+new route fails until it is given a budget.
+
+Run with:  python -m pytest
+
+Query counts are checked exactly. Response times are checked against twice
+the declared max_ms by default, so a loaded CI runner does not fail a merge
+on wall-clock noise: QUERY_BUDGET_TIME_FACTOR=1 checks the budgets as
+declared (profiling runs), a larger factor loosens them further and 0 skips
+the time checks altogether.
+"""
+import csv
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from hardware_backend.urls import urlpatterns
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+BUDGETS = json.loads(BUDGETS_FILE.read_text())['routes']
+ROUTE_NAMES = [pattern.name for pattern in urlpatterns]
+TIME_FACTOR = float(os.getenv('QUERY_BUDGET_TIME_FACTOR', '2'))
+
+
+def resolve_refs(value, refs):
+    """Replace "$name" strings with the seeded ids from the dataset"""
+    if isinstance(value, str) and value.startswith('$'):
+        return refs[value[1:]]
+    if isinstance(value, dict):
+        return {key: resolve_refs(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_refs(item, refs) for item in value]
+    return value
+
+
+def call_route(client, budget, refs):
+    url = reverse(budget['route'], kwargs=resolve_refs(budget.get('kwargs', {}), refs))
+    method = budget['method']
+    data = resolve_refs(budget.get('data'), refs)
+    if method == 'GET':
+        return client.get(url, data or {})
+    if 'upload' in budget:
+        # {"upload": {"field", "name", "rows"}}: the rows sent as a multipart CSV file
+        upload = budget['upload']
+        content = io.StringIO()
+        csv.writer(content).writerows(resolve_refs(upload['rows'], refs))
+        files = {upload['field']: SimpleUploadedFile(upload['name'], content.getvalue().encode(), 'text/csv')}
+        return client.post(url, {**(data or {}), **files})
+    return client.generic(method, url, json.dumps(data or {}), content_type='application/json')
+
+
+def test_every_route_has_a_budget():
+    missing = [name for name in ROUTE_NAMES if name not in BUDGETS]
+    assert not missing, f'Add query budgets for: {", ".join(missing)}'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route_name', ROUTE_NAMES)
+def test_route_within_budget(route_name, dataset, client):
+    profile, refs = dataset
+    budget = dict(BUDGETS[route_name], route=route_name)
+
+    if budget.get('auth') == 'admin':
+        client.force_login(User.objects.create_user('budget-admin', is_staff=True))
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = call_route(client, budget, refs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    expected = budget.get('status')
+    assert (response.status_code == expected) if expected else (200 <= response.status_code < 300), (
+        f'{route_name}: HTTP {response.status_code} {response.content[:300]!r}'
+    )
+
+    max_queries = budget['max_queries'][profile]
+    assert len(queries) <= max_queries, (
+        f'{route_name} ({profile}): {len(queries)} queries, budget {max_queries}'
+    )
+
+    if not TIME_FACTOR:
+        return
+    max_ms = budget['max_ms'][profile] * TIME_FACTOR
+    assert elapsed_ms <= max_ms, (
+        f'{route_name} ({profile}): {elapsed_ms:.0f} ms, budget {max_ms:.0f} ms'
+    )
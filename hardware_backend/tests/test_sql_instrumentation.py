@@ -0,0 +1,118 @@
+"""
+Per-request SQL instrumentation (kipenzi/sql_instrumentation.py): the
+Server-Timing / X-DB-Queries headers, the N+1 warning, sampling and the
+admin/metrics/sql/ view that serves the per-view stats.
+"""
+import logging
+
+import pytest
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.urls import include, path
+
+from hardware_backend.models import Product
+from kipenzi import sql_instrumentation
+from kipenzi.sql_instrumentation import reset_sql_stats, sql_stats
+
+
+def repeated_lookups(request):
+    """One query shape run ?n= times, as a serializer with an N+1 would"""
+    for i in range(int(request.GET.get('n', 1))):
+        Product.objects.filter(name=f'instrumented {i}').exists()
+    return HttpResponse('ok')
+
+
+urlpatterns = [
+    path('repeat/', repeated_lookups, name='repeated_lookups'),
+    path('hardware/', include('hardware_backend.urls')),
+]
+
+
+@pytest.fixture
+def instrumented(settings):
+    settings.SQL_INSTRUMENTATION_ENABLED = True
+    settings.SQL_INSTRUMENTATION_SAMPLE_RATE = 1.0
+    settings.SQL_N_PLUS_ONE_THRESHOLD = 5
+    reset_sql_stats()
+    yield settings
+    reset_sql_stats()
+
+
+def n_plus_one_warnings(caplog):
+    return [record for record in caplog.records
+            if record.name == sql_instrumentation.__name__ and record.levelno == logging.WARNING]
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+def test_headers_report_query_count_and_db_time(client, instrumented):
+    response = client.get('/repeat/', {'n': 3})
+
+    assert response['X-DB-Queries'] == '3'
+    db, app = response['Server-Timing'].split(', ')
+    assert db.startswith('db;dur=') and db.endswith(';desc="3 queries"')
+    assert app.startswith('app;dur=')
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+def test_repeated_query_shape_is_logged_as_n_plus_one(client, instrumented, caplog):
+    with caplog.at_level(logging.WARNING, logger=sql_instrumentation.__name__):
+        client.get('/repeat/', {'n': 5})  # at the threshold: fine
+        assert n_plus_one_warnings(caplog) == []
+
+        client.get('/repeat/', {'n': 6})
+
+    [warning] = n_plus_one_warnings(caplog)
+    assert warning.view == 'repeated_lookups'
+    assert warning.repeat_count == 6
+    assert warning.query_count == 6
+    assert f'FROM "{Product._meta.db_table}"' in warning.sql_fingerprint
+
+    stats = sql_stats()['repeated_lookups']
+    assert stats['requests'] == 2
+    assert stats['n_plus_one_requests'] == 1
+    assert stats['queries_max'] == 6
+    assert stats['query_count_histogram'] == {'le_5': 1, 'le_10': 1}
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+@pytest.mark.parametrize('enabled, sample_rate, roll, sampled', [
+    (True, 0.5, 0.3, True),
+    (True, 0.5, 0.7, False),
+    (True, 0.0, 0.0, False),
+    (False, 1.0, 0.0, False),
+])
+def test_sampling_and_off_switch(client, instrumented, monkeypatch, enabled, sample_rate, roll, sampled):
+    instrumented.SQL_INSTRUMENTATION_ENABLED = enabled
+    instrumented.SQL_INSTRUMENTATION_SAMPLE_RATE = sample_rate
+    monkeypatch.setattr(sql_instrumentation.random, 'random', lambda: roll)
+
+    response = client.get('/repeat/', {'n': 20})
+
+    assert response.has_header('X-DB-Queries') is sampled
+    assert response.has_header('Server-Timing') is sampled
+    assert ('repeated_lookups' in sql_stats()) is sampled
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+def test_sql_stats_view_is_admin_only(client, instrumented):
+    client.get('/repeat/', {'n': 2})
+
+    assert client.get('/hardware/admin/metrics/sql/').status_code == 403
+    client.force_login(User.objects.create_user('sql-stats-user'))
+    assert client.get('/hardware/admin/metrics/sql/').status_code == 403
+    assert client.delete('/hardware/admin/metrics/sql/').status_code == 403
+    assert 'repeated_lookups' in sql_stats()
+
+    client.force_login(User.objects.create_user('sql-stats-admin', is_staff=True))
+    response = client.get('/hardware/admin/metrics/sql/')
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert data['sample_rate'] == 1.0 and data['n_plus_one_threshold'] == 5
+    assert data['views']['repeated_lookups']['queries_max'] == 2
+
+    assert client.delete('/hardware/admin/metrics/sql/').status_code == 200
+    assert 'repeated_lookups' not in sql_stats()
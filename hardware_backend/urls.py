@@ -20,10 +20,19 @@ urlpatterns = [
     path('products/', views.products_page, name='products_page'),
     path('products-with-user/', views.products_page_with_user, name='products_page_with_user'),
     path('products/search/', views.search_products, name='search_products'),
+    path('products/browse/', views.products_browse, name='products_browse'),
+    path('products/autocomplete/', views.products_autocomplete, name='products_autocomplete'),
+    path('products/by-code/<str:code>/', views.product_by_code, name='product_by_code'),
+    path('products/by-codes/', views.products_by_codes, name='products_by_codes'),
     path('products/category/<str:category_id>/', views.products_by_category, name='products_by_category'),
     path('products/brand/<str:brand_id>/', views.products_by_brand, name='products_by_brand'),
     path('products/<str:product_id>/', views.product_detail, name='product_detail'),
     
+    # Catalog delta sync and offline snapshot (mobile / POS)
+    path('catalog/changes/', views.catalog_changes, name='catalog_changes'),
+    path('catalog/snapshot/', views.catalog_snapshot, name='catalog_snapshot'),
+    path('catalog/snapshot/<str:name>', views.catalog_snapshot_file, name='catalog_snapshot_file'),
+    
     # Product Types APIs (for frontend)
     path('product-types/', views.admin_get_all_product_types, name='get_all_product_types'),
 
@@ -31,6 +40,9 @@ urlpatterns = [
     # Products
     path('admin/products/', views.admin_get_all_products, name='admin_get_all_products'),
     path('admin/products/create/', views.admin_create_product, name='admin_create_product'),
+    path('admin/products/codes/import/', views.admin_import_product_codes, name='admin_import_product_codes'),
+    path('admin/products/import/', views.admin_import_products, name='admin_import_products'),
+    path('admin/products/bulk/', views.admin_bulk_products, name='admin_bulk_products'),
     path('admin/products/<str:product_id>/', views.admin_update_product, name='admin_update_product'),
     path('admin/products/<str:product_id>/delete/', views.admin_delete_product, name='admin_delete_product'),
     path('admin/products/<str:product_id>/toggle-status/', views.admin_toggle_product_status, name='admin_toggle_product_status'),
@@ -38,6 +50,7 @@ urlpatterns = [
     # Categories
     path('admin/categories/', views.admin_get_all_categories, name='admin_get_all_categories'),
     path('admin/categories/create/', views.admin_create_category, name='admin_create_category'),
+    path('admin/categories/bulk/', views.admin_bulk_categories, name='admin_bulk_categories'),
     path('admin/categories/<str:category_id>/', views.admin_update_category, name='admin_update_category'),
     path('admin/categories/<str:category_id>/delete/', views.admin_delete_category, name='admin_delete_category'),
     path('admin/categories/<str:category_id>/toggle-status/', views.admin_toggle_category_status, name='admin_toggle_category_status'),
@@ -45,6 +58,7 @@ urlpatterns = [
     # Brands
     path('admin/brands/', views.admin_get_all_brands, name='admin_get_all_brands'),
     path('admin/brands/create/', views.admin_create_brand, name='admin_create_brand'),
+    path('admin/brands/bulk/', views.admin_bulk_brands, name='admin_bulk_brands'),
     path('admin/brands/<str:brand_id>/', views.admin_update_brand, name='admin_update_brand'),
     path('admin/brands/<str:brand_id>/delete/', views.admin_delete_brand, name='admin_delete_brand'),
     path('admin/brands/<str:brand_id>/toggle-status/', views.admin_toggle_brand_status, name='admin_toggle_brand_status'),
@@ -75,6 +89,7 @@ urlpatterns = [
 
     # User Admin APIs
     path('admin/users/', views.admin_get_all_users, name='admin_get_all_users'),
+    path('admin/users/bulk/', views.admin_bulk_users, name='admin_bulk_users'),
     path('admin/users/<str:user_id>/toggle-verification/', views.admin_toggle_user_verification, name='admin_toggle_user_verification'),
     path('admin/users/<str:user_id>/delete/', views.admin_delete_user, name='admin_delete_user'),
     path('admin/users/<str:user_id>/update/', views.admin_update_user, name='admin_update_user'),
@@ -90,10 +105,11 @@ urlpatterns = [
     
     # Admin Order Management APIs
     path('admin/orders/', views.admin_get_all_orders, name='admin_get_all_orders'),
-    path('admin/orders/status/<str:status>/', views.admin_get_orders_by_status, name='admin_get_orders_by_status'),
+    path('admin/orders/status/<str:order_status>/', views.admin_get_orders_by_status, name='admin_get_orders_by_status'),
     
     # Invoice Management APIs
     path('invoices/create-from-order/<str:order_id>/', views.create_invoice_from_order, name='create_invoice_from_order'),
+    path('invoices/bulk-create-from-orders/', views.bulk_create_invoices_from_orders, name='bulk_create_invoices_from_orders'),
     path('invoices/', views.get_all_invoices, name='get_all_invoices'),
     path('invoices/<str:invoice_id>/', views.get_invoice_details, name='get_invoice_details'),
     path('invoices/<str:invoice_id>/update/', views.update_invoice, name='update_invoice'),
@@ -139,4 +155,8 @@ urlpatterns = [
     
     # Reports & Analytics API
     path('admin/reports/', views.get_reports_analytics, name='get_reports_analytics'),
+
+    # Metrics APIs
+    path('admin/metrics/db-pool/', views.admin_db_pool_stats, name='admin_db_pool_stats'),
+    path('admin/metrics/sql/', views.admin_sql_stats, name='admin_sql_stats'),
 ] 
\ No newline at end of file
@@ -1,63 +1,72 @@
 import os
-import uuid
-from django.conf import settings
+import posixpath
 
+from kipenzi.media_storage import get_storage, upload_pool
 
-def upload_image_to_local(image_file, folder_name):
+VARIANT_FOLDER = 'variants'  # resized copies next to the originals (image_variants.py)
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+
+def store_image(image_file, folder_name):
     """
-    Save image to local media storage (e.g. for PythonAnywhere).
-    Returns URL path (e.g. /media/products/uuid.jpg).
+    Save image to media storage (MEDIA_STORAGE: local or S3) under the
+    SHA-256 of its content (e.g. /media/products/<sha256>.jpg). The upload's
+    chunks are copied to the storage and hashed on the way, and an upload
+    identical to a stored file reuses that file. Returns URL.
     """
-    file_ext = os.path.splitext(image_file.name)[1] or '.jpg'
-    unique_name = f"{uuid.uuid4()}{file_ext}"
-    path = os.path.join(folder_name, unique_name)
-    media_root = getattr(settings, 'MEDIA_ROOT', os.path.join(str(settings.BASE_DIR), 'media'))
-    media_url = getattr(settings, 'MEDIA_URL', '/media/').rstrip('/')
-    full_path = os.path.join(media_root, path)
-    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-    with open(full_path, 'wb') as f:
-        for chunk in image_file.chunks():
-            f.write(chunk)
-    return f"{media_url}/{path}".replace('\\', '/')
+    file_ext = os.path.splitext(image_file.name)[1].lower() or '.jpg'
+    file_ext = EXTENSION_ALIASES.get(file_ext, file_ext)
+    storage = get_storage()
+    name = storage.save_hashed(
+        folder_name, image_file.chunks(), file_ext, getattr(image_file, 'content_type', None)
+    )
+    return storage.url(name)
 
 
-def delete_local_image(image_url):
+def media_name(image_url):
     """
-    Delete an image from local media storage if the URL is a /media/ path.
-    Returns True if the file was found and deleted.
+    Name of an image kept in our media storage (products/<sha256>.jpg for
+    /media/products/<sha256>.jpg), or None for images stored elsewhere.
     """
-    if not image_url or not image_url.startswith('/media/'):
-        return False
-    media_root = getattr(settings, 'MEDIA_ROOT', os.path.join(str(settings.BASE_DIR), 'media'))
-    # path is e.g. /media/products/xxx.jpg -> relative path products/xxx.jpg
-    rel = image_url.split('/media/', 1)[-1].lstrip('/')
-    full_path = os.path.join(media_root, rel)
-    if os.path.isfile(full_path):
-        try:
-            os.remove(full_path)
-            return True
-        except OSError:
-            pass
-    return False
+    if not isinstance(image_url, str) or not image_url:
+        return None
+    return get_storage().name(image_url)
+
 
+def variant_name(name, variant, ext):
+    """Where a resized variant of the image `name` is stored: products/variants/<name>-thumb.webp"""
+    folder, base = posixpath.split(name)
+    return posixpath.join(folder, VARIANT_FOLDER, f"{posixpath.splitext(base)[0]}-{variant}.{ext}")
 
-def handle_image_upload(image_file, folder_name, old_image_url=None):
+
+def handle_image_upload(image_file, folder_name):
     """
-    Save uploaded image to local media storage (for PythonAnywhere / local hosting).
-    Optionally deletes the old image file if it was also stored locally.
+    Save uploaded image to media storage (local media folder or S3 bucket, see MEDIA_STORAGE).
+
+    Files are content-addressed and may be shared by several rows, so a
+    replaced image is not deleted here: `python manage.py gc_media` removes
+    the files nothing references any more.
 
     Args:
         image_file: The uploaded file object
         folder_name: The folder name (e.g. 'products', 'brands', 'banners')
-        old_image_url: The URL of the old image to delete when replacing (optional)
 
     Returns:
-        str: The new image URL (e.g. /media/products/uuid.jpg)
+        str: The new image URL (e.g. /media/products/<sha256>.jpg), or '' without a file
     """
-    if old_image_url:
-        delete_local_image(old_image_url)
-
     if not image_file:
-        return old_image_url or ''
+        return ''
+
+    return store_image(image_file, folder_name)
+
 
-    return upload_image_to_local(image_file, folder_name)
+def handle_image_uploads(image_files, folder_name):
+    """
+    Save several uploaded images at once, concurrently (MEDIA_UPLOAD_WORKERS
+    threads), so a product's photos cost one upload round trip to S3 rather
+    than one each. Returns their URLs in the same order.
+    """
+    image_files = [f for f in image_files if f]
+    if len(image_files) < 2:
+        return [handle_image_upload(f, folder_name) for f in image_files]
+    return list(upload_pool().map(handle_image_upload, image_files, [folder_name] * len(image_files)))
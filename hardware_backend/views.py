@@ -1,23 +1,37 @@
 from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from django.utils import timezone
-from datetime import timedelta, datetime, date
+from datetime import datetime, date
 from decimal import Decimal
 import random
 import string
 import json
 import requests
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Prefetch
 from django.conf import settings
-from .utils import handle_image_upload
+from .utils import handle_image_upload, handle_image_uploads
+from . import autocomplete, bulk_admin, image_variants
+from .catalog_snapshot import current_snapshot, find_snapshot
+from .catalog_sync import changes_since, delete_with_tombstones
+from .fieldsets import Fieldset
+from .invoicing import invoice_for_order, invoice_orders, item_from_order_item, mirror_to_order
+from . import product_codes
+from .product_import import import_products
+from .product_facets import browse
+from kipenzi.conditional import conditional_get
+from kipenzi.file_serving import serve_file
+from kipenzi.db_router import read_from_replica
 
 from .models import (
     BusinessUser, ProductCategory, Brand, ProductType, 
-    Product, ProductBatch, Banner, HardwareOTP, Order, OrderItem,
+    Product, ProductBatch, Banner, HardwareOTP, Order,
     Customer, Shelf, ProductLocation, Sale, SaleItem, Expense,
     Invoice, InvoiceItem
 )
@@ -32,9 +46,34 @@ from .serializers import (
     ProductLocationSerializer, SaleSerializer, SaleItemSerializer,
     CreateSaleSerializer, ProductWithLocationSerializer, ExpenseSerializer,
     InvoiceSerializer, InvoiceItemSerializer, CreateInvoiceFromOrderSerializer,
-    UpdateInvoiceSerializer
+    BulkCreateInvoicesFromOrdersSerializer, UpdateInvoiceSerializer
 )
 
+# Tables whose rows can appear in a product response (for conditional_get ETags)
+PRODUCT_CATALOG = (Product, ProductBatch, ProductCategory, Brand, ProductType)
+
+
+def order_data(order_id):
+    """An order rendered by OrderSerializer, with its user and lines read in a fixed number of queries"""
+    fieldset = Fieldset(OrderSerializer)
+    return fieldset.data(fieldset.optimize(Order.objects.filter(order_id=order_id)).get())
+
+
+def restore_order_stock(order):
+    """Put an order's quantities back on its products' stock with one read and one UPDATE; call in a transaction"""
+    quantities = {}
+    for product_id, quantity in order.order_items.values_list('product_id', 'quantity'):
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    products = list(
+        Product.objects.select_for_update().filter(pk__in=quantities).only('product_id', 'stock_quantity')
+    )
+    now = timezone.now()
+    for product in products:
+        product.stock_quantity += quantities[product.pk]
+        product.updated_at = now  # bulk_update() skips auto_now; ETags and delta sync read it
+    Product.objects.bulk_update(products, ['stock_quantity', 'updated_at'])
+
+
 def generate_otp():
     """Generate a random 4-digit OTP for SMS delivery"""
     # Always generate random 4-digit OTP (1000-9999) for SMS
@@ -666,8 +705,10 @@ def resend_otp(request):
             'message': f'Failed to resend OTP: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(ProductCategory, Brand, Banner)
 def home_page(request):
     """Get home page data - categories, brands, and banners
     
@@ -753,21 +794,25 @@ def home_page_with_user(request):
             'message': f'Failed to fetch home page data: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(*PRODUCT_CATALOG)
 def products_page(request):
     """Get products page data - product types and products"""
     try:
-        # Get all active product types with their products
-        product_types = ProductType.objects.filter(is_active=True).prefetch_related('products')
+        # Get all active product types with their active products (lean unless ?fields=/?expand=)
+        product_fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+        products = product_fieldset.optimize(Product.objects.filter(is_active=True), extra_columns=['product_type'])
+        types_fieldset = Fieldset(ProductTypeWithProductsSerializer, lean=True)
+        product_types = list(types_fieldset.optimize(ProductType.objects.filter(is_active=True)).prefetch_related(
+            Prefetch('products', queryset=products, to_attr='active_products')
+        ))
         
         # Group products by product type
-        product_types_data = []
-        for product_type in product_types:
-            products = product_type.products.filter(is_active=True)
-            product_type_data = ProductTypeWithProductsSerializer(product_type).data
-            product_type_data['products'] = ProductSerializer(products, many=True).data
-            product_types_data.append(product_type_data)
+        product_types_data = types_fieldset.data(product_types, many=True)
+        for product_type, product_type_data in zip(product_types, product_types_data):
+            product_type_data['products'] = product_fieldset.data(product_type.active_products, many=True)
         
         return Response({
             'success': True,
@@ -790,25 +835,27 @@ def products_page_with_user(request):
         category_filter = request.data.get('category_id')
         brand_filter = request.data.get('brand_id')
         
-        # Get all active product types with their products
-        product_types = ProductType.objects.filter(is_active=True).prefetch_related('products')
+        # Get all active product types with their active products (lean unless ?fields=/?expand=)
+        products = Product.objects.filter(is_active=True)
+        product_types = ProductType.objects.filter(is_active=True)
         
         # Apply filters if provided
         if category_filter:
             product_types = product_types.filter(category_id=category_filter)
+        if brand_filter:
+            products = products.filter(brand_id=brand_filter)
+        
+        product_fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+        products = product_fieldset.optimize(products, extra_columns=['product_type'])
+        types_fieldset = Fieldset(ProductTypeWithProductsSerializer, lean=True)
+        product_types = list(types_fieldset.optimize(product_types).prefetch_related(
+            Prefetch('products', queryset=products, to_attr='active_products')
+        ))
         
         # Group products by product type
-        product_types_data = []
-        for product_type in product_types:
-            products = product_type.products.filter(is_active=True)
-            
-            # Apply brand filter if provided
-            if brand_filter:
-                products = products.filter(brand_id=brand_filter)
-            
-            product_type_data = ProductTypeWithProductsSerializer(product_type).data
-            product_type_data['products'] = ProductSerializer(products, many=True).data
-            product_types_data.append(product_type_data)
+        product_types_data = types_fieldset.data(product_types, many=True)
+        for product_type, product_type_data in zip(product_types, product_types_data):
+            product_type_data['products'] = product_fieldset.data(product_type.active_products, many=True)
         
         # Initialize response data
         response_data = {
@@ -840,6 +887,7 @@ def products_page_with_user(request):
             'message': f'Failed to fetch products data: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def products_by_category(request, category_id):
@@ -849,14 +897,14 @@ def products_by_category(request, category_id):
         products = Product.objects.filter(
             category_id=category_id,
             is_active=True
-        ).select_related('category', 'brand', 'product_type')
+        )
         
-        products_serializer = ProductSerializer(products, many=True)
+        products_data = Fieldset.from_request(request, ProductSerializer, lean=True).data(products, many=True)
         
         return Response({
             'success': True,
             'data': {
-                'products': products_serializer.data
+                'products': products_data
             }
         }, status=status.HTTP_200_OK)
     except Exception as e:
@@ -865,6 +913,7 @@ def products_by_category(request, category_id):
             'message': f'Failed to fetch products: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def products_by_brand(request, brand_id):
@@ -874,14 +923,14 @@ def products_by_brand(request, brand_id):
         products = Product.objects.filter(
             brand_id=brand_id,
             is_active=True
-        ).select_related('category', 'brand', 'product_type')
+        )
         
-        products_serializer = ProductSerializer(products, many=True)
+        products_data = Fieldset.from_request(request, ProductSerializer, lean=True).data(products, many=True)
         
         return Response({
             'success': True,
             'data': {
-                'products': products_serializer.data
+                'products': products_data
             }
         }, status=status.HTTP_200_OK)
     except Exception as e:
@@ -890,14 +939,136 @@ def products_by_brand(request, brand_id):
             'message': f'Failed to fetch products: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
+def products_autocomplete(request):
+    """POS product suggestions for the first letters of a product or brand name (see autocomplete.py)"""
+    try:
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = min(int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT)), autocomplete.MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        products = autocomplete.get_index().search(query, limit) if query else []
+        
+        return Response({
+            'success': True,
+            'data': {
+                'products': products,
+                'query': query
+            }
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Autocomplete failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@conditional_get(*PRODUCT_CATALOG)
+def products_browse(request):
+    """Paginated product listing with filters and facet counts (see product_facets.py)"""
+    try:
+        fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+        try:
+            data = browse(request.query_params, fieldset)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': data
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to fetch products: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_by_code(request, code):
+    """Look up the product for a scanned barcode / SKU (see product_codes.py)"""
+    try:
+        fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+        result = product_codes.lookup([code], fieldset).get(product_codes.normalize_code(code))
+        if result is None:
+            return Response({
+                'success': False,
+                'message': 'No product found for this code'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'data': result
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to look up code: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def products_by_codes(request):
+    """Look up several scanned codes at once: ?codes=code1,code2,..."""
+    try:
+        codes = [
+            product_codes.normalize_code(code)
+            for value in request.GET.getlist('codes') for code in value.split(',')
+            if product_codes.normalize_code(code)
+        ]
+        if not codes:
+            return Response({
+                'success': False,
+                'message': 'codes is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes) > product_codes.MAX_LOOKUP_CODES:
+            return Response({
+                'success': False,
+                'message': f'At most {product_codes.MAX_LOOKUP_CODES} codes per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fieldset = Fieldset.from_request(request, ProductSerializer, lean=True)
+        found = product_codes.lookup(codes, fieldset)
+        codes = list(dict.fromkeys(codes))
+        
+        return Response({
+            'success': True,
+            'data': {
+                'results': [found[code] for code in codes if code in found],
+                'not_found': [code for code in codes if code not in found]
+            }
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to look up codes: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@read_from_replica
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@conditional_get(*PRODUCT_CATALOG)
 def product_detail(request, product_id):
     """Get detailed information about a specific product"""
     try:
-        # Get specific product
+        # Get specific product (every field unless ?fields= narrows it)
+        fieldset = Fieldset.from_request(request, ProductSerializer)
         try:
-            product = Product.objects.select_related('category', 'brand', 'product_type').get(
+            product = fieldset.optimize(Product.objects.all()).get(
                 product_id=product_id,
                 is_active=True
             )
@@ -907,7 +1078,7 @@ def product_detail(request, product_id):
                 'message': 'Product not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        product_serializer = ProductSerializer(product)
+        product_serializer = fieldset.serializer(product)
         
         return Response({
             'success': True,
@@ -921,6 +1092,7 @@ def product_detail(request, product_id):
             'message': f'Failed to fetch product details: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def search_products(request):
@@ -942,13 +1114,13 @@ def search_products(request):
             description__icontains=query
         )
         
-        products = products.select_related('category', 'brand', 'product_type').distinct()
-        products_serializer = ProductSerializer(products, many=True)
+        products = products.distinct()
+        products_data = Fieldset.from_request(request, ProductSerializer, lean=True).data(products, many=True)
         
         return Response({
             'success': True,
             'data': {
-                'products': products_serializer.data,
+                'products': products_data,
                 'query': query,
                 'count': products.count()
             }
@@ -959,6 +1131,73 @@ def search_products(request):
             'message': f'Search failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_changes(request):
+    """Catalog delta sync: what changed since ?since=<token>, or everything without one
+    
+    Not routed to the read replica: a row that reached the replica after the
+    token was handed out would never be sent.
+    """
+    try:
+        try:
+            data = changes_since(request.query_params.get('since'))
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'Invalid sync token'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': data
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to fetch catalog changes: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_snapshot(request):
+    """Manifest of the compressed catalog snapshot a new POS till boots from"""
+    try:
+        manifest = current_snapshot()
+        # Relative to this URL, so it keeps whichever prefix the client used
+        manifest['url'] = request.build_absolute_uri(manifest['name'])
+        
+        return Response({
+            'success': True,
+            'data': manifest
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to fetch catalog snapshot: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@require_safe
+def catalog_snapshot_file(request, name):
+    """Download a catalog snapshot: resumable with Range, cacheable forever (content-hashed name)
+    
+    A plain Django view: DRF content negotiation would refuse Accept: application/gzip.
+    """
+    snapshot = find_snapshot(name)
+    if snapshot is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Snapshot not found'
+        }, status=404)
+    
+    path, sha256 = snapshot
+    return serve_file(
+        request, path, 'application/gzip',
+        etag=sha256,
+        cache_control='public, max-age=31536000, immutable',
+        filename=name,
+    )
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def get_business_user_data(request):
@@ -1000,12 +1239,12 @@ def get_business_user_data(request):
 def admin_get_all_products(request):
     """Admin: Get all products (including inactive)"""
     try:
-        products = Product.objects.select_related('category', 'brand', 'product_type').all()
-        products_serializer = ProductSerializer(products, many=True)
+        products = Product.objects.all()
+        products_data = Fieldset.from_request(request, ProductSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': products_serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -1027,20 +1266,9 @@ def admin_create_product(request):
             for key, value in request.POST.items():
                 data[key] = value
         
-        # Handle image upload(s): single 'image' or up to 3 'image_0', 'image_1', 'image_2'
-        image_urls = []
-        for key in ['image', 'image_0', 'image_1', 'image_2']:
-            f = request.FILES.get(key)
-            if f:
-                url = handle_image_upload(f, 'products')
-                if url:
-                    image_urls.append(url)
-                else:
-                    return Response({
-                        'success': False,
-                        'message': f'Failed to upload image ({key})'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-        image_urls = image_urls[:3]
+        # Handle image upload(s), uploaded concurrently: single 'image' or up to 3 'image_0', 'image_1', 'image_2'
+        image_files = [request.FILES.get(key) for key in ['image', 'image_0', 'image_1', 'image_2']]
+        image_urls = handle_image_uploads([f for f in image_files if f][:3], 'products')
         if image_urls:
             data['images'] = image_urls
             data['image'] = image_urls[0]
@@ -1103,6 +1331,7 @@ def admin_create_product(request):
         serializer = ProductSerializer(data=data)
         if serializer.is_valid():
             product = serializer.save()
+            image_variants.schedule(product)
             print(f"🔍 DEBUG: Product created successfully: {product.product_id}")
             
             # Create product location on the specified shelf
@@ -1139,6 +1368,94 @@ def admin_create_product(request):
             'message': f'Failed to create product: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_import_product_codes(request):
+    """Bulk create or reassign barcodes / SKUs: {"codes": [{"code", "product_id", "pack_type"}, ...]}"""
+    try:
+        rows = request.data.get('codes')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return Response({
+                'success': False,
+                'message': 'codes must be a list of {"code", "product_id", "pack_type"} objects'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = product_codes.import_codes(rows)
+        
+        return Response({
+            'success': True,
+            'message': f"{result['created']} codes created, {result['updated']} updated, {len(result['errors'])} rejected",
+            'data': result
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to import codes: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_import_products(request):
+    """Bulk create / update products from an uploaded CSV or XLSX file (multipart "file", optional dry_run)"""
+    try:
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'success': False,
+                'message': 'Upload a CSV or XLSX file as "file"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() == 'true'
+        try:
+            result = import_products(upload, upload.name, dry_run=dry_run)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': (
+                f"{result['created']} products created, {result['updated']} updated, {result['rejected']} rejected"
+                + (f"; {len(result['code_errors'])} barcodes not saved" if result['code_errors'] else '')
+            ),
+            'data': result
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to import products: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def bulk_admin_response(request, target):
+    """Run a bulk admin action from {"ids", "action", "value"} and wrap the result"""
+    try:
+        try:
+            result = bulk_admin.run(target, request.data.get('ids'), request.data.get('action'), request.data.get('value'))
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f"{result['action']}: {result['affected']} of {result['requested']} {target} changed",
+            'data': result
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to update {target}: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_bulk_products(request):
+    """Admin: activate, deactivate, delete, set_price, set_minimum_stock or move_category for many products"""
+    return bulk_admin_response(request, 'products')
+
 @api_view(['PUT'])
 @permission_classes([AllowAny])
 def admin_update_product(request, product_id):
@@ -1164,22 +1481,24 @@ def admin_update_product(request, product_id):
         elif isinstance(data.get('images'), list):
             current_images = list(data['images'])[:3]
         # Build final list: slot i = new file upload at image_i, else keep current_images[i]
+        # (the new files are uploaded concurrently)
+        upload_keys = [key for key in ['image_0', 'image_1', 'image_2', 'image'] if request.FILES.get(key)]
+        uploaded = dict(zip(upload_keys, handle_image_uploads(
+            [request.FILES[key] for key in upload_keys], 'products'
+        )))
         final_images = []
         for i in range(3):
-            f = request.FILES.get(f'image_{i}')
-            if f:
-                url = handle_image_upload(f, 'products')
-                if url:
-                    final_images.append(url)
+            url = uploaded.get(f'image_{i}')
+            if url:
+                final_images.append(url)
             elif i < len(current_images) and current_images[i]:
                 final_images.append(current_images[i])
-        if request.FILES.get('image'):
-            url = handle_image_upload(request.FILES['image'], 'products', product.image)
-            if url:
-                if final_images:
-                    final_images[0] = url
-                else:
-                    final_images = [url]
+        url = uploaded.get('image')
+        if url:
+            if final_images:
+                final_images[0] = url
+            else:
+                final_images = [url]
         data['images'] = final_images
         data['image'] = final_images[0] if final_images else None
         if data.get('image') is None:
@@ -1229,6 +1548,7 @@ def admin_update_product(request, product_id):
         serializer = ProductSerializer(product, data=data, partial=True)
         if serializer.is_valid():
             updated_product = serializer.save()
+            image_variants.schedule(updated_product)
             return Response({
                 'success': True,
                 'message': 'Product updated successfully',
@@ -1260,7 +1580,7 @@ def admin_delete_product(request, product_id):
                 'message': 'Product not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        product.delete()
+        delete_with_tombstones(product)
         return Response({
             'success': True,
             'message': 'Product deleted successfully'
@@ -1343,6 +1663,7 @@ def admin_create_category(request):
         serializer = ProductCategorySerializer(data=data)
         if serializer.is_valid():
             category = serializer.save()
+            image_variants.schedule(category)
             return Response({
                 'success': True,
                 'message': 'Category created successfully',
@@ -1360,6 +1681,12 @@ def admin_create_category(request):
             'message': f'Failed to create category: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_bulk_categories(request):
+    """Admin: activate, deactivate or delete many categories"""
+    return bulk_admin_response(request, 'categories')
+
 @api_view(['PUT'])
 @permission_classes([AllowAny])
 def admin_update_category(request, category_id):
@@ -1382,7 +1709,7 @@ def admin_update_category(request, category_id):
             del data['image']
         
         if image_file:
-            image_url = handle_image_upload(image_file, 'categories', category.image)
+            image_url = handle_image_upload(image_file, 'categories')
             if image_url:
                 data['image'] = image_url
             else:
@@ -1394,6 +1721,7 @@ def admin_update_category(request, category_id):
         serializer = ProductCategorySerializer(category, data=data, partial=True)
         if serializer.is_valid():
             updated_category = serializer.save()
+            image_variants.schedule(updated_category)
             return Response({
                 'success': True,
                 'message': 'Category updated successfully',
@@ -1424,7 +1752,7 @@ def admin_delete_category(request, category_id):
                 'message': 'Category not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        category.delete()
+        delete_with_tombstones(category)
         return Response({
             'success': True,
             'message': 'Category deleted successfully'
@@ -1520,6 +1848,12 @@ def admin_create_brand(request):
             'message': f'Failed to create brand: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_bulk_brands(request):
+    """Admin: activate, deactivate or delete many brands"""
+    return bulk_admin_response(request, 'brands')
+
 @api_view(['PUT'])
 @permission_classes([AllowAny])
 def admin_update_brand(request, brand_id):
@@ -1538,7 +1872,7 @@ def admin_update_brand(request, brand_id):
         data = request.data.copy()
         
         if image_file:
-            image_url = handle_image_upload(image_file, 'brands', brand.logo)
+            image_url = handle_image_upload(image_file, 'brands')
             if image_url:
                 data['logo'] = image_url
             else:
@@ -1580,7 +1914,7 @@ def admin_delete_brand(request, brand_id):
                 'message': 'Brand not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        brand.delete()
+        delete_with_tombstones(brand)
         return Response({
             'success': True,
             'message': 'Brand deleted successfully'
@@ -1621,6 +1955,7 @@ def admin_toggle_brand_status(request, brand_id):
 # Product Type Admin Views
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(ProductType, ProductCategory, public=False)
 def admin_get_all_product_types(request):
     """Admin: Get all product types (including inactive)"""
     try:
@@ -1694,7 +2029,7 @@ def admin_update_product_type(request, product_type_id):
         data = request.data.copy()
         
         if image_file:
-            image_url = handle_image_upload(image_file, 'product_types', product_type.image)
+            image_url = handle_image_upload(image_file, 'product_types')
             if image_url:
                 data['image'] = image_url
             else:
@@ -1736,7 +2071,7 @@ def admin_delete_product_type(request, product_type_id):
                 'message': 'Product type not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        product_type.delete()
+        delete_with_tombstones(product_type)
         return Response({
             'success': True,
             'message': 'Product type deleted successfully'
@@ -1865,7 +2200,7 @@ def admin_delete_shelf(request, shelf_id):
                 'message': 'Shelf not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        shelf.delete()
+        delete_with_tombstones(shelf)
         return Response({
             'success': True,
             'message': 'Shelf deleted successfully'
@@ -1944,6 +2279,7 @@ def admin_create_banner(request):
         serializer = BannerSerializer(data=data)
         if serializer.is_valid():
             banner = serializer.save()
+            image_variants.schedule(banner)
             return Response({
                 'success': True,
                 'message': 'Banner created successfully',
@@ -1979,7 +2315,7 @@ def admin_update_banner(request, banner_id):
         data = request.data.copy()
         
         if image_file:
-            image_url = handle_image_upload(image_file, 'banners', banner.image)
+            image_url = handle_image_upload(image_file, 'banners')
             if image_url:
                 data['image'] = image_url
             else:
@@ -1991,6 +2327,7 @@ def admin_update_banner(request, banner_id):
         serializer = BannerSerializer(banner, data=data, partial=True)
         if serializer.is_valid():
             updated_banner = serializer.save()
+            image_variants.schedule(updated_banner)
             return Response({
                 'success': True,
                 'message': 'Banner updated successfully',
@@ -2021,12 +2358,8 @@ def admin_delete_banner(request, banner_id):
                 'message': 'Banner not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Delete image from S3 if it exists
-        if banner.image:
-            from .utils import delete_image_from_s3
-            delete_image_from_s3(banner.image)
-        
-        banner.delete()
+        # The image file may be shared with other rows; gc_media removes it once unreferenced
+        delete_with_tombstones(banner)
         return Response({
             'success': True,
             'message': 'Banner deleted successfully'
@@ -2082,6 +2415,12 @@ def admin_get_all_users(request):
             'message': f'Failed to fetch users: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def admin_bulk_users(request):
+    """Admin: verify, unverify or delete many business users"""
+    return bulk_admin_response(request, 'users')
+
 @api_view(['PATCH'])
 @permission_classes([AllowAny])
 def admin_toggle_user_verification(request, user_id):
@@ -2425,7 +2764,7 @@ def get_order_details_new_format(request, order_id):
     try:
         # Get order
         try:
-            order = Order.objects.get(order_id=order_id)
+            order = Order.objects.select_related('user').prefetch_related('order_items').get(order_id=order_id)
         except Order.DoesNotExist:
             return Response({
                 'success': False,
@@ -2467,12 +2806,12 @@ def get_user_orders(request, user_id):
             }, status=status.HTTP_403_FORBIDDEN)
 
         # Get user's orders
-        orders = Order.objects.filter(user=user).prefetch_related('order_items__product')
-        orders_serializer = OrderSerializer(orders, many=True)
+        orders = Order.objects.filter(user=user)
+        orders_data = Fieldset.from_request(request, OrderSerializer).data(orders, many=True)
 
         return Response({
             'success': True,
-            'data': orders_serializer.data
+            'data': orders_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2485,16 +2824,17 @@ def get_user_orders(request, user_id):
 def get_order_details(request, order_id):
     """Get detailed information about a specific order"""
     try:
-        # Get order
+        # Get order (every field unless ?fields= narrows it)
+        fieldset = Fieldset.from_request(request, OrderSerializer)
         try:
-            order = Order.objects.select_related('user').prefetch_related('order_items__product').get(order_id=order_id)
+            order = fieldset.optimize(Order.objects.all()).get(order_id=order_id)
         except Order.DoesNotExist:
             return Response({
                 'success': False,
                 'message': 'Order not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        order_serializer = OrderSerializer(order)
+        order_serializer = fieldset.serializer(order)
         
         return Response({
             'success': True,
@@ -2548,7 +2888,7 @@ def update_order_status(request, order_id):
         return Response({
             'success': True,
             'message': f'Order status updated to {new_status}',
-            'data': OrderSerializer(order).data
+            'data': order_data(order.order_id)
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2577,20 +2917,16 @@ def cancel_order(request, order_id):
                 'message': f'Order cannot be cancelled in {order.status} status'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Cancel order
-        order.status = 'cancelled'
-        order.save()
-        
-        # Restore product stock
-        for item in order.order_items.all():
-            product = item.product
-            product.stock_quantity += item.quantity
-            product.save()
+        # Cancel order and restore product stock
+        with transaction.atomic():
+            order.status = 'cancelled'
+            order.save()
+            restore_order_stock(order)
         
         return Response({
             'success': True,
             'message': 'Order cancelled successfully',
-            'data': OrderSerializer(order).data
+            'data': order_data(order.order_id)
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2605,7 +2941,7 @@ def delete_order(request, order_id):
     try:
         # Get order
         try:
-            order = Order.objects.get(order_id=order_id)
+            order = Order.objects.select_related('user').get(order_id=order_id)
         except Order.DoesNotExist:
             return Response({
                 'success': False,
@@ -2630,14 +2966,10 @@ def delete_order(request, order_id):
             'created_at': order.created_at.isoformat() + 'Z'
         }
         
-        # Restore product stock before deletion
-        for item in order.order_items.all():
-            product = item.product
-            product.stock_quantity += item.quantity
-            product.save()
-        
-        # Delete the order (this will also delete order items due to CASCADE)
-        order.delete()
+        # Restore product stock, then delete the order (this will also delete order items due to CASCADE)
+        with transaction.atomic():
+            restore_order_stock(order)
+            order.delete()
         
         return Response({
             'success': True,
@@ -2657,12 +2989,12 @@ def delete_order(request, order_id):
 def admin_get_all_orders(request):
     """Admin: Get all orders"""
     try:
-        orders = Order.objects.select_related('user').prefetch_related('order_items__product').all()
-        orders_serializer = OrderSerializer(orders, many=True)
+        orders = Order.objects.all()
+        orders_data = Fieldset.from_request(request, OrderSerializer).data(orders, many=True)
         
         return Response({
             'success': True,
-            'data': orders_serializer.data
+            'data': orders_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2672,23 +3004,23 @@ def admin_get_all_orders(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def admin_get_orders_by_status(request, status):
+def admin_get_orders_by_status(request, order_status):
     """Admin: Get orders filtered by status"""
     try:
         # Validate status
         valid_statuses = [choice[0] for choice in Order.ORDER_STATUS_CHOICES]
-        if status not in valid_statuses:
+        if order_status not in valid_statuses:
             return Response({
                 'success': False,
                 'message': f'Invalid status. Valid options: {", ".join(valid_statuses)}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        orders = Order.objects.filter(status=status).select_related('user').prefetch_related('order_items__product')
-        orders_serializer = OrderSerializer(orders, many=True)
+        orders = Order.objects.filter(status=order_status)
+        orders_data = Fieldset.from_request(request, OrderSerializer).data(orders, many=True)
         
         return Response({
             'success': True,
-            'data': orders_serializer.data
+            'data': orders_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2820,6 +3152,7 @@ def create_customer(request):
 # Shelf Management APIs
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(Shelf)
 def get_shelves(request):
     """Get all shelves"""
     try:
@@ -2870,12 +3203,12 @@ def create_shelf(request):
 def get_products_with_locations(request):
     """Get all products with their locations"""
     try:
-        products = Product.objects.filter(is_active=True).prefetch_related('locations__shelf')
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products = Product.objects.filter(is_active=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2890,12 +3223,12 @@ def get_products_with_locations(request):
 def get_sales(request):
     """Get all sales"""
     try:
-        sales = Sale.objects.all().prefetch_related('items__product').order_by('-sale_date')
-        serializer = SaleSerializer(sales, many=True)
+        sales = Sale.objects.all().order_by('-sale_date')
+        sales_data = Fieldset.from_request(request, SaleSerializer).data(sales, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': sales_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -2936,12 +3269,12 @@ def create_sale(request):
 def get_sales_by_salesperson(request, salesperson_id):
     """Get sales by specific salesperson"""
     try:
-        sales = Sale.objects.filter(salesperson_id=salesperson_id).prefetch_related('items__product').order_by('-sale_date')
-        serializer = SaleSerializer(sales, many=True)
+        sales = Sale.objects.filter(salesperson_id=salesperson_id).order_by('-sale_date')
+        sales_data = Fieldset.from_request(request, SaleSerializer).data(sales, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': sales_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3003,11 +3336,11 @@ def get_low_stock_products(request):
             stock_quantity__lte=models.F('minimum_stock')
         ).order_by('stock_quantity')
         
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3032,11 +3365,11 @@ def get_expiring_products(request):
             expiry_date__gte=datetime.now().date()
         ).order_by('expiry_date')
         
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3168,6 +3501,7 @@ def create_customer(request):
 # Shelf Management APIs
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(Shelf)
 def get_shelves(request):
     """Get all shelves"""
     try:
@@ -3218,12 +3552,12 @@ def create_shelf(request):
 def get_products_with_locations(request):
     """Get all products with their locations"""
     try:
-        products = Product.objects.filter(is_active=True).prefetch_related('locations__shelf')
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products = Product.objects.filter(is_active=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3238,12 +3572,12 @@ def get_products_with_locations(request):
 def get_sales(request):
     """Get all sales"""
     try:
-        sales = Sale.objects.all().prefetch_related('items__product').order_by('-sale_date')
-        serializer = SaleSerializer(sales, many=True)
+        sales = Sale.objects.all().order_by('-sale_date')
+        sales_data = Fieldset.from_request(request, SaleSerializer).data(sales, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': sales_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3284,12 +3618,12 @@ def create_sale(request):
 def get_sales_by_salesperson(request, salesperson_id):
     """Get sales by specific salesperson"""
     try:
-        sales = Sale.objects.filter(salesperson_id=salesperson_id).prefetch_related('items__product').order_by('-sale_date')
-        serializer = SaleSerializer(sales, many=True)
+        sales = Sale.objects.filter(salesperson_id=salesperson_id).order_by('-sale_date')
+        sales_data = Fieldset.from_request(request, SaleSerializer).data(sales, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': sales_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3351,11 +3685,11 @@ def get_low_stock_products(request):
             stock_quantity__lte=models.F('minimum_stock')
         ).order_by('stock_quantity')
         
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3380,11 +3714,11 @@ def get_expiring_products(request):
             expiry_date__gte=datetime.now().date()
         ).order_by('expiry_date')
         
-        serializer = ProductWithLocationSerializer(products, many=True)
+        products_data = Fieldset(ProductWithLocationSerializer).data(products, many=True)
         
         return Response({
             'success': True,
-            'data': serializer.data
+            'data': products_data
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -3527,7 +3861,7 @@ def delete_product_batch(request, batch_id):
             product.stock_quantity = 0
         product.save()
         
-        batch.delete()
+        delete_with_tombstones(batch)
         
         return Response({
             'success': True,
@@ -3692,6 +4026,7 @@ def admin_update_expense_status(request, expense_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Financial Overview API
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_financial_overview(request):
@@ -3782,7 +4117,7 @@ def get_financial_overview(request):
         unpaid_orders = Order.objects.filter(
             models.Q(payment_status__in=['pending', 'unpaid', 'partial']) |
             models.Q(payment_status='pay_on_delivery', status__in=['confirmed', 'processing', 'shipped', 'delivered'])
-        ).exclude(status='cancelled')
+        ).exclude(status='cancelled').select_related('user')
         
         for order in unpaid_orders:
             # Calculate amount owed
@@ -3832,6 +4167,7 @@ def get_financial_overview(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Reports & Analytics API
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_reports_analytics(request):
@@ -3863,7 +4199,9 @@ def get_reports_analytics(request):
         sales_query = Sale.objects.filter(
             sale_date__date__gte=start_date,
             sale_date__date__lte=end_date
-        ).select_related('customer', 'salesperson').prefetch_related('items__product')
+        ).select_related('customer', 'salesperson').prefetch_related(
+            Prefetch('items', queryset=SaleItem.objects.select_related('product__category'))
+        )
         
         sales_data = []
         for sale in sales_query:
@@ -3967,7 +4305,7 @@ def create_invoice_from_order(request, order_id):
     try:
         # Get order
         try:
-            order = Order.objects.select_related('user').prefetch_related('order_items__product').get(order_id=order_id)
+            order = Order.objects.select_related('user').prefetch_related('order_items').get(order_id=order_id)
         except Order.DoesNotExist:
             return Response({
                 'success': False,
@@ -3991,51 +4329,24 @@ def create_invoice_from_order(request, order_id):
                 'errors': serializer.errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get invoice date (default to today)
-        invoice_date = serializer.validated_data.get('invoice_date', date.today())
-        due_date = serializer.validated_data.get('due_date')
-        
-        # Calculate due date if not provided (default to 30 days from invoice date)
-        if not due_date:
-            due_date = invoice_date + timedelta(days=30)
-        
-        # Create invoice
-        invoice = Invoice.objects.create(
-            order=order,
-            invoice_date=invoice_date,
-            due_date=due_date,
-            customer_name=order.user.business_name,
-            customer_phone=order.user.phone_number,
-            customer_address=order.delivery_address,
-            customer_tin=order.user.tin_number,
-            subtotal=order.subtotal,
-            tax_amount=order.tax_amount,
-            shipping_amount=order.shipping_amount,
-            total_amount=order.total_amount,
-            payment_method=order.payment_method,
-            payment_status=order.payment_status,
+        # Create invoice (due in 30 days unless given), with its totals summed from the order lines it copies
+        order_items = list(order.order_items.all())
+        invoice = invoice_for_order(
+            order, order_items,
+            invoice_date=serializer.validated_data.get('invoice_date', date.today()),
+            due_date=serializer.validated_data.get('due_date'),
             notes=serializer.validated_data.get('notes', ''),
             terms_and_conditions=serializer.validated_data.get('terms_and_conditions', ''),
-            status='draft'
         )
         
-        # Generate invoice number
-        invoice.generate_invoice_number()
-        
-        # Create invoice items from order items
-        for order_item in order.order_items.all():
-            InvoiceItem.objects.create(
-                invoice=invoice,
-                product=order_item.product,
-                product_name=order_item.product_name,
-                product_description=order_item.product_description,
-                product_image=order_item.product_image,
-                category=order_item.category,
-                quantity=order_item.quantity,
-                unit_price=order_item.unit_price,
-                total_price=order_item.total_price,
-                pack_type=order_item.pack_type
-            )
+        with transaction.atomic():
+            invoice.save(force_insert=True)
+            
+            # Generate invoice number
+            invoice.generate_invoice_number()
+            
+            # Create invoice items from order items, in one query
+            InvoiceItem.objects.bulk_create([item_from_order_item(invoice, order_item) for order_item in order_items])
         
         # Serialize and return
         invoice_serializer = InvoiceSerializer(invoice)
@@ -4053,6 +4364,39 @@ def create_invoice_from_order(request, order_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def bulk_create_invoices_from_orders(request):
+    """Create draft invoices for many orders: {"order_ids": [...]} or an order_status / date_from / date_to filter"""
+    try:
+        serializer = BulkCreateInvoicesFromOrdersSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Validation error',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Orders, lines and invoice numbers are read in a few queries; invoices and items written in bulk
+        result = invoice_orders(**serializer.validated_data)
+        
+        return Response({
+            'success': True,
+            'message': (
+                f"{result['created']} invoices created; {result['skipped']} orders skipped, "
+                f"{result['not_found']} not found"
+            ),
+            'data': result
+        }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to create invoices: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@read_from_replica
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_all_invoices(request):
@@ -4121,72 +4465,14 @@ def update_invoice(request, invoice_id):
         # Update invoice
         serializer = UpdateInvoiceSerializer(invoice, data=request.data, partial=True)
         if serializer.is_valid():
-            updated_invoice = serializer.save()
-            
-            # Recalculate totals
-            updated_invoice.calculate_totals()
-            
-            # Update the related order if it exists
-            if updated_invoice.order:
-                order = updated_invoice.order
-                
-                # Update order delivery information from invoice customer info
-                order.delivery_address = updated_invoice.customer_address
-                order.delivery_phone = updated_invoice.customer_phone
-                
-                # Update order payment information
-                if updated_invoice.payment_method:
-                    order.payment_method = updated_invoice.payment_method
-                if updated_invoice.payment_status:
-                    order.payment_status = updated_invoice.payment_status
+            # The invoice and its order change together or not at all
+            with transaction.atomic():
+                # (the serializer writes only the changed items and sets the totals)
+                updated_invoice = serializer.save()
                 
-                # Update order items to match invoice items
-                # First, delete existing order items
-                order.order_items.all().delete()
-                
-                # Create new order items from invoice items
-                for invoice_item in updated_invoice.invoice_items.all():
-                    # Get the product if it exists
-                    product = invoice_item.product
-                    
-                    # OrderItem requires a product, so if invoice item doesn't have one,
-                    # we need to find a product by name or create a dummy one
-                    # For now, we'll try to find by name, or use the first product as fallback
-                    if not product and invoice_item.product_name:
-                        try:
-                            # Try to find product by name
-                            product = Product.objects.filter(name__icontains=invoice_item.product_name).first()
-                        except:
-                            pass
-                    
-                    # If still no product, we can't create OrderItem without it
-                    # So we'll skip items without products or use a default
-                    if not product:
-                        # Skip items without products - they can't be added to orders
-                        continue
-                    
-                    # Create order item
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        product_name=invoice_item.product_name,
-                        product_description=invoice_item.product_description or '',
-                        product_image=invoice_item.product_image or '',
-                        category=invoice_item.category or '',
-                        quantity=invoice_item.quantity,
-                        unit_price=invoice_item.unit_price,
-                        total_price=invoice_item.total_price,
-                        pack_type=invoice_item.pack_type
-                    )
-                
-                # Update order totals to match invoice totals
-                order.subtotal = updated_invoice.subtotal
-                order.tax_amount = updated_invoice.tax_amount
-                order.shipping_amount = updated_invoice.shipping_amount
-                order.total_amount = updated_invoice.total_amount
-                
-                # Save the order
-                order.save()
+                # Update the related order (details, lines and totals) if it exists
+                if updated_invoice.order:
+                    mirror_to_order(updated_invoice, list(updated_invoice.invoice_items.all()))
             
             invoice_serializer = InvoiceSerializer(updated_invoice)
             
@@ -4249,3 +4535,55 @@ def delete_invoice(request, invoice_id):
             'success': False,
             'message': f'Failed to delete invoice: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Metrics APIs
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_db_pool_stats(request):
+    """Admin: Connection pool gauges (checked out, idle, wait time) for this worker process"""
+    try:
+        from kipenzi.db_backends.pool import pool_stats
+
+        return Response({
+            'success': True,
+            'data': {
+                'pool_enabled': getattr(settings, 'DB_POOL_ENABLED', False),
+                'pools': pool_stats()
+            }
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to fetch pool stats: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def admin_sql_stats(request):
+    """Admin: Per-view query count and DB time histograms for this worker process (DELETE resets them)"""
+    try:
+        from kipenzi.sql_instrumentation import reset_sql_stats, sql_stats
+
+        if request.method == 'DELETE':
+            reset_sql_stats()
+            return Response({
+                'success': True,
+                'message': 'SQL stats reset successfully'
+            }, status=status.HTTP_200_OK)
+
+        return Response({
+            'success': True,
+            'data': {
+                'enabled': getattr(settings, 'SQL_INSTRUMENTATION_ENABLED', True),
+                'sample_rate': getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0),
+                'n_plus_one_threshold': getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 10),
+                'views': sql_stats()
+            }
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'message': f'Failed to fetch SQL stats: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
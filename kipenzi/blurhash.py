@@ -0,0 +1,143 @@
+"""
+BlurHash placeholders (https://blurha.sh) for uploaded images.
+
+A BlurHash is a ~30 character string that clients decode into a blurred
+preview of the image, shown while the real image downloads:
+
+    placeholder(image)         the BlurHash of a Pillow image (any size)
+    placeholder_for(name)      the BlurHash of an image in the media storage
+    placeholder_for_url(url)   the same for an image URL; None if it is stored elsewhere
+
+The image is first reduced to at most SAMPLE_SIZE px (a JPEG is decoded at
+1/8 scale with draft mode, so a 12 MP photo costs a few milliseconds to
+read). The encoding itself is pure Python and holds the GIL, so it runs in
+a process pool of BLURHASH_WORKERS processes. The pool is bounded, and
+BLURHASH_WORKERS = 0 encodes in the calling thread. encode() is the
+algorithm and needs no Django, so pool workers import nothing else.
+"""
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+SAMPLE_SIZE = 32  # px, longest edge: enough for 4x3 components
+CHARACTERS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+SRGB_TO_LINEAR = [
+    (v / 255) / 12.92 if v / 255 <= 0.04045 else ((v / 255 + 0.055) / 1.055) ** 2.4 for v in range(256)
+]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def base83(value, length):
+    return ''.join(CHARACTERS[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(width, height, rgb, x_components=4, y_components=3):
+    """BlurHash of `rgb`, width * height pixels of packed 8-bit RGB"""
+    if not (1 <= x_components <= 9 and 1 <= y_components <= 9):
+        raise ValueError('BlurHash components must be between 1 and 9')
+    red = [SRGB_TO_LINEAR[v] for v in rgb[0::3]]
+    green = [SRGB_TO_LINEAR[v] for v in rgb[1::3]]
+    blue = [SRGB_TO_LINEAR[v] for v in rgb[2::3]]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row, cy = y * width, cos_y[j][y]
+                for x in range(width):
+                    basis = cos_x[i][x] * cy
+                    r += basis * red[row + x]
+                    g += basis * green[row + x]
+                    b += basis * blue[row + x]
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        quantised = max(0, min(82, int(max(abs(v) for factor in ac for v in factor) * 166 - 0.5)))
+        maximum = (quantised + 1) / 166
+        result += base83(quantised, 1)
+    else:
+        maximum = 1.0
+        result += base83(0, 1)
+    result += base83((linear_to_srgb(dc[0]) << 16) + (linear_to_srgb(dc[1]) << 8) + linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, int(math.floor(sign_pow(v / maximum, 0.5) * 9 + 9.5)))) for v in factor)
+        result += base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def pool():
+    """The process pool for encoding, or None to encode in the calling thread"""
+    global _pool
+    workers = getattr(settings, 'BLURHASH_WORKERS', 1)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the web process has threads (and DB connections) a fork would copy
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def placeholder(image):
+    """The BlurHash of a Pillow image; 4x3 components, 3x4 for a portrait image"""
+    from PIL import Image
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    sample = image.convert('RGB')
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR)
+    components = (3, 4) if sample.height > sample.width else (4, 3)
+    args = (sample.width, sample.height, sample.tobytes(), *components)
+    executor = pool()
+    return encode(*args) if executor is None else executor.submit(encode, *args).result()
+
+
+def placeholder_for(name, storage=None):
+    """The BlurHash of the image `name` in the media storage"""
+    from PIL import Image, ImageOps
+
+    from .media_storage import get_storage
+
+    with (storage or get_storage()).open(name) as f, Image.open(f) as image:
+        image.draft('RGB', (SAMPLE_SIZE * 4, SAMPLE_SIZE * 4))  # no-op for formats other than JPEG
+        return placeholder(ImageOps.exif_transpose(image))
+
+
+def placeholder_for_url(url):
+    """The BlurHash of an image URL in our media storage; None for other URLs or unreadable images"""
+    from PIL import Image
+
+    from .media_storage import get_storage
+
+    storage = get_storage()
+    name = storage.name(url) if isinstance(url, str) and url else None
+    if not name:
+        return None
+    try:
+        return placeholder_for(name, storage)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
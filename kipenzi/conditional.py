@@ -0,0 +1,83 @@
+"""
+Conditional GET (ETag / If-None-Match) for read-mostly catalog endpoints.
+
+    @read_from_replica
+    @api_view(['GET'])
+    @permission_classes([AllowAny])
+    @conditional_get(ProductCategory, Brand, Banner)
+    def home_page(request):
+        ...
+
+The ETag hashes a version stamp of the listed models (MAX(updated_at) and
+COUNT(*) of each table, read in one query on the database the view reads
+from) with the request path and query string and the negotiated media type.
+When If-None-Match matches, the view is not called at all: an unchanged
+catalog costs one aggregate query, no serialization and an empty 304.
+
+Every save() bumps updated_at (auto_now) and every insert or delete changes a
+count, so the stamp moves whenever the data does. Code that changes these
+tables with QuerySet.update() or bulk_update() must set updated_at itself.
+
+Public responses get Cache-Control: public, max-age=CATALOG_CACHE_MAX_AGE;
+the rest get private, no-cache (always revalidate, 304 when unchanged).
+Bump ETAG_RELEASE on deploys that change a response's shape.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def version_stamp(models):
+    """MAX(updated_at) and COUNT(*) for each model's table, in one query"""
+    connection = connections[router.db_for_read(models[0])]
+    quote = connection.ops.quote_name
+    columns = []
+    for model in models:
+        table = quote(model._meta.db_table)
+        updated_at = quote(model._meta.get_field('updated_at').column)
+        columns.append(f'(SELECT MAX({updated_at}) FROM {table})')
+        columns.append(f'(SELECT COUNT(*) FROM {table})')
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {", ".join(columns)}')
+        return cursor.fetchone()
+
+
+def make_etag(request, models):
+    accepted = getattr(request, 'accepted_media_type', '') or ''
+    parts = [
+        getattr(settings, 'ETAG_RELEASE', ''),
+        request.get_full_path(),
+        accepted,
+        *(model._meta.label for model in models),
+        *(str(value) for value in version_stamp(models)),
+    ]
+    return quote_etag(hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32])
+
+
+def conditional_get(*models, public=True):
+    """Answer GET/HEAD with 304 Not Modified while `models` are unchanged"""
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not getattr(settings, 'CONDITIONAL_GET_ENABLED', True):
+                return view_func(request, *args, **kwargs)
+
+            etag = make_etag(request, models)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers['ETag'] = etag
+            if public:
+                patch_cache_control(response, public=True, max_age=getattr(settings, 'CATALOG_CACHE_MAX_AGE', 60))
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
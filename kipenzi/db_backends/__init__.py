@@ -0,0 +1,30 @@
+"""
+Pooled variants of the MySQL and PostgreSQL database backends.
+
+Enable with DB_POOL_ENABLED=True (see kipenzi/settings.py); the pool itself lives
+in kipenzi.db_backends.pool and its gauges are served by the db-pool metrics view.
+"""
+
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'kipenzi.db_backends.mysql',
+    'django.db.backends.postgresql': 'kipenzi.db_backends.postgresql',
+}
+
+
+def enable_pooling(database, size=5, max_overflow=5, timeout=10, recycle=1800, pre_ping=True):
+    """Switch a DATABASES entry to its pooled engine (no-op for unsupported engines)"""
+    engine = POOLED_ENGINES.get(database.get('ENGINE'))
+    if not engine:
+        return database
+    database['ENGINE'] = engine
+    # Django closes the connection at the end of every request; with pooling that
+    # close hands the connection back to the pool instead of dropping it.
+    database['CONN_MAX_AGE'] = 0
+    database['POOL'] = {
+        'SIZE': size,
+        'MAX_OVERFLOW': max_overflow,
+        'TIMEOUT': timeout,
+        'RECYCLE': recycle,
+        'PRE_PING': pre_ping,
+    }
+    return database
@@ -0,0 +1,33 @@
+from .pool import get_pool
+
+
+class PooledDatabaseWrapperMixin:
+    """Route DatabaseWrapper connect/close through the process-wide pool"""
+
+    @staticmethod
+    def ping_connection(connection):
+        """Raise if the raw driver connection is no longer usable: a SELECT 1 round trip, for any DB-API driver"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @property
+    def pool(self):
+        return get_pool(self.settings_dict, self.alias, self.ping_connection)
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps a reference to connections closed inside atomic();
+                # it must never be handed to another thread.
+                self.pool.discard(self.connection)
+            else:
+                self.pool.release(self.connection)
@@ -0,0 +1,12 @@
+"""MySQL (PyMySQL) backend with connection pooling"""
+from django.db.backends.mysql import base as mysql_base
+
+from ..mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, mysql_base.DatabaseWrapper):
+
+    @staticmethod
+    def ping_connection(connection):
+        # COM_PING round trip; never let the driver silently reconnect
+        connection.ping(reconnect=False)
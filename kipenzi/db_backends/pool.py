@@ -0,0 +1,244 @@
+"""
+Process-wide DB-API connection pool used by the pooled database backends.
+
+Each gunicorn worker keeps one pool per database. Django's per-thread
+DatabaseWrapper checks a raw driver connection out of the pool when it
+connects and hands it back when Django closes it (end of request), so the
+worker pays the TCP/TLS/auth handshake only when the pool has to grow.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(OperationalError):
+    """
+    Raised when no connection frees up within the pool's wait timeout. An
+    OperationalError like a refused connection, so code handling an
+    unreachable database (db_router's replica fallback) handles it too.
+    """
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of raw DB-API connections.
+
+    size          connections kept open while idle
+    max_overflow  extra connections allowed under load; closed when returned
+    timeout       seconds a caller waits for a free connection before PoolTimeout
+    recycle       seconds after which a connection is replaced (0 = never)
+    pre_ping      health-check idle connections before handing them out
+    """
+
+    def __init__(self, name, ping, size=5, max_overflow=5, timeout=10.0, recycle=1800, pre_ping=True):
+        self.name = name
+        self._ping = ping
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, created_at)
+        self._created_at = {}  # id(connection) -> created_at for checked-out connections
+        self._open = 0
+        self._checked_out = 0
+
+        # Counters behind the gauges returned by stats()
+        self._connects = 0
+        self._ping_failures = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+
+    def acquire(self, connect):
+        """Check out a connection, calling connect() if a new one is needed"""
+        started = time.monotonic()
+        waited = False
+        connection = created_at = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, created_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    # Reserve the slot now; the connect happens outside the lock
+                    self._open += 1
+                    break
+                waited = True
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(started)
+                    raise PoolTimeout(
+                        f'Database pool "{self.name}" exhausted: {self._open} connections in use, '
+                        f'waited {self.timeout}s'
+                    )
+                self._cond.wait(remaining)
+            self._checked_out += 1
+            if waited:
+                self._record_wait(started)
+
+        if connection is not None and not self._is_reusable(connection, created_at):
+            self._close_quietly(connection)
+            connection = None
+
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._checked_out -= 1
+                    self._cond.notify()
+                raise
+            created_at = time.monotonic()
+            with self._cond:
+                self._connects += 1
+
+        with self._cond:
+            self._created_at[id(connection)] = created_at
+        return connection
+
+    def release(self, connection):
+        """Return a connection; broken, expired and overflow connections are closed"""
+        with self._cond:
+            created_at = self._created_at.pop(id(connection), None)
+
+        healthy = created_at is not None and not self._expired(created_at)
+        if healthy:
+            try:
+                # Never hand the next request a half-finished transaction
+                connection.rollback()
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            self._checked_out -= 1
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((connection, created_at))
+                connection = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    def discard(self, connection):
+        """Close a checked-out connection instead of returning it to the pool"""
+        with self._cond:
+            self._created_at.pop(id(connection), None)
+            self._checked_out -= 1
+            self._open -= 1
+            self._cond.notify()
+        self._close_quietly(connection)
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        """Snapshot of the pool gauges and counters"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'checked_out': self._checked_out,
+                'idle': len(self._idle),
+                'overflow': max(0, self._open - self.size),
+                'connects': self._connects,
+                'ping_failures': self._ping_failures,
+                'timeouts': self._timeouts,
+                'waits': self._waits,
+                'wait_ms_total': round(self._wait_total * 1000, 3),
+                'wait_ms_max': round(self._wait_max * 1000, 3),
+                'wait_ms_last': round(self._last_wait * 1000, 3),
+            }
+
+    def _record_wait(self, started):
+        # Caller holds self._cond
+        elapsed = time.monotonic() - started
+        self._waits += 1
+        self._wait_total += elapsed
+        self._wait_max = max(self._wait_max, elapsed)
+        self._last_wait = elapsed
+
+    def _expired(self, created_at):
+        return bool(self.recycle) and time.monotonic() - created_at > self.recycle
+
+    def _is_reusable(self, connection, created_at):
+        if self._expired(created_at):
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            self._ping(connection)
+            return True
+        except Exception as e:
+            logger.info('Discarding dead pooled connection for "%s": %s', self.name, e)
+            with self._cond:
+                self._ping_failures += 1
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(settings_dict, alias, ping):
+    """Return the pool for a DATABASES entry, creating it on first use.
+
+    Pools are keyed by the connection target rather than the alias alone so that
+    the test runner's renamed test database never receives production connections.
+    """
+    key = (alias, settings_dict.get('HOST'), settings_dict.get('PORT'), settings_dict.get('NAME'), settings_dict.get('USER'))
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL') or {}
+            pool = ConnectionPool(
+                name=alias,
+                ping=ping,
+                size=int(options.get('SIZE', 5)),
+                max_overflow=int(options.get('MAX_OVERFLOW', 5)),
+                timeout=float(options.get('TIMEOUT', 10)),
+                recycle=int(options.get('RECYCLE', 1800)),
+                pre_ping=bool(options.get('PRE_PING', True)),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats():
+    """Gauges for every pool in this process, keyed by database alias"""
+    stats = {}
+    for (alias, host, port, name, user), pool in list(_pools.items()):
+        entry = pool.stats()
+        entry['database'] = name
+        stats[alias if alias not in stats else f'{alias}:{name}'] = entry
+    return stats
@@ -0,0 +1,25 @@
+"""PostgreSQL (psycopg2 / Supabase) backend with connection pooling"""
+from django.db.backends.postgresql import base as postgresql_base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from ..mixins import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, postgresql_base.DatabaseWrapper):
+
+    @staticmethod
+    def ping_connection(connection):
+        if connection.closed:
+            raise postgresql_base.Database.InterfaceError('connection already closed')
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # A reused connection skips the driver setup that records the isolation
+        # level on the wrapper, so set it here for every checkout.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel(isolation_level) if isolation_level is not None else IsolationLevel.READ_COMMITTED
+        return connection
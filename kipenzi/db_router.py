@@ -0,0 +1,125 @@
+"""
+Read-replica routing for heavy read-only endpoints.
+
+Views decorated with @read_from_replica send their ORM reads to the
+REPLICA_DATABASE_ALIAS database. Everything else stays on the primary:
+all writes, reads inside a transaction, reads made after a write in the same
+request, and reads from a client that wrote within the last
+REPLICA_STICKY_SECONDS (tracked with a cookie by ReplicaPinningMiddleware).
+If the replica cannot be reached, reads fall back to the primary and the
+replica is retried after REPLICA_RETRY_SECONDS.
+"""
+import functools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_primary_pin'
+
+_state = threading.local()
+_replica_down_until = {}
+
+
+def replica_alias():
+    """The configured replica alias, or None when no replica is set up"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in connections.databases else None
+
+
+def replica_available(alias):
+    """Cheap health check; a failed replica is skipped for REPLICA_RETRY_SECONDS"""
+    if time.monotonic() < _replica_down_until.get(alias, 0):
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as e:
+        _replica_down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        logger.warning('Replica "%s" unavailable, reading from primary: %s', alias, e)
+        return False
+    return True
+
+
+def is_pinned_to_primary():
+    """True after a write in this request or a recent write by this client"""
+    return getattr(_state, 'pinned', False) or getattr(_state, 'wrote', False)
+
+
+def read_from_replica(view_func):
+    """Send the ORM reads of a GET view to the read replica"""
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if (
+            alias is None
+            or request.method not in ('GET', 'HEAD')
+            or is_pinned_to_primary()
+            or not replica_available(alias)
+        ):
+            return view_func(request, *args, **kwargs)
+
+        previous = getattr(_state, 'read_alias', None)
+        _state.read_alias = alias
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _state.read_alias = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    """Database router used together with read_from_replica"""
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_state, 'read_alias', None)
+        if alias is None or is_pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Reads for the rest of this request (and the pin window) see our own write
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so relations across them are fine
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """Pin a client to the primary for a few seconds after it writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        _state.read_alias = None
+        _state.pinned = self._has_live_pin(request)
+
+        response = self.get_response(request)
+
+        if getattr(_state, 'wrote', False):
+            sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + sticky_seconds),
+                max_age=sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        _state.wrote = False
+        _state.pinned = False
+        return response
+
+    @staticmethod
+    def _has_live_pin(request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,114 @@
+"""
+Serving large files from disk with HTTP range requests.
+
+serve_file() answers GET/HEAD for a file with:
+- ETag / If-None-Match and Last-Modified / If-Modified-Since (304),
+- a single byte range (bytes=0-99, bytes=100-, bytes=-100) as 206 Partial
+  Content, so interrupted downloads resume where they stopped,
+- If-Range, so a resumed download never mixes two versions of the file,
+- 416 with Content-Range: bytes */size for a range past the end.
+Multi-range requests get the whole file, which RFC 9110 allows.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single byte range, or None to send the whole file"""
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # malformed or multi-range: ignore the header
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+    if size == 0:
+        raise RangeNotSatisfiable(header)
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, mtime):
+    """True unless If-Range names a different version of the file"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return etag is not None and if_range == etag  # strong comparison only
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, content_type, size, etag, mtime):
+    """200 with the whole file, 206 with the requested range, or 416"""
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and request.method == 'GET' and if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve_file(request, path, content_type, etag=None, cache_control=None, filename=None):
+    """
+    Response for the file at `path`. etag should identify the file's content
+    (e.g. its hash); cache_control is a Cache-Control header value.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = quote_etag(etag) if etag else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = file_response(request, path, content_type, size, etag, stat.st_mtime)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if etag:
+        response['ETag'] = etag
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    if filename and response.status_code in (200, 206):
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,86 @@
+"""
+Fast JSON renderer and parser for DRF.
+
+FastJSONRenderer and FastJSONParser are drop-in replacements for DRF's
+JSONRenderer and JSONParser that use orjson when it is installed. Output
+matches the stock renderer: Decimal as a number, UUID as a string, aware UTC
+datetimes ending in "Z", and anything orjson does not know natively (lazy
+strings, QuerySets, timedeltas) goes through DRF's own encoder. Without
+orjson, for indents other than 2, for non-compact/ASCII-only settings, or
+when orjson rejects a value (integers above 64 bits) the stdlib path is used.
+Decimals too small or large for plain notation (below 1e-4, from 1e16 up)
+also take the stdlib path. Two differences remain for native floats: orjson
+writes those sizes its own way (1e20 for 1e+20, 0.000025 for 2.5e-05, the
+same number), and NaN/inf render as null instead of NaN.
+"""
+import io
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib path is used instead
+    orjson = None
+
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types orjson does not handle natively are converted the way DRF does"""
+    ret = _encoder.default(obj)
+    if isinstance(ret, float) and ret and not 1e-4 <= abs(ret) < 1e16:
+        # orjson would not write this Decimal the way json.dumps does;
+        # the JSONEncodeError sends the response through the stdlib
+        raise TypeError(f'{obj!r} is rendered by json.dumps')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that serializes with orjson, falling back to json.dumps"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent == 2 else 0)
+        try:
+            ret = orjson.dumps(data, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same JavaScript-safety escaping as JSONRenderer (U+2028, U+2029)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that parses with orjson, falling back to json.load"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Re-parse with the stdlib so clients get the usual error message
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
@@ -0,0 +1,132 @@
+"""
+Serving uploaded media (MEDIA_STORAGE=local) at MEDIA_URL.
+
+Uploads are content-addressed (products/<sha256>.jpg and its variants
+products/variants/<sha256>-thumb.webp), so a URL always names the same
+bytes: those files are sent with
+
+    Cache-Control: public, max-age=31536000, immutable
+
+and the hash as their ETag, and browsers, the POS and any CDN never ask for
+them again. Other files (uploaded before content addressing) get
+MEDIA_CACHE_SECONDS and an ETag made of their size and mtime.
+
+MEDIA_OFFLOAD hands the body to the web server, so no worker is held while
+an image goes out:
+
+    ''                  send it from Django: FileResponse, which gunicorn
+                        and mod_wsgi send with sendfile(); Range / If-Range
+                        and conditional requests via file_serving.serve_file
+    'x-sendfile'        Apache mod_xsendfile (see kipenzi-apache.conf)
+    'x-accel-redirect'  nginx: an internal location at MEDIA_ACCEL_PREFIX
+                        aliased to MEDIA_ROOT
+
+Compressible files (SVG, JSON, text) are sent from a precompressed .br or
+.gz next to them when the client accepts it, as WhiteNoise does for static
+files. Images are already compressed, so they are not looked up.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .file_serving import serve_file
+from .media_storage import UPLOAD_SUFFIX
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{64}(-[a-z]+)?\.[a-z0-9]+$')
+COMPRESSIBLE_TYPES = ('image/svg+xml', 'application/json', 'application/javascript', 'text/')
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # preferred first
+ACCEPT_ENCODING_RE = re.compile(r'(?:^|,)\s*([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+def accepted_encodings(request):
+    """The content codings the client accepts (q > 0)"""
+    accepted = set()
+    for coding, q in ACCEPT_ENCODING_RE.findall(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        try:
+            if q == '' or float(q) > 0:
+                accepted.add(coding.lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def media_file(name):
+    """Absolute path of a servable file under MEDIA_ROOT; Http404 otherwise"""
+    if any(part.startswith('.') for part in name.split('/')) or name.endswith(UPLOAD_SUFFIX):
+        raise Http404('Not found')
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    if not os.path.isfile(path):
+        raise Http404('Not found')
+    return path
+
+
+def precompressed(request, path, content_type):
+    """(path, Content-Encoding) of a precompressed sibling the client accepts, or (path, None)"""
+    if not content_type.startswith(COMPRESSIBLE_TYPES):
+        return path, None
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if (encoding in accepted or '*' in accepted) and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def offload_response(request, path, content_type, etag, mtime):
+    """An empty response telling Apache / nginx to send the file itself"""
+    response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if response is not None:
+        return response
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_OFFLOAD == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative)
+    response['Last-Modified'] = http_date(mtime)
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+@require_safe
+def serve_media(request, name):
+    """An uploaded file, with long-lived caching and, if configured, web server offload"""
+    path = media_file(name)
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    basename = os.path.basename(path)
+    if CONTENT_ADDRESSED_RE.match(basename):
+        etag = os.path.splitext(basename)[0]
+        cache_control = IMMUTABLE
+    else:
+        stat = os.stat(path)
+        etag = f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+        cache_control = f'public, max-age={getattr(settings, "MEDIA_CACHE_SECONDS", 3600)}'
+
+    path, encoding = precompressed(request, path, content_type)
+    if encoding:
+        etag = f'{etag}-{encoding}'  # each representation has its own ETag
+
+    if getattr(settings, 'MEDIA_OFFLOAD', ''):
+        response = offload_response(request, path, content_type, quote_etag(etag), os.stat(path).st_mtime)
+        response['Cache-Control'] = cache_control
+    else:
+        response = serve_file(request, path, content_type, etag=etag, cache_control=cache_control)
+    if encoding and response.status_code != 304:
+        response['Content-Encoding'] = encoding
+    if content_type.startswith(COMPRESSIBLE_TYPES):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    response['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"  # uploads are user content
+    return response
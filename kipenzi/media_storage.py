@@ -0,0 +1,323 @@
+"""
+Storage for uploaded media: the local filesystem or an S3-compatible bucket
+(AWS S3, MinIO, or any local stand-in reachable at AWS_S3_ENDPOINT_URL),
+behind one interface:
+
+    storage = get_storage()
+    name = storage.save_hashed('products', upload.chunks(), '.jpg', 'image/jpeg')
+    storage.url(name)        /media/products/<sha256>.jpg or https://bucket.../products/<sha256>.jpg
+    storage.name(url)        the inverse; None for a URL stored elsewhere
+    storage.open(name), storage.save(name, data), storage.exists(name),
+    storage.list(prefix), storage.delete(names)
+
+MEDIA_STORAGE selects the backend: 'local' (MEDIA_ROOT / MEDIA_URL) or 's3'
+(AWS_STORAGE_BUCKET_NAME, AWS_S3_REGION_NAME, AWS_S3_ENDPOINT_URL,
+AWS_S3_PUBLIC_URL; credentials from the usual AWS environment variables).
+
+Uploads are copied chunk by chunk from Django's uploaded file (kept in
+memory up to FILE_UPLOAD_MAX_MEMORY_SIZE, in a temporary file under
+FILE_UPLOAD_TEMP_DIR beyond that) and named by the SHA-256 of their
+content, computed while they are written. In S3, a file smaller than
+MEDIA_S3_PART_SIZE is buffered in memory and put straight under its final
+name. A larger one goes up as a multipart upload to a temporary key, then
+is copied server side to its name once the hash is known. The boto3 client
+is created once per process and shared by all threads (clients are
+thread-safe).
+"""
+import hashlib
+import io
+import os
+import posixpath
+import tempfile
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - only the s3 backend needs it
+    boto3 = None
+
+UPLOAD_SUFFIX = '.upload'  # partial uploads; gc_media removes abandoned ones
+UPLOAD_PREFIX = 'uploads/'  # S3 multipart uploads before they get their content-hash name
+DEFAULT_PART_SIZE = 8 * 1024 * 1024  # S3 minimum is 5 MB
+MISSING = ('404', 'NoSuchKey', 'NotFound')  # S3 error codes of an absent object
+
+StoredFile = namedtuple('StoredFile', 'name size modified')  # modified: a POSIX timestamp
+
+_storage = None
+_storage_lock = threading.Lock()
+_clients = {}
+_upload_pool = None
+
+
+class LocalStorage:
+    """Files under MEDIA_ROOT, served at MEDIA_URL"""
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def url(self, name):
+        return f'{self.base_url}/{name}'
+
+    def name(self, url):
+        prefix = f'{self.base_url}/'
+        if not isinstance(url, str) or not url.startswith(prefix):
+            return None
+        name = posixpath.normpath(url[len(prefix):].lstrip('/'))
+        if name in ('.', '..') or name.startswith(('/', '../')):
+            return None  # outside MEDIA_ROOT
+        return name
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def exists(self, name):
+        return os.path.isfile(self.path(name))
+
+    def open(self, name):
+        return open(self.path(name), 'rb')
+
+    def save(self, name, data, content_type=None):
+        """Write bytes to `name`, replacing it atomically"""
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f'{path}.{os.getpid()}.{threading.get_ident()}{UPLOAD_SUFFIX}'
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+        return name
+
+    def save_hashed(self, folder, chunks, ext, content_type=None):
+        """Store the chunks as <folder>/<sha256><ext>, hashing while writing; an identical file is reused"""
+        directory = self.path(folder)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=UPLOAD_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            name = f'{folder}/{digest.hexdigest()}{ext}'
+            if os.path.exists(self.path(name)):
+                os.remove(temp_path)
+                os.utime(self.path(name))  # referenced again: restart the gc_media grace period
+            else:
+                os.replace(temp_path, self.path(name))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def list(self, prefix):
+        """The files directly under the `prefix` folder"""
+        directory = self.path(prefix)
+        if not os.path.isdir(directory):
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    yield StoredFile(f'{prefix}/{entry.name}', stat.st_size, stat.st_mtime)
+
+    def delete(self, names):
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+
+
+def s3_client(region=None, endpoint_url=None):
+    """The process-wide boto3 S3 client for this region / endpoint"""
+    if boto3 is None:
+        raise RuntimeError('MEDIA_STORAGE=s3 needs boto3 installed')
+    key = (region, endpoint_url)
+    with _storage_lock:
+        if key not in _clients:
+            _clients[key] = boto3.session.Session().client(
+                's3', region_name=region, endpoint_url=endpoint_url,
+                config=Config(max_pool_connections=getattr(settings, 'MEDIA_UPLOAD_WORKERS', 4) * 4,
+                              retries={'max_attempts': 5, 'mode': 'standard'}),
+            )
+        return _clients[key]
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, served from AWS_S3_PUBLIC_URL"""
+
+    def __init__(self, bucket, region=None, endpoint_url=None, public_url=None, part_size=DEFAULT_PART_SIZE):
+        if not bucket:
+            raise RuntimeError('MEDIA_STORAGE=s3 needs AWS_STORAGE_BUCKET_NAME')
+        self.bucket = bucket
+        self.client = s3_client(region, endpoint_url)
+        if not public_url:
+            public_url = f'{endpoint_url.rstrip("/")}/{bucket}' if endpoint_url else (
+                f'https://{bucket}.s3.{region}.amazonaws.com' if region else f'https://{bucket}.s3.amazonaws.com'
+            )
+        self.base_url = public_url.rstrip('/')
+        self.part_size = max(part_size, 5 * 1024 * 1024)
+
+    def url(self, name):
+        return f'{self.base_url}/{name}'
+
+    def name(self, url):
+        prefix = f'{self.base_url}/'
+        if not isinstance(url, str) or not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in MISSING:
+                return False
+            raise
+        return True
+
+    def open(self, name):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in MISSING:
+                raise FileNotFoundError(name) from e
+            raise
+        return io.BytesIO(response['Body'].read())
+
+    def save(self, name, data, content_type=None):
+        extra = {'ContentType': content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=name, Body=data, **extra)
+        return name
+
+    def save_hashed(self, folder, chunks, ext, content_type=None):
+        """Store the chunks as <folder>/<sha256><ext>, hashing while uploading; an identical object is reused"""
+        extra = {'ContentType': content_type} if content_type else {}
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        temp_key = upload_id = None
+        parts = []
+        try:
+            for chunk in chunks:
+                digest.update(chunk)
+                buffer += chunk
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        temp_key = f'{UPLOAD_PREFIX}{uuid.uuid4().hex}{ext}'
+                        upload_id = self.client.create_multipart_upload(
+                            Bucket=self.bucket, Key=temp_key, **extra
+                        )['UploadId']
+                    parts.append(self._upload_part(temp_key, upload_id, len(parts) + 1, bytes(buffer)))
+                    buffer.clear()
+            name = f'{folder}/{digest.hexdigest()}{ext}'
+
+            if upload_id is None:
+                if self.exists(name):
+                    self._touch(name, extra)
+                else:
+                    self.client.put_object(Bucket=self.bucket, Key=name, Body=bytes(buffer), **extra)
+                return name
+
+            if buffer:
+                parts.append(self._upload_part(temp_key, upload_id, len(parts) + 1, bytes(buffer)))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=temp_key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+            )
+            upload_id = None
+            if self.exists(name):
+                self._touch(name, extra)
+            else:
+                self.client.copy_object(  # server side, up to 5 GB
+                    Bucket=self.bucket, Key=name, CopySource={'Bucket': self.bucket, 'Key': temp_key}, **extra
+                )
+            self.client.delete_object(Bucket=self.bucket, Key=temp_key)
+            return name
+        except BaseException:
+            if upload_id is not None:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=temp_key, UploadId=upload_id)
+            raise
+
+    def _upload_part(self, key, upload_id, number, data):
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data
+        )
+        return {'PartNumber': number, 'ETag': response['ETag']}
+
+    def _touch(self, name, extra):
+        """Move LastModified to now (restarting the gc_media grace period) with a server-side self-copy"""
+        self.client.copy_object(
+            Bucket=self.bucket, Key=name, CopySource={'Bucket': self.bucket, 'Key': name},
+            MetadataDirective='REPLACE', **extra,
+        )
+
+    def list(self, prefix):
+        """The objects directly under the `prefix` folder"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f'{prefix}/', Delimiter='/'):
+            for item in page.get('Contents', []):
+                yield StoredFile(item['Key'], item['Size'], item['LastModified'].timestamp())
+
+    def delete(self, names):
+        names = list(names)
+        for start in range(0, len(names), 1000):  # DeleteObjects takes up to 1000 keys
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': name} for name in names[start:start + 1000]], 'Quiet': True,
+            })
+
+
+def s3_storage_from_settings():
+    return S3Storage(
+        getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None),
+        region=getattr(settings, 'AWS_S3_REGION_NAME', None) or None,
+        endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None) or None,
+        public_url=getattr(settings, 'AWS_S3_PUBLIC_URL', None) or None,
+        part_size=getattr(settings, 'MEDIA_S3_PART_SIZE', DEFAULT_PART_SIZE),
+    )
+
+
+def get_storage():
+    """The configured media storage (MEDIA_STORAGE), created once per process"""
+    global _storage
+    with _storage_lock:
+        storage = _storage
+    if storage is None:
+        if getattr(settings, 'MEDIA_STORAGE', 'local') == 's3':
+            storage = s3_storage_from_settings()
+        else:
+            storage = LocalStorage(
+                getattr(settings, 'MEDIA_ROOT', os.path.join(str(settings.BASE_DIR), 'media')),
+                getattr(settings, 'MEDIA_URL', '/media/'),
+            )
+        with _storage_lock:
+            _storage = storage
+    return storage
+
+
+def upload_pool():
+    """Thread pool for uploading several files of one request concurrently"""
+    global _upload_pool
+    with _storage_lock:
+        if _upload_pool is None:
+            _upload_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MEDIA_UPLOAD_WORKERS', 4), thread_name_prefix='media-upload'
+            )
+        return _upload_pool
+
+
+@receiver(setting_changed)
+def reset_storage(setting, **kwargs):
+    """Tests can point MEDIA_ROOT / MEDIA_STORAGE elsewhere with override_settings"""
+    global _storage
+    if setting.startswith(('MEDIA_', 'AWS_')):
+        with _storage_lock:
+            _storage = None
@@ -32,9 +32,11 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'kipenzi.sql_instrumentation.SQLInstrumentationMiddleware',  # query count / DB time headers and N+1 warnings
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'kipenzi.db_router.ReplicaPinningMiddleware',  # keep a client's reads on the primary right after it writes
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -79,6 +81,35 @@ DATABASES = {
     }
 }
 
+# Read replica for reporting and catalog reads (kipenzi/db_router.py); without
+# DATABASE_REPLICA_URL every read stays on the primary
+if os.getenv('DATABASE_REPLICA_URL'):
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(os.getenv('DATABASE_REPLICA_URL'), conn_max_age=300)
+
+DATABASE_ROUTERS = ['kipenzi.db_router.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
+# Connection pooling (kipenzi/db_backends); replaces CONN_MAX_AGE when enabled
+if os.getenv('DB_POOL_ENABLED', 'False').lower() == 'true':
+    from kipenzi.db_backends import enable_pooling
+    for database in DATABASES.values():
+        enable_pooling(
+            database,
+            size=int(os.getenv('DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', '5')),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            pre_ping=os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true',
+        )
+
+# SQL instrumentation (kipenzi/sql_instrumentation.py)
+SQL_INSTRUMENTATION_ENABLED = os.getenv('SQL_INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('SQL_INSTRUMENTATION_SAMPLE_RATE', '0.1'))  # share of requests instrumented
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '10'))  # warn when one query shape repeats more than this
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,6 +140,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media storage backend (kipenzi/media_storage.py): 'local' (MEDIA_ROOT) or 's3' (any S3-compatible bucket)
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')
+AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME', '')
+AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', '')
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL', '')  # MinIO or another S3-compatible server
+AWS_S3_PUBLIC_URL = os.getenv('AWS_S3_PUBLIC_URL', '')  # CDN / bucket URL in front of the objects (default: the bucket's own URL)
+MEDIA_S3_PART_SIZE = int(os.getenv('MEDIA_S3_PART_SIZE', str(8 * 1024 * 1024)))  # larger uploads go up in parts of this size
+MEDIA_UPLOAD_WORKERS = int(os.getenv('MEDIA_UPLOAD_WORKERS', '4'))  # threads uploading a request's images concurrently
+MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '')  # '', 'x-sendfile' (Apache mod_xsendfile) or 'x-accel-redirect' (nginx)
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')  # nginx internal location aliased to MEDIA_ROOT
+MEDIA_CACHE_SECONDS = int(os.getenv('MEDIA_CACHE_SECONDS', '3600'))  # max-age of media that is not content-addressed
+
+# Offline catalog snapshot (hardware_backend/catalog_snapshot.py)
+CATALOG_SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', os.path.join(MEDIA_ROOT, 'catalog'))
+CATALOG_SNAPSHOT_BACKGROUND = os.getenv('CATALOG_SNAPSHOT_BACKGROUND', 'True').lower() == 'true'  # rebuild stale snapshots in a thread
+
+# POS autocomplete index (hardware_backend/autocomplete.py)
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '30'))  # how often to check the catalog version
+AUTOCOMPLETE_BACKGROUND = os.getenv('AUTOCOMPLETE_BACKGROUND', 'True').lower() == 'true'  # rebuild a stale index in a thread
+
+# Resized WebP / JPEG variants of uploaded images (hardware_backend/image_variants.py)
+IMAGE_VARIANTS_BACKGROUND = os.getenv('IMAGE_VARIANTS_BACKGROUND', 'True').lower() == 'true'  # encode in a thread pool after the response
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))  # encoder threads per process
+BLURHASH_WORKERS = int(os.getenv('BLURHASH_WORKERS', '1'))  # processes encoding BlurHash placeholders (0: in the calling thread)
+MEDIA_GC_GRACE_SECONDS = int(os.getenv('MEDIA_GC_GRACE_SECONDS', '86400'))  # gc_media keeps files younger than this
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -140,6 +197,9 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# orjson-backed JSON renderer/parser (kipenzi/json_renderers.py), stdlib fallback when orjson is missing
+FAST_JSON_ENABLED = os.getenv('FAST_JSON_ENABLED', 'True').lower() == 'true'
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -149,12 +209,26 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'kipenzi.json_renderers.FastJSONRenderer' if FAST_JSON_ENABLED else 'rest_framework.renderers.JSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'kipenzi.json_renderers.FastJSONParser' if FAST_JSON_ENABLED else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Conditional GET for catalog endpoints (kipenzi/conditional.py)
+CONDITIONAL_GET_ENABLED = os.getenv('CONDITIONAL_GET_ENABLED', 'True').lower() == 'true'
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', '60'))  # seconds clients may reuse a public catalog response
+ETAG_RELEASE = os.getenv('ETAG_RELEASE', '')  # change on deploys that alter response shapes
+
+# Catalog delta sync (hardware_backend/catalog_sync.py)
+CATALOG_SYNC_OVERLAP_SECONDS = int(os.getenv('CATALOG_SYNC_OVERLAP_SECONDS', '5'))  # re-send rows saved this close before a token
+CATALOG_TOMBSTONE_RETENTION_DAYS = int(os.getenv('CATALOG_TOMBSTONE_RETENTION_DAYS', '90'))  # older tokens get a full snapshot
+
 # Security settings for production
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
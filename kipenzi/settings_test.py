@@ -0,0 +1,42 @@
+"""
+Django settings for the test suite (pytest.ini): SQLite unless DATABASE_URL is set
+"""
+
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+if not os.getenv('DATABASE_URL'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Never call the SMS API from tests
+SMS_USERNAME = None
+SMS_PASSWORD = None
+
+# Catalog snapshots go to a scratch directory and are rebuilt inline
+CATALOG_SNAPSHOT_DIR = os.path.join(tempfile.gettempdir(), 'kipenzi-test-catalog')
+CATALOG_SNAPSHOT_BACKGROUND = False
+
+# The autocomplete index follows every catalog change inline
+AUTOCOMPLETE_REFRESH_SECONDS = 0
+AUTOCOMPLETE_BACKGROUND = False
+
+# Image variants are encoded inline, so tests see them right after the request
+IMAGE_VARIANTS_BACKGROUND = False
+BLURHASH_WORKERS = 0  # no process pool under pytest
+
+# A second local database standing in for the read replica in test_db_router.py
+# (views only read from it while a test points REPLICA_DATABASE_ALIAS at it)
+DATABASES['replica_test'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db_replica.sqlite3',
+}
+
+# Fast password hashing: PBKDF2 would dominate the login / register budgets
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
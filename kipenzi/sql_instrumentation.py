@@ -0,0 +1,173 @@
+"""
+Per-request SQL instrumentation.
+
+SQLInstrumentationMiddleware wraps every database connection for a sampled
+share of requests (SQL_INSTRUMENTATION_SAMPLE_RATE) and records the query
+count, total DB time and how often each SQL shape ran. It adds Server-Timing
+and X-DB-Queries headers, logs a warning when one shape repeats more than
+SQL_N_PLUS_ONE_THRESHOLD times in a request (the usual N+1 signature) and
+keeps per-view histograms in memory, served by the sql metrics view.
+Unsampled requests only pay for one random() call.
+"""
+import contextlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+DB_TIME_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+_stats_lock = threading.Lock()
+_view_stats = {}
+
+
+def fingerprint(sql):
+    """Reduce a query to its shape: literals and IN lists collapsed"""
+    sql = _IN_LIST_RE.sub('(%s...)', sql)
+    sql = _STRING_RE.sub('?', sql)
+    return _NUMBER_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    """execute_wrapper that counts queries, DB time and raw SQL repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated_shapes(self, threshold):
+        """Fingerprints seen more than `threshold` times, most frequent first"""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[fingerprint(sql)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+
+def _bucket(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return f'le_{bound}'
+    return 'inf'
+
+
+def record_view(view_name, query_count, db_ms, request_ms, n_plus_one):
+    """Add one request to the in-memory per-view histograms"""
+    with _stats_lock:
+        stats = _view_stats.get(view_name)
+        if stats is None:
+            stats = _view_stats[view_name] = {
+                'requests': 0,
+                'queries_total': 0,
+                'queries_max': 0,
+                'db_ms_total': 0.0,
+                'db_ms_max': 0.0,
+                'request_ms_total': 0.0,
+                'n_plus_one_requests': 0,
+                'query_count_histogram': Counter(),
+                'db_ms_histogram': Counter(),
+            }
+        stats['requests'] += 1
+        stats['queries_total'] += query_count
+        stats['queries_max'] = max(stats['queries_max'], query_count)
+        stats['db_ms_total'] += db_ms
+        stats['db_ms_max'] = max(stats['db_ms_max'], db_ms)
+        stats['request_ms_total'] += request_ms
+        if n_plus_one:
+            stats['n_plus_one_requests'] += 1
+        stats['query_count_histogram'][_bucket(query_count, QUERY_COUNT_BUCKETS)] += 1
+        stats['db_ms_histogram'][_bucket(db_ms, DB_TIME_MS_BUCKETS)] += 1
+
+
+def sql_stats():
+    """Snapshot of the per-view histograms for this worker process"""
+    with _stats_lock:
+        snapshot = {}
+        for view_name, stats in _view_stats.items():
+            requests = stats['requests']
+            snapshot[view_name] = {
+                'requests': requests,
+                'queries_avg': round(stats['queries_total'] / requests, 2),
+                'queries_max': stats['queries_max'],
+                'db_ms_avg': round(stats['db_ms_total'] / requests, 3),
+                'db_ms_max': round(stats['db_ms_max'], 3),
+                'request_ms_avg': round(stats['request_ms_total'] / requests, 3),
+                'n_plus_one_requests': stats['n_plus_one_requests'],
+                'query_count_histogram': dict(stats['query_count_histogram']),
+                'db_ms_histogram': dict(stats['db_ms_histogram']),
+            }
+        return snapshot
+
+
+def reset_sql_stats():
+    with _stats_lock:
+        _view_stats.clear()
+
+
+class SQLInstrumentationMiddleware:
+    """Record query count, DB time and repeated SQL for sampled requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SQL_INSTRUMENTATION_ENABLED', True)
+        self.sample_rate = getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.threshold = getattr(settings, 'SQL_N_PLUS_ONE_THRESHOLD', 10)
+
+    def __call__(self, request):
+        if not self.enabled or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        request_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+
+        repeated = recorder.repeated_shapes(self.threshold)
+        for shape, count in repeated:
+            logger.warning(
+                'Repeated SQL in %s: %d executions of one query shape (possible N+1): %.200s',
+                view_name, count, shape,
+                extra={
+                    'view': view_name,
+                    'path': request.path,
+                    'repeat_count': count,
+                    'sql_fingerprint': shape,
+                    'query_count': recorder.count,
+                },
+            )
+
+        record_view(view_name, recorder.count, db_ms, request_ms, bool(repeated))
+
+        response['X-DB-Queries'] = str(recorder.count)
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={request_ms:.1f}'
+        )
+        return response
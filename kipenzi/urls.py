@@ -15,9 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from kipenzi.media_serving import serve_media
 from users import views
 from subscription import views as subViews
 
@@ -50,5 +52,8 @@ urlpatterns = [
     # Backwards-compatible hardware API prefix (for clients calling /hardware/...)
     path('hardware/', include('hardware_backend.urls')),
 ]
-if getattr(settings, 'DEBUG', False):
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if getattr(settings, 'MEDIA_STORAGE', 'local') == 'local':
+    # Uploaded media, with immutable caching and X-Sendfile / X-Accel-Redirect offload (kipenzi/media_serving.py)
+    urlpatterns += [
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<name>.+)$', serve_media, name='media'),
+    ]
@@ -44,6 +44,9 @@ class UserLocation(models.Model):
     class Meta:
         db_table = "location"
 
+# BlurHash stored for images uploaded without one (backfill_blurhash replaces it when it can)
+DEFAULT_IMAGE_ENCODE = "L371cr_3RKKFsqICIVNG00eR?d-r"
+
 # images of user
 # on user 
 class UserImage(models.Model):
@@ -51,7 +54,7 @@ class UserImage(models.Model):
     image = models.CharField(max_length=200, blank=False, unique=True,)
     registered = models.DateTimeField(auto_now_add=True, null=False,)
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=False, related_name='images', null=False,)
-    image_encode = models.CharField(max_length=200, blank=False, unique=False, default="L371cr_3RKKFsqICIVNG00eR?d-r")
+    image_encode = models.CharField(max_length=200, blank=False, unique=False, default=DEFAULT_IMAGE_ENCODE)
 
     images = models.Manager()
 
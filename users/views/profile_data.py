@@ -4,7 +4,8 @@ from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 import uuid
 
-from users.models import User, UserHobbies, UserImage, UserLocation
+from kipenzi.blurhash import placeholder_for_url
+from users.models import DEFAULT_IMAGE_ENCODE, User, UserHobbies, UserImage, UserLocation
 from users.serializers import UserSerializer
 from users.views.functions import user_details
 
@@ -203,7 +204,9 @@ def upload_user_image(request):
                 image = UserImage()
                 image.image_id = uuid.uuid4().hex
                 image.image = data['image_url']
-                image.image_encode = data['image_encode']
+                # BlurHash from the app, else computed here for an image in our media storage
+                image.image_encode = (data.get('image_encode') or placeholder_for_url(data['image_url'])
+                                      or DEFAULT_IMAGE_ENCODE)
                 image.user = user
                 image.save()
 
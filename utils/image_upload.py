@@ -1,39 +1,23 @@
 import os
 from django.views.decorators.csrf import csrf_exempt
-import uuid
 
-import boto3 as boto3
+from kipenzi.media_storage import s3_storage_from_settings
 
 
 def add_media_to_s3(request, key):
 
     # get file
-    fileToUpload = request.FILES["image"]
-    fileDirectory = fileToUpload.temporary_file_path()
-    uniquePictureId = uuid.uuid4().hex
+    fileToUpload = request.FILES[key]
     extension = fileToUpload.name.split(".")[-1].lower()
 
-    # location for media to be uploaded
-    mediaLocation = "chekaplus/" + "/" + uniquePictureId + "." + extension
-    mediaUrl = "https://ejn-dev.s3.us-west-1.amazonaws.com/" + mediaLocation
-
-    # credentials for aws account
-    client = boto3.client(
-        "s3",
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),    
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name="us-east-1"
-    )
-
-    # upload file
-    client.upload_file(
-        fileDirectory, 
-        "ejn-dev", 
-        mediaLocation,              
-        ExtraArgs={'ContentType': 'image/' + extension}
+    # stream the upload's chunks to the configured bucket (AWS_STORAGE_BUCKET_NAME)
+    # with the process-wide S3 client; the object is named by its content hash
+    storage = s3_storage_from_settings()
+    mediaLocation = storage.save_hashed(
+        "chekaplus", fileToUpload.chunks(), "." + extension, 'image/' + extension
     )
 
-    return mediaUrl
+    return storage.url(mediaLocation)
 
 
 @csrf_exempt